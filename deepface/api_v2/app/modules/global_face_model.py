@@ -0,0 +1,504 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from deepface.modules import datastore, indexing, verification
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "manifest.lock"
+COMPACTION_LOCK_FILE = "compaction.lock"
+SEGMENTS_DIR = "segments"
+
+
+class GlobalFaceModel:
+    """
+    Append-only global face model.
+
+    Every registration is committed as a new segment holding only the
+    embeddings of that face_id, plus a tombstone hiding rows of the same
+    face_id in older segments. The manifest listing segments and tombstones
+    is the commit point. It is replaced atomically with os.replace while
+    holding an exclusive file lock, so writers in different processes are
+    serialized. Segments are merged by a background compaction once there
+    are too many of them.
+
+    Readers keep every segment memory mapped as a separate block with a mask
+    of its live rows, so a refresh only loads new segments and updates masks.
+    Flat search scans the mapped segments, worker processes share them through
+    the page cache. Approximate indexes are kept in memory and updated
+    incrementally.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        legacy_model_path: Optional[Path] = None,
+        max_segments: int = 32,
+        max_tombstones: int = 256,
+    ):
+        self.root = Path(root)
+        self.legacy_model_path = legacy_model_path
+        self.max_segments = max_segments
+        self.max_tombstones = max_tombstones
+
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+
+        # reader state
+        self._version: Optional[int] = None
+        self._segments: List[_Segment] = []
+        self._tombstones: Dict[int, int] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        self._indexes: Dict[Tuple[str, str], indexing.Index] = {}
+
+    # writers
+
+    def replace_face_id(self, face_id: int, store: datastore.Datastore) -> None:
+        """
+        Commit the representations of a face_id and hide its previous ones.
+        Cost is proportional to the size of the given store only.
+        """
+        self._ensure_manifest()
+        with self._write_lock():
+            manifest = self._read_manifest()
+            seq = manifest["next_seq"]
+
+            new_store = store.select(np.ones(len(store), dtype=bool))
+            new_store.ids = np.arange(
+                manifest["next_id"], manifest["next_id"] + len(new_store), dtype=np.int64)
+            new_store.face_ids = np.full(len(new_store), face_id, dtype=np.int64)
+
+            if len(new_store) > 0:
+                segment_file = self._write_segment(seq, new_store)
+                manifest["segments"].append(
+                    {"seq": seq, "file": segment_file, "rows": len(new_store)})
+            manifest["tombstones"][str(face_id)] = seq
+            manifest["next_seq"] = seq + 1
+            manifest["next_id"] += len(new_store)
+            self._commit(manifest)
+
+        logger.info(
+            f"Committed {len(new_store)} representations of face_id {face_id} as segment {seq}")
+        self._maybe_compact(manifest)
+
+    def remove_face_id(self, face_id: int) -> None:
+        """
+        Hide every representation of a face_id.
+        """
+        self.replace_face_id(face_id, datastore.from_representations([]))
+
+    def compact(self) -> None:
+        """
+        Merge live rows of all segments into a single segment and drop applied
+        tombstones. Row ids are kept, so indexes stay valid. Writers are only
+        blocked while the new manifest is committed.
+        """
+        self._ensure_manifest()
+        # a single process compacts at a time, others skip
+        with open(self.root.joinpath(COMPACTION_LOCK_FILE), "a+") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                self._compact()
+            except FileNotFoundError:
+                # segments were compacted by another process after the manifest was read
+                return
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _compact(self) -> None:
+        manifest = self._read_manifest()
+        segments = manifest["segments"]
+        if len(segments) <= 1 and len(manifest["tombstones"]) == 0:
+            return
+
+        # every segment and tombstone allocated so far is covered by the snapshot
+        snapshot_seq = manifest["next_seq"] - 1
+        store = self._load_live_rows(segments, manifest["tombstones"])
+        segment_file = self._write_segment(snapshot_seq, store, suffix=uuid.uuid4().hex[:8])
+        merged = [segment["file"] for segment in segments]
+
+        with self._write_lock():
+            latest = self._read_manifest()
+            latest_files = {segment["file"] for segment in latest["segments"]}
+            if any(file not in latest_files for file in merged):
+                # another process compacted in the meantime
+                datastore.remove(self._segment_path(segment_file))
+                return
+
+            latest["segments"] = [
+                {"seq": snapshot_seq, "file": segment_file, "rows": len(store)}
+            ] + [segment for segment in latest["segments"] if segment["seq"] > snapshot_seq]
+            # tombstones committed after the snapshot may still hide compacted rows
+            latest["tombstones"] = {
+                face_id: seq for face_id, seq in latest["tombstones"].items()
+                if seq > snapshot_seq
+            }
+            self._commit(latest)
+
+        # processes still mapping merged segments keep reading them until they refresh
+        for file in merged:
+            datastore.remove(self._segment_path(file))
+        logger.info(f"Compacted {len(merged)} segments of global model into {len(store)} rows")
+
+    # readers
+
+    def refresh(self) -> None:
+        """
+        Bring in-memory segments and indexes up to date with the latest manifest.
+        Only segments and tombstones committed since the last refresh are applied.
+        """
+        self._ensure_manifest()
+        with self._lock:
+            # segments might be compacted away by another process while loading
+            for attempt in range(3):
+                manifest = self._read_manifest()
+                if manifest["version"] == self._version:
+                    return
+                try:
+                    self._apply(manifest)
+                    break
+                except FileNotFoundError:
+                    if attempt == 2:
+                        raise
+
+            self._version = manifest["version"]
+            self._frame = None
+
+    def get_frame(self) -> pd.DataFrame:
+        """
+        Metadata of live rows indexed by row ids.
+        """
+        with self._lock:
+            self.refresh()
+            if self._frame is None:
+                self._frame = _concat_frames(
+                    [segment.frame()[segment.alive] for segment in self._segments])
+            return self._frame
+
+    def get_index(self, index_type: str, distance_metric: str = "cosine") -> indexing.Index:
+        """
+        Approximate nearest neighbour index of live rows. Ids of the index are row ids.
+        Flat search scans the memory mapped segments directly and needs no index.
+        """
+        if index_type == "flat":
+            raise ValueError("Flat search of the global model does not use an index")
+        with self._lock:
+            self.refresh()
+            key = (index_type, distance_metric)
+            if key not in self._indexes:
+                self._indexes[key] = self._load_or_build_index(index_type, distance_metric)
+            return self._indexes[key]
+
+    def search(
+        self,
+        target,
+        k: Optional[int] = None,
+        threshold: Optional[float] = None,
+        index_type: str = "flat",
+        distance_metric: str = "cosine",
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Closest live rows to a target embedding, closest first, and their distances.
+        The lock is held to refresh, query an index and snapshot the segments. Flat scans and
+        row lookups run without it.
+        """
+        with self._lock:
+            if index_type == "flat":
+                self.refresh()
+            else:
+                # indexes are updated in place by refresh
+                index = self.get_index(index_type=index_type, distance_metric=distance_metric)
+                ids, distances = index.search(target, k=k, threshold=threshold)
+            # alive masks are updated in place by refresh
+            snapshot = [(segment, segment.alive.copy()) for segment in self._segments]
+
+        if index_type == "flat":
+            ids, distances = self._search_segments(
+                snapshot, target, k, threshold, distance_metric)
+        return self._find_rows(snapshot, ids), distances
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return int(sum(segment.alive.sum() for segment in self._segments))
+
+    # internals
+
+    def _apply(self, manifest: Dict) -> None:
+        tombstones = {int(face_id): seq for face_id, seq in manifest["tombstones"].items()}
+        manifest_files = {segment["file"] for segment in manifest["segments"]}
+        loaded_files = {segment.file for segment in self._segments}
+
+        # load new segments first, state is left untouched if one was compacted away
+        new_segments = [
+            _Segment(segment["seq"], segment["file"], self._segment_path(segment["file"]))
+            for segment in manifest["segments"]
+            if segment["file"] not in loaded_files
+        ]
+
+        if any(segment.file not in manifest_files for segment in self._segments):
+            # compacted segments keep their row ids, indexes are rebuilt lazily
+            self._segments = [
+                segment for segment in self._segments if segment.file in manifest_files]
+            self._indexes = {}
+
+        # hide rows of face ids tombstoned since last refresh
+        changed = {
+            face_id: seq for face_id, seq in tombstones.items()
+            if self._tombstones.get(face_id) != seq
+        }
+        for segment in self._segments:
+            dead = segment.alive & find_dead_rows(
+                segment.store.face_ids, np.full(len(segment), segment.seq), changed)
+            if dead.any():
+                for index in self._indexes.values():
+                    index.remove(segment.store.ids[dead])
+                segment.alive &= ~dead
+
+        for segment in new_segments:
+            segment.alive &= ~find_dead_rows(
+                segment.store.face_ids, np.full(len(segment), segment.seq), tombstones)
+            rows = segment.alive & segment.store.valid_rows
+            if not rows.any():
+                continue
+            for index in self._indexes.values():
+                index.add(ids=segment.store.ids[rows], embeddings=segment.store.embeddings[rows])
+
+        self._segments = sorted(self._segments + new_segments, key=lambda segment: segment.seq)
+        self._tombstones = tombstones
+
+    def _search_segments(
+        self,
+        snapshot: List[Tuple["_Segment", np.ndarray]],
+        target,
+        k: Optional[int],
+        threshold: Optional[float],
+        distance_metric: str,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        target = np.asarray(target, dtype=np.float32).reshape(-1)
+        all_ids = [np.zeros(0, dtype=np.int64)]
+        all_distances = [np.zeros(0, dtype=np.float64)]
+        for segment, alive in snapshot:
+            rows = alive & segment.store.valid_rows
+            if not rows.any():
+                continue
+            distances = verification.find_distances(
+                target, segment.store.embeddings, distance_metric, beta_norms=segment.norms
+            )[0].astype(np.float64)
+            if threshold is not None:
+                rows &= distances <= threshold
+            all_ids.append(segment.store.ids[rows])
+            all_distances.append(distances[rows])
+
+        ids, distances = np.concatenate(all_ids), np.concatenate(all_distances)
+        if k is not None and k < distances.shape[0]:
+            closest = np.argpartition(distances, k - 1)[:k]
+            ids, distances = ids[closest], distances[closest]
+        order = np.argsort(distances, kind="stable")
+        return ids[order], distances[order]
+
+    def _find_rows(
+        self, snapshot: List[Tuple["_Segment", np.ndarray]], ids: np.ndarray
+    ) -> pd.DataFrame:
+        # metadata of the given live row ids, in the same order
+        frames = [segment.frame().iloc[segment.find(ids, alive)] for segment, alive in snapshot]
+        return _concat_frames(frames).loc[ids]
+
+    def _load_live_rows(
+        self, segments: List[Dict], tombstones: Dict[str, int]
+    ) -> datastore.Datastore:
+        # merged copy of live rows, only needed to write a compacted segment
+        tombstones = {int(face_id): seq for face_id, seq in tombstones.items()}
+        stores = [datastore.from_representations([])]
+        for segment in segments:
+            store = datastore.load(self._segment_path(segment["file"]))
+            seqs = np.full(len(store), segment["seq"], dtype=np.int64)
+            stores.append(store.select(~find_dead_rows(store.face_ids, seqs, tombstones)))
+
+        store = datastore.concat(stores)
+        if store.face_ids is None:
+            store.face_ids = np.zeros(0, dtype=np.int64)
+        return store
+
+    def _load_or_build_index(self, index_type: str, distance_metric: str) -> indexing.Index:
+        index_path = indexing.find_index_path(
+            str(self.root.joinpath(MANIFEST_FILE)),
+            index_type=index_type, distance_metric=distance_metric)
+        signature = (self._version, len(self))
+        if os.path.exists(index_path):
+            index = indexing.load_index(index_path)
+            if index.source_signature == signature:
+                return index
+
+        index = indexing.build_index(index_type=index_type, distance_metric=distance_metric)
+        for segment in self._segments:
+            rows = segment.alive & segment.store.valid_rows
+            if rows.any():
+                index.add(ids=segment.store.ids[rows], embeddings=segment.store.embeddings[rows])
+        index.source_signature = signature
+        index.save(index_path)
+        logger.info(f"Built {index_type} index of {len(index)} global representations")
+        return index
+
+    def _maybe_compact(self, manifest: Dict) -> None:
+        if (len(manifest["segments"]) <= self.max_segments
+                and len(manifest["tombstones"]) <= self.max_tombstones):
+            return
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self._compact_in_background, daemon=True)
+            self._compaction.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception as err:
+            logger.error(f"Compaction of global model failed: {err}")
+
+    @contextmanager
+    def _write_lock(self):
+        # not reentrant, flock of a second file descriptor would wait for the first one
+        self.root.joinpath(SEGMENTS_DIR).mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.root.joinpath(LOCK_FILE), "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_manifest(self) -> None:
+        manifest_path = self.root.joinpath(MANIFEST_FILE)
+        if manifest_path.exists():
+            return
+        with self._write_lock():
+            if not manifest_path.exists():
+                self._commit(self._initial_manifest())
+
+    def _read_manifest(self) -> Dict:
+        with open(self.root.joinpath(MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _initial_manifest(self) -> Dict:
+        manifest = {"version": 0, "next_seq": 1, "next_id": 0, "segments": [], "tombstones": {}}
+
+        # migrate global model stored as a single file once
+        legacy = None
+        if self.legacy_model_path is not None:
+            legacy_store_path = datastore.find_store_path(str(self.legacy_model_path))
+            legacy_pickle_path = legacy_store_path[: -len(".npz")] + ".pkl"
+            if datastore.exists(legacy_store_path):
+                legacy = datastore.load(legacy_store_path)
+            elif os.path.exists(legacy_pickle_path):
+                legacy = datastore.migrate(pickle_path=legacy_pickle_path, path=legacy_store_path)
+
+        if legacy is not None and len(legacy) > 0:
+            manifest["segments"].append(
+                {"seq": 0, "file": self._write_segment(0, legacy), "rows": len(legacy)})
+            manifest["next_id"] = int(legacy.ids.max()) + 1
+            logger.info(f"Migrated {len(legacy)} representations of {self.legacy_model_path}")
+        return manifest
+
+    def _commit(self, manifest: Dict) -> None:
+        manifest["version"] += 1
+        manifest_path = self.root.joinpath(MANIFEST_FILE)
+        tmp_path = self.root.joinpath(MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+
+    def _segment_path(self, segment_file: str) -> str:
+        return str(self.root.joinpath(SEGMENTS_DIR).joinpath(segment_file))
+
+    def _write_segment(self, seq: int, store: datastore.Datastore, suffix: str = "") -> str:
+        segment_file = f"segment-{seq:010d}{'-' + suffix if suffix else ''}.npz"
+        datastore.save(self._segment_path(segment_file), store)
+        return segment_file
+
+
+class _Segment:
+    """
+    Memory mapped segment of the global model and the mask of its live rows.
+    """
+
+    def __init__(self, seq: int, file: str, path: str):
+        self.seq = seq
+        self.file = file
+        self.store = datastore.load(path)
+        if self.store.face_ids is None:
+            self.store.face_ids = np.full(len(self.store), datastore.NO_FACE_ID, dtype=np.int64)
+        self.alive = np.ones(len(self.store), dtype=bool)
+        self.norms = np.linalg.norm(self.store.embeddings, axis=1)
+        self._id_order = np.argsort(self.store.ids, kind="stable")
+        self._frame: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = self.store.to_frame()
+        return self._frame
+
+    def find(self, ids: np.ndarray, alive: np.ndarray) -> np.ndarray:
+        """
+        Positions of the rows having one of the given ids and live in the given mask.
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        sorted_ids = self.store.ids[self._id_order]
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(self) - 1)
+        found = self._id_order[positions[sorted_ids[positions] == ids]]
+        return found[alive[found]]
+
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    if len(frames) == 0:
+        return datastore.from_representations([]).to_frame()
+    return pd.concat(frames)
+
+
+def find_dead_rows(
+    face_ids: Optional[np.ndarray], row_seqs: np.ndarray, tombstones: Dict[int, int]
+) -> np.ndarray:
+    """
+    Rows whose face_id was tombstoned by a later segment.
+    """
+    if face_ids is None or len(tombstones) == 0 or len(face_ids) == 0:
+        return np.zeros(len(row_seqs), dtype=bool)
+    tombstoned = np.array(sorted(tombstones.items()), dtype=np.int64)
+    positions = np.minimum(np.searchsorted(tombstoned[:, 0], face_ids), len(tombstoned) - 1)
+    tombstone_seqs = np.where(
+        tombstoned[positions, 0] == face_ids, tombstoned[positions, 1], -1)
+    return row_seqs < tombstone_seqs
+
+
+_global_models: Dict[str, GlobalFaceModel] = {}
+_global_models_lock = threading.Lock()
+
+
+def get_global_face_model(root: Path, legacy_model_path: Optional[Path] = None) -> GlobalFaceModel:
+    """
+    Process wide instance of the global face model stored in root.
+    """
+    with _global_models_lock:
+        key = str(Path(root).resolve())
+        if key not in _global_models:
+            _global_models[key] = GlobalFaceModel(root, legacy_model_path=legacy_model_path)
+        return _global_models[key]
@@ -7,7 +7,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def _start_async_load(args: Dict):
-    modeling.build_model(**args)
+    modeling.warmup(**args)
 
 
 async def load_models():
@@ -1,16 +1,15 @@
 import logging
 import os
-import pickle
 import time
 from pathlib import Path
 from typing import Optional, Union
 
 import numpy as np
-import pandas as pd
 from app.models import User, UserFaceId
+from app.modules.global_face_model import GlobalFaceModel, get_global_face_model
 
 from deepface.commons import image_utils
-from deepface.modules import detection, representation, verification
+from deepface.modules import datastore, detection, indexing, representation, verification
 from deepface.modules.recognition import __find_bulk_embeddings
 
 logger = logging.getLogger(__name__)
@@ -50,6 +49,28 @@ def get_default_model_cols():
     return df_cols
 
 
+def get_global_model() -> GlobalFaceModel:
+    global_model_dir_path = Path(get_face_id_storage_dir_path()).joinpath(
+        "models").joinpath("global")
+    return get_global_face_model(
+        global_model_dir_path, legacy_model_path=global_model_dir_path.joinpath("model1.pkl"))
+
+
+def load_model_store(model_path: Union[Path, str]) -> Optional[datastore.Datastore]:
+    """
+    Load the columnar store of a model. A legacy pickle model is migrated once.
+    Returns None if the model was never trained.
+    """
+    store_path = datastore.find_store_path(str(model_path))
+    if datastore.exists(store_path):
+        return datastore.load(store_path)
+
+    pickle_path = store_path[: -len(".npz")] + ".pkl"
+    if os.path.exists(pickle_path):
+        return datastore.migrate(pickle_path=pickle_path, path=store_path)
+    return None
+
+
 def get_exceptions_type(err: Exception):
     err_str = str(err)
     if err_str.startswith("Spoof detected in the given image"):
@@ -62,45 +83,17 @@ def get_exceptions_type(err: Exception):
 
 def save_to_global_model(
     face_obj,
-    new_representations,
+    new_store: datastore.Datastore,
     silent: bool = False
 ):
-    df_cols = get_default_model_cols()
-    global_model_dir_path = Path(get_face_id_storage_dir_path()).joinpath(
-        "models").joinpath("global")
-    global_model_file_path = global_model_dir_path.joinpath("model1.pkl")
-    if not global_model_file_path.exists():
-        global_model_dir_path.mkdir(exist_ok=True)
-        df_global = pd.DataFrame(columns=df_cols)
-        with open(global_model_file_path, "wb") as f:
-            pickle.dump(df_global, f)
-    else:
-        # Load the existing DataFrame from the pickle file
-        with open(global_model_file_path, "rb") as f:
-            df_global = pickle.load(f)
-
-    # Convert new representations to a DataFrame
-    df_new_reps = pd.DataFrame(new_representations)
+    # Representations of the face_id are appended as a new segment of the
+    # global model, the previous ones are hidden by a tombstone.
+    global_model = get_global_model()
+    global_model.replace_face_id(face_obj.id, new_store)
 
-    # Filter out any rows with the same face_id in the global model
-    df_global = df_global[df_global["face_id"] != face_obj.id]
-
-    # Log removed representations if not silent
-    removed_count = len(df_new_reps)
     if not silent:
         logger.info(
-            f"Removed existing {removed_count} representations in the global model")
-
-    # Append new representations to the global DataFrame
-    df_global = pd.concat([df_global, df_new_reps], ignore_index=True)
-
-    # Save the updated DataFrame back to the pickle file
-    with open(global_model_file_path, "wb") as f:
-        pickle.dump(df_global, f)
-
-    if not silent:
-        logger.info(
-            f"Global representations updated. Total: {len(df_global)} entries.")
+            f"Global representations updated. {len(new_store)} entries of face_id {face_obj.id}.")
 
 
 def train_face_id_recognition(
@@ -113,6 +106,8 @@ def train_face_id_recognition(
         threshold: Optional[float] = None,
         normalization: str = "base",
         silent: bool = False,
+        batch_size: int = 32,
+        workers: int = 1,
 ):
     tic = time.time()
 
@@ -131,31 +126,13 @@ def train_face_id_recognition(
         str(expand_percentage),
     ]
 
-    representations = []
-
-    df_cols = get_default_model_cols()
-
-    # Ensure the proper pickle file exists
-    if not model_path.exists():
-        with open(str(model_path), "wb") as f:
-            pickle.dump([], f)
-
-    # Load the representations from the pickle file
-    with open(str(model_path), "rb") as f:
-        representations = pickle.load(f)
-
-    # check each item of representations list has required keys
-    for i, current_representation in enumerate(representations):
-        missing_keys = set(df_cols) - set(current_representation.keys())
-        if len(missing_keys) > 0:
-            raise ValueError(
-                f"{i}-th item does not have some required keys - {missing_keys}."
-                f"Consider to delete {model_path}"
-            )
+    # Load the representations of the user, migrate legacy pickle model once
+    store = load_model_store(model_path)
+    if store is None:
+        store = datastore.from_representations([])
 
-        # embedded images
-    pickled_images = [representation["identity"]
-                      for representation in representations]
+    # embedded images
+    stored_images = dict(zip(store.identities.tolist(), store.hashes.tolist()))
 
     # Get the list of images on storage
     image_storage_path = generate_input_img_path(face_obj.user_id)
@@ -165,21 +142,19 @@ def train_face_id_recognition(
     if len(storage_images) == 0:
         raise ValueError(f"No item found in {image_storage_path}")
 
-    must_save_pickle = True
+    must_save_model = True
     new_images, old_images, replaced_images = set(), set(), set()
 
-    # Enforce data consistency amongst on disk images and pickle file
+    # Enforce data consistency amongst on disk images and stored model
     new_images = set(storage_images) - \
-        set(pickled_images)  # images added to storage
+        set(stored_images)  # images added to storage
     # images removed from storage
-    old_images = set(pickled_images) - set(storage_images)
+    old_images = set(stored_images) - set(storage_images)
 
     # detect replaced images
-    for current_representation in representations:
-        identity = current_representation["identity"]
+    for identity, alpha_hash in stored_images.items():
         if identity in old_images:
             continue
-        alpha_hash = current_representation["hash"]
         beta_hash = image_utils.find_image_hash(identity)
         if alpha_hash != beta_hash:
             logger.debug(
@@ -199,9 +174,8 @@ def train_face_id_recognition(
 
     # remove old images first
     if len(old_images) > 0:
-        representations = [
-            rep for rep in representations if rep["identity"] not in old_images]
-        must_save_pickle = True
+        store = store.select(~np.isin(store.identities, list(old_images)))
+        must_save_model = True
 
     # find representations for new images
     if len(new_images) > 0:
@@ -214,25 +188,29 @@ def train_face_id_recognition(
             expand_percentage=expand_percentage,
             normalization=normalization,
             silent=silent,
+            batch_size=batch_size,
+            # more than 1 worker keeps a detection process pool, meant for bulk re-indexing
+            workers=workers,
         )
         for i in new_repr:
             i.update({"face_id": face_obj.id})
-        representations += new_repr  # add new images
-        must_save_pickle = True
+        # add new images
+        store = datastore.concat([store, datastore.from_representations(new_repr)])
+        must_save_model = True
 
-    if must_save_pickle:
-        with open(str(model_path), "wb") as f:
-            pickle.dump(representations, f)
+    if must_save_model:
+        store.ids = np.arange(len(store), dtype=np.int64)
+        datastore.save(datastore.find_store_path(str(model_path)), store)
         if not silent:
             logger.info(
-                f"There are now {len(representations)} representations in {model_path}")
-        save_to_global_model(face_obj, representations, silent=silent,)
+                f"There are now {len(store)} representations in {model_path}")
+        save_to_global_model(face_obj, store, silent=silent,)
 
     toc = time.time()
     duration = toc - tic
 
     # Should we have no representations bailout
-    if len(representations) == 0:
+    if len(store) == 0:
         if not silent:
             logger.info(f"find function duration {duration} seconds")
         return []
@@ -240,7 +218,7 @@ def train_face_id_recognition(
     stats = {
         "train": {
             "duration": duration,
-            "must_save_pickle": must_save_pickle,
+            "must_save_pickle": must_save_model,
         }
     }
     return stats
@@ -278,31 +256,18 @@ def verify_face_id_recognition(
         str(expand_percentage),
     ]
 
-    representations = []
-
-    # required columns for representations
-    df_cols = get_default_model_cols()
-
-    # Ensure the proper pickle file exists
-    if not model_path.exists():
+    # Load the representations of the user, migrate legacy pickle model once
+    store = load_model_store(model_path)
+    if store is None:
         raise ValueError(f"Passed path {model_path} does not exist!")
 
-    # Load the representations from the pickle file
-    with open(str(model_path), "rb") as f:
-        representations = pickle.load(f)
-
-    # check each item of representations list has required keys
-    for i, current_representation in enumerate(representations):
-        missing_keys = set(df_cols) - set(current_representation.keys())
-        if len(missing_keys) > 0:
-            raise ValueError(
-                f"{i}-th item does not have some required keys - {missing_keys}."
-                f"Consider to delete {model_path}"
-            )
-
     # ----------------------------
     # now, we got representations for facial database
-    df = pd.DataFrame(representations)
+    df = store.to_frame()
+    index = indexing.build_index(distance_metric=distance_metric)
+    if store.valid_rows.any():
+        index.add(ids=store.ids[store.valid_rows],
+                  embeddings=store.embeddings[store.valid_rows])
 
     # img path might have more than once face
     source_objs = detection.extract_faces(
@@ -333,48 +298,20 @@ def verify_face_id_recognition(
 
         target_representation = target_embedding_obj[0]["embedding"]
 
-        result_df = df.copy()  # df will be filtered in each img
+        target_threshold = threshold or verification.find_threshold(
+            model_name, distance_metric)
+
+        ids, distances = index.search(
+            target_representation, threshold=target_threshold)
+
+        result_df = df.loc[ids].reset_index(drop=True)
         result_df["source_x"] = source_region["x"]
         result_df["source_y"] = source_region["y"]
         result_df["source_w"] = source_region["w"]
         result_df["source_h"] = source_region["h"]
-
-        distances = []
-        for _, instance in df.iterrows():
-            source_representation = instance["embedding"]
-            if source_representation is None:
-                # no representation for this image
-                distances.append(float("inf"))
-                continue
-
-            target_dims = len(list(target_representation))
-            source_dims = len(list(source_representation))
-            if target_dims != source_dims:
-                raise ValueError(
-                    "Source and target embeddings must have same dimensions but "
-                    + f"{target_dims}:{source_dims}. Model structure may change"
-                    + " after pickle created. Delete the {file_name} and re-run."
-                )
-
-            distance = verification.find_distance(
-                source_representation, target_representation, distance_metric
-            )
-
-            distances.append(distance)
-
-            # ---------------------------
-        target_threshold = threshold or verification.find_threshold(
-            model_name, distance_metric)
-
         result_df["threshold"] = target_threshold
         result_df["distance"] = distances
 
-        result_df = result_df.drop(columns=["embedding"])
-        # pylint: disable=unsubscriptable-object
-        result_df = result_df[result_df["distance"] <= target_threshold]
-        result_df = result_df.sort_values(
-            by=["distance"], ascending=True).reset_index(drop=True)
-
         resp_obj.append(result_df)
 
     # -----------------------------------
@@ -408,36 +345,15 @@ def auth_face_id_recognition(
         normalization: str = "base",
         silent: bool = False,
         anti_spoofing: bool = False,
+        top_k: Optional[int] = None,
+        index_type: str = "flat",
 ):
     tic = time.time()
 
-    representations = []
-
-    # required columns for representations
-    df_cols = get_default_model_cols()
-    model_path = Path(get_face_id_storage_dir_path()).joinpath(
-        "models").joinpath("global").joinpath("model1.pkl")
-
-    # Ensure the proper pickle file exists
-    if not model_path.exists():
-        raise ValueError(f"Passed path {model_path} does not exist!")
-
-    # Load the representations from the pickle file
-    with open(str(model_path), "rb") as f:
-        representations = pickle.load(f)
-
-    # # check each item of representations list has required keys
-    # for i, current_representation in enumerate(representations):
-    #     missing_keys = set(df_cols) - set(current_representation.keys())
-    #     if len(missing_keys) > 0:
-    #         raise ValueError(
-    #             f"{i}-th item does not have some required keys - {missing_keys}."
-    #             f"Consider to delete {model_path}"
-    #         )
-
-    # ----------------------------
-    # now, we got representations for facial database
-    df = pd.DataFrame(representations)
+    # Load the global model, new registrations are applied incrementally
+    global_model = get_global_model()
+    if len(global_model) == 0:
+        raise ValueError(f"No item found in {global_model.root}")
 
     # img path might have more than once face
     source_objs = detection.extract_faces(
@@ -468,48 +384,25 @@ def auth_face_id_recognition(
 
         target_representation = target_embedding_obj[0]["embedding"]
 
-        result_df = df.copy()  # df will be filtered in each img
+        target_threshold = threshold or verification.find_threshold(
+            model_name, distance_metric)
+
+        matched_df, distances = global_model.search(
+            target_representation,
+            k=top_k,
+            threshold=target_threshold,
+            index_type=index_type,
+            distance_metric=distance_metric,
+        )
+
+        result_df = matched_df.reset_index(drop=True)
         result_df["source_x"] = source_region["x"]
         result_df["source_y"] = source_region["y"]
         result_df["source_w"] = source_region["w"]
         result_df["source_h"] = source_region["h"]
-
-        distances = []
-        for _, instance in df.iterrows():
-            source_representation = instance["embedding"]
-            if source_representation is None:
-                # no representation for this image
-                distances.append(float("inf"))
-                continue
-
-            target_dims = len(list(target_representation))
-            source_dims = len(list(source_representation))
-            if target_dims != source_dims:
-                raise ValueError(
-                    "Source and target embeddings must have same dimensions but "
-                    + f"{target_dims}:{source_dims}. Model structure may change"
-                    + " after pickle created. Delete the {file_name} and re-run."
-                )
-
-            distance = verification.find_distance(
-                source_representation, target_representation, distance_metric
-            )
-
-            distances.append(distance)
-
-            # ---------------------------
-        target_threshold = threshold or verification.find_threshold(
-            model_name, distance_metric)
-
         result_df["threshold"] = target_threshold
         result_df["distance"] = distances
 
-        result_df = result_df.drop(columns=["embedding"])
-        # pylint: disable=unsubscriptable-object
-        result_df = result_df[result_df["distance"] <= target_threshold]
-        result_df = result_df.sort_values(
-            by=["distance"], ascending=True).reset_index(drop=True)
-
         resp_obj.append(result_df)
 
     # -----------------------------------
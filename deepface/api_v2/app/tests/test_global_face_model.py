@@ -0,0 +1,164 @@
+import json
+import multiprocessing as mp
+import pickle
+
+import numpy as np
+
+from app.modules import global_face_model
+from app.modules.global_face_model import GlobalFaceModel
+
+from deepface.modules import datastore, verification
+
+DIMENSIONS = 8
+
+
+def build_store(face_id: int, embeddings: np.ndarray) -> datastore.Datastore:
+    return datastore.from_representations([
+        {
+            "identity": f"user_{face_id}/img{i}.jpg",
+            "face_id": face_id,
+            "hash": f"{face_id}-{i}",
+            "embedding": embedding.tolist(),
+            "target_x": 0,
+            "target_y": 0,
+            "target_w": 10,
+            "target_h": 10,
+        }
+        for i, embedding in enumerate(embeddings)
+    ])
+
+
+def random_embeddings(seed: int, count: int = 2) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIMENSIONS)).astype(np.float32)
+
+
+def read_manifest(root) -> dict:
+    with open(root.joinpath(global_face_model.MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_replaced_and_removed_face_ids_are_hidden(tmp_path):
+    model = GlobalFaceModel(tmp_path)
+    old_embeddings, new_embeddings = random_embeddings(0), random_embeddings(1)
+    model.replace_face_id(1, build_store(1, old_embeddings))
+    model.replace_face_id(2, build_store(2, random_embeddings(2)))
+    assert len(model) == 4
+
+    reader = GlobalFaceModel(tmp_path)
+    assert len(reader) == 4
+
+    model.replace_face_id(1, build_store(1, new_embeddings))
+    df, distances = reader.search(old_embeddings[0], threshold=2)
+    assert len(reader) == 4
+    assert len(df) == 4
+    assert distances.min() > 1e-6
+    assert set(df[df["face_id"] == 1]["hash"]) == {"1-0", "1-1"}
+
+    df, distances = reader.search(new_embeddings[0], k=1)
+    assert list(df["face_id"]) == [1]
+    assert distances[0] < 1e-6
+
+    model.remove_face_id(1)
+    assert set(reader.get_frame()["face_id"]) == {2}
+    df, _ = reader.search(new_embeddings[0], threshold=2, index_type="ivf")
+    assert set(df["face_id"]) == {2}
+
+    # flat index is searched on memory mapped segments and never persisted
+    assert not any(path.name.endswith("_index_flat_cosine.npz") for path in tmp_path.iterdir())
+
+
+def test_flat_search_matches_pairwise_distances(tmp_path):
+    model = GlobalFaceModel(tmp_path)
+    embeddings = {face_id: random_embeddings(face_id, count=3) for face_id in range(5)}
+    for face_id, face_embeddings in embeddings.items():
+        model.replace_face_id(face_id, build_store(face_id, face_embeddings))
+    target = random_embeddings(42, count=1)[0]
+
+    for distance_metric in ["cosine", "euclidean", "euclidean_l2"]:
+        df, distances = model.search(target, threshold=100, distance_metric=distance_metric)
+        expected = sorted(
+            verification.find_distance(embedding, target, distance_metric)
+            for face_embeddings in embeddings.values()
+            for embedding in face_embeddings
+        )
+        assert len(df) == 15
+        assert np.allclose(distances, expected, atol=1e-5)
+
+
+def test_compaction_keeps_face_ids_tombstoned_after_snapshot(tmp_path, monkeypatch):
+    model = GlobalFaceModel(tmp_path)
+    for face_id in range(3):
+        model.replace_face_id(face_id, build_store(face_id, random_embeddings(face_id)))
+    model.replace_face_id(0, build_store(0, random_embeddings(10)))
+
+    # another writer removes face_id 1 while the merged segment is being written
+    writer = GlobalFaceModel(tmp_path)
+    write_segment = model._write_segment
+
+    def write_segment_concurrently(*args, **kwargs):
+        segment_file = write_segment(*args, **kwargs)
+        writer.remove_face_id(1)
+        return segment_file
+
+    monkeypatch.setattr(model, "_write_segment", write_segment_concurrently)
+    model.compact()
+
+    manifest = read_manifest(tmp_path)
+    assert len(manifest["segments"]) == 1
+    assert list(manifest["tombstones"]) == ["1"]
+
+    reader = GlobalFaceModel(tmp_path)
+    assert len(reader) == 4
+    assert set(reader.get_frame()["face_id"]) == {0, 2}
+    assert set(reader.get_frame()[reader.get_frame()["face_id"] == 0]["hash"]) == {"0-0", "0-1"}
+
+    # readers that loaded segments before the compaction switch to the merged one
+    assert len(model) == 4
+    assert set(model.get_frame()["face_id"]) == {0, 2}
+
+
+def test_legacy_model_is_migrated(tmp_path):
+    legacy_model_path = tmp_path.joinpath("model1.pkl")
+    representations = (
+        build_store(7, random_embeddings(7)).to_representations()
+        + build_store(8, random_embeddings(8)).to_representations()
+    )
+    with open(legacy_model_path, "wb") as f:
+        pickle.dump(representations, f)
+
+    model = GlobalFaceModel(tmp_path, legacy_model_path=legacy_model_path)
+    assert len(model) == 4
+    assert sorted(model.get_frame()["face_id"]) == [7, 7, 8, 8]
+
+    # ids of migrated rows are not reused by later registrations
+    model.replace_face_id(7, build_store(7, random_embeddings(9)))
+    assert len(model) == 4
+    assert sorted(model.get_frame().index) == [2, 3, 4, 5]
+    assert read_manifest(tmp_path)["segments"][0]["seq"] == 0
+
+
+def register_face_ids(root, face_ids) -> None:
+    model = GlobalFaceModel(root, max_segments=4)
+    for face_id in face_ids:
+        model.replace_face_id(face_id, build_store(face_id, random_embeddings(face_id)))
+    model.compact()
+
+
+def test_writers_in_different_processes_commit_concurrently(tmp_path):
+    context = mp.get_context("spawn")
+    processes = [
+        context.Process(target=register_face_ids, args=(tmp_path, range(start, 40, 2)))
+        for start in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=300)
+        assert process.exitcode == 0
+
+    model = GlobalFaceModel(tmp_path)
+    frame = model.get_frame()
+    assert len(model) == 80
+    assert sorted(set(frame["face_id"])) == list(range(40))
+    assert frame.index.is_unique
+    assert read_manifest(tmp_path)["next_id"] == 80
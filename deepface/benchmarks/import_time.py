@@ -0,0 +1,140 @@
+"""
+Cold-start import time of deepface and of the api_v2 and faceapi services.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --save benchmarks/import_time.json
+    python benchmarks/import_time.py --baseline benchmarks/import_time.json --tolerance 0.2
+
+Every target is imported in a fresh interpreter under `python -X importtime`, the best of
+a few runs is kept. With a baseline, the script exits with 1 if a target becomes slower than
+the tolerance allows or starts importing a heavy module it did not import before.
+"""
+
+# built-in dependencies
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target name -> (module to import, working directory app.main is served from)
+TARGETS = {
+    "deepface": ("deepface.DeepFace", REPO),
+    "api_v2": ("app.main", os.path.join(REPO, "api_v2")),
+    "faceapi": ("app.main", os.path.join(os.path.dirname(REPO), "faceapi")),
+}
+
+# heavy modules whose import at start-up is reported
+WATCHED = ["tensorflow", "torch", "keras", "tf_keras", "mtcnn", "retinaface", "ultralytics"]
+
+
+def measure(module: str, cwd: str) -> Tuple[float, Dict[str, float], Set[str]]:
+    """
+    Import a module in a fresh interpreter
+    Args:
+        module (str): module to import
+        cwd (str): working directory of the interpreter
+    Returns:
+        total (float): cumulative import time in seconds
+        modules (dict): cumulative import time of each top level import in seconds
+        packages (set): root packages of every imported module
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([cwd, REPO, env.get("PYTHONPATH", "")])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    modules: Dict[str, float] = {}
+    packages: Set[str] = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        packages.add(package)
+        # nested imports are indented further than top level ones
+        if not name.startswith("  "):
+            modules[package] = modules.get(package, 0) + int(cumulative) / 1e6
+    return sum(modules.values()), modules, packages
+
+
+def benchmark(targets: List[str], runs: int) -> Dict[str, Dict]:
+    report = {}
+    for target in targets:
+        module, cwd = TARGETS[target]
+        best_total, best_modules, best_packages = None, {}, set()
+        for _ in range(runs):
+            total, modules, packages = measure(module, cwd)
+            if best_total is None or total < best_total:
+                best_total, best_modules, best_packages = total, modules, packages
+        heaviest = sorted(best_modules.items(), key=lambda item: item[1], reverse=True)
+        report[target] = {
+            "seconds": best_total,
+            "watched": sorted(name for name in WATCHED if name in best_packages),
+            "heaviest": dict(heaviest[:10]),
+        }
+    return report
+
+
+def compare(report: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    regressions = []
+    for target, result in report.items():
+        if target not in baseline:
+            continue
+        limit = baseline[target]["seconds"] * (1 + tolerance)
+        if result["seconds"] > limit:
+            regressions.append(
+                f"{target} imports in {result['seconds']:.2f}s,"
+                f" more than {limit:.2f}s allowed by the baseline"
+            )
+        for name in set(result["watched"]) - set(baseline[target]["watched"]):
+            regressions.append(f"{target} imports {name} at start-up")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS.keys()), choices=TARGETS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--save", default=None, help="store the report as a baseline")
+    parser.add_argument("--baseline", default=None, help="fail on regressions against it")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = benchmark(args.targets, args.runs)
+    for target, result in report.items():
+        watched = ", ".join(result["watched"]) or "none"
+        print(f"{target:>10}: {result['seconds']:.2f}s, heavy modules: {watched}")
+        for name, seconds in result["heaviest"].items():
+            print(f"{'':>12}{name:<24}{seconds:.3f}s")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Recall vs latency benchmark of approximate nearest neighbour indexes against the exact search.
+
+Usage:
+    python benchmarks/index_search.py --size 100000 --dimensions 512
+    python benchmarks/index_search.py --datastore /path/to/ds_model_vggface_..._expand_0.npz
+
+Synthetic galleries mimic face datastores: embeddings are sampled around identity centers,
+so queries have a few close neighbours and many far ones.
+"""
+
+# built-in dependencies
+import argparse
+import time
+from typing import List, Tuple
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.modules import datastore, indexing
+
+
+def load_gallery(args: argparse.Namespace) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    if args.datastore:
+        store = datastore.load(args.datastore)
+        embeddings = np.asarray(store.embeddings[store.valid_rows], dtype=np.float32)
+        queries = embeddings[rng.choice(embeddings.shape[0], args.queries)]
+        queries = queries + args.noise * queries.std() * rng.normal(size=queries.shape)
+        return embeddings, queries.astype(np.float32)
+
+    identities = max(1, args.size // args.samples_per_identity)
+    centers = rng.normal(size=(identities, args.dimensions)).astype(np.float32)
+    embeddings = centers[rng.integers(0, identities, args.size)]
+    embeddings = embeddings + args.noise * rng.normal(size=embeddings.shape)
+    queries = centers[rng.integers(0, identities, args.queries)]
+    queries = queries + args.noise * rng.normal(size=queries.shape)
+    return embeddings.astype(np.float32), queries.astype(np.float32)
+
+
+def evaluate(
+    index: indexing.Index, queries: np.ndarray, truth: List[np.ndarray], k: int
+) -> Tuple[float, float]:
+    recalls, durations = [], []
+    for query, expected in zip(queries, truth):
+        tic = time.perf_counter()
+        ids, _ = index.search(query, k=k)
+        durations.append(time.perf_counter() - tic)
+        recalls.append(len(np.intersect1d(ids, expected)) / len(expected))
+    return float(np.mean(recalls)), float(np.median(durations)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument("--datastore", default=None, help="datastore created by DeepFace.find")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--samples-per-identity", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default="cosine", choices=indexing.AVAILABLE_METRICS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    embeddings, queries = load_gallery(args)
+    ids = np.arange(embeddings.shape[0])
+    print(f"gallery: {embeddings.shape[0]} x {embeddings.shape[1]}, queries: {len(queries)}")
+
+    flat = indexing.build_index("flat", distance_metric=args.metric)
+    flat.add(ids, embeddings)
+    truth = [flat.search(query, k=args.k)[0] for query in queries]
+
+    configurations = [("flat", {})]
+    configurations += [("ivf", {"n_probe": n_probe}) for n_probe in (4, 8, 16, 32, 64)]
+    configurations += [("hnsw", {"ef_search": ef_search}) for ef_search in (16, 32, 64, 128)]
+
+    print(f"{'index':<8}{'params':<18}{'build (s)':>10}{f'recall@{args.k}':>12}{'p50 (ms)':>10}")
+    for index_type, params in configurations:
+        try:
+            index = indexing.build_index(index_type, distance_metric=args.metric, **params)
+        except ImportError as err:
+            print(f"{index_type:<8}skipped: {err}")
+            continue
+        tic = time.perf_counter()
+        index.add(ids, embeddings)
+        build_duration = time.perf_counter() - tic
+        recall, latency = evaluate(index, queries, truth, args.k)
+        params_str = ",".join(f"{key}={value}" for key, value in params.items())
+        print(
+            f"{index_type:<8}{params_str:<18}{build_duration:>10.2f}"
+            f"{recall:>12.3f}{latency:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
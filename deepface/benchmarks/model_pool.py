@@ -0,0 +1,99 @@
+"""
+Throughput of the faceapi anti-spoofing check served by threads or by a pool of processes.
+
+Usage:
+    python benchmarks/model_pool.py --processes 4 --clients 32
+    python benchmarks/model_pool.py --processes 0 --clients 32
+
+Every client runs detection then spoofing prediction on an image in a loop, the way
+anti_spoof_check does, all clients share one event loop like the websocket handlers do. With 0
+processes the models run in FaceDetectorWorker and SpoofingDetectorWorker threads of this
+process, otherwise in a ModelPool. Setting up the pool loads the models in every process, the
+first round of requests is not measured.
+"""
+
+# built-in dependencies
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# 3rd party dependencies
+import cv2
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACEAPI = os.path.join(os.path.dirname(REPO), "faceapi")
+sys.path.insert(0, FACEAPI)
+
+# pylint: disable=wrong-import-position
+from app.modules.antispoof.library.task_manager import (
+    FaceDetectorWorker,
+    ModelPool,
+    SpoofingDetectorWorker,
+    stop_worker,
+)
+
+
+async def check(face_detector, spoofing_detector, image) -> int:
+    faces = await face_detector(image)
+    boxes = [box.tolist() for box, _, _ in faces]
+    if boxes:
+        await spoofing_detector(boxes, image)
+    return len(boxes)
+
+
+async def run(face_detector, spoofing_detector, image, clients: int, rounds: int) -> float:
+    await asyncio.gather(*[check(face_detector, spoofing_detector, image) for _ in range(clients)])
+
+    async def client():
+        for _ in range(rounds):
+            await check(face_detector, spoofing_detector, image)
+
+    tic = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    return clients * rounds / (time.perf_counter() - tic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument("--weights", default=os.path.join(FACEAPI, "weights"))
+    parser.add_argument("--image", default=os.path.join(REPO, "tests", "dataset", "couple.jpg"))
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per process")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    image = cv2.cvtColor(cv2.imread(args.image), cv2.COLOR_BGR2RGB)
+    detector_kwargs = {
+        "model_path": os.path.join(args.weights, "retina_face.pth.tar"),
+        "detect_threshold": 0.95,
+        "scale_size": 720,
+    }
+    spoofing_kwargs = {"model_path": os.path.join(args.weights, "fasnet_v1se_v2.pth.tar")}
+
+    if args.processes > 0:
+        pool = ModelPool(args.processes, detector_kwargs, spoofing_kwargs, num_threads=args.threads)
+        workers = [pool]
+        face_detector, spoofing_detector = pool.face_detector, pool.spoofing_detector
+    else:
+        face_detector = FaceDetectorWorker(**detector_kwargs)
+        spoofing_detector = SpoofingDetectorWorker(**spoofing_kwargs)
+        workers = [face_detector, spoofing_detector]
+
+    for worker in workers:
+        worker.start()
+    try:
+        throughput = asyncio.run(
+            run(face_detector, spoofing_detector, image, args.clients, args.rounds)
+        )
+    finally:
+        stop_worker(*workers)
+
+    mode = f"{args.processes} processes" if args.processes > 0 else "threads"
+    print(f"{mode}, {args.clients} clients: {throughput:.1f} checks/s")
+
+
+if __name__ == "__main__":
+    main()
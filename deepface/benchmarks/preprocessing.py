@@ -0,0 +1,81 @@
+"""
+Latency of preparing detected faces for a facial recognition model.
+
+Usage:
+    python benchmarks/preprocessing.py --size 160 --normalization Facenet
+
+The chained path is the one represent used to follow: extract_faces scales the uint8 crop
+into float64 rgb, represent flips it back to bgr, resize_image resizes, pads and scales it
+and normalize_input brings it back to [0, 255]. The fused path is preprocessing.prepare_face
+writing the uint8 crop into a reused float32 buffer.
+"""
+
+# built-in dependencies
+import argparse
+import time
+from typing import Callable, List
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.modules import preprocessing
+
+
+def chained(crops: List[np.ndarray], size: int, normalization: str) -> np.ndarray:
+    batch = []
+    for crop in crops:
+        face = crop[:, :, ::-1] / 255
+        img = preprocessing.resize_image(img=face[:, :, ::-1], target_size=(size, size))
+        batch.append(preprocessing.normalize_input(img=img, normalization=normalization))
+    return np.concatenate(batch, axis=0)
+
+
+def fused(crops: List[np.ndarray], size: int, normalization: str, out: np.ndarray) -> np.ndarray:
+    for crop, face in zip(crops, out):
+        preprocessing.prepare_face(
+            img=crop, target_size=(size, size), normalization=normalization, out=face
+        )
+    return out
+
+
+def measure(func: Callable[[], np.ndarray], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - tic)
+    return float(np.median(durations)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument("--faces", type=int, default=32)
+    parser.add_argument("--crop", type=int, default=240, help="side of detected crops")
+    parser.add_argument("--size", type=int, default=160, help="input size of the model")
+    parser.add_argument("--normalization", default="base")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    crops = [
+        rng.integers(0, 256, (args.crop + i % 7, args.crop - i % 5, 3), dtype=np.uint8)
+        for i in range(args.faces)
+    ]
+    out = np.empty((args.faces, args.size, args.size, 3), dtype=np.float32)
+
+    expected = chained(crops, args.size, args.normalization)
+    actual = fused(crops, args.size, args.normalization, out)
+    error = float(np.abs(expected - actual).max())
+
+    chained_ms = measure(lambda: chained(crops, args.size, args.normalization), args.repeat)
+    fused_ms = measure(lambda: fused(crops, args.size, args.normalization, out), args.repeat)
+    print(f"{args.faces} faces of {args.crop}px into {args.size}px, {args.normalization}")
+    print(f"chained: {chained_ms:.2f} ms, {chained_ms / args.faces:.3f} ms per face")
+    print(f"  fused: {fused_ms:.2f} ms, {fused_ms / args.faces:.3f} ms per face")
+    print(f"speedup: {chained_ms / fused_ms:.2f}x, max abs difference: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Latency of the faceapi RetinaFace post-processing on crowded images.
+
+Usage:
+    python benchmarks/retinaface_decode.py --faces 150 --height 720 --width 1280
+
+Model outputs of a crowded image are simulated: priors around every face get a high score and
+slightly jittered offsets, so each face leaves a cluster of overlapping candidates like the
+network does. The reference path is the one RetinaFace.decode used to follow: all priors are
+decoded before thresholding, top-k is a full argsort, NMS runs on stacked detections and the
+boundary and size filters loop over faces in Python. Its size filter is applied together with
+the size order here, the way decode applies it now, so both paths must return the same faces.
+"""
+
+# built-in dependencies
+import argparse
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable
+
+# 3rd party dependencies
+import numpy as np
+import torch
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACEAPI = os.path.join(os.path.dirname(REPO), "faceapi")
+sys.path.insert(0, FACEAPI)
+
+# pylint: disable=wrong-import-position
+from app.modules.antispoof.library.face_detector.detector import RetinaFace
+from app.modules.antispoof.library.models.retina_face import (
+    PriorBox,
+    cfg_mnet,
+    decode,
+    decode_landm,
+    py_cpu_nms,
+)
+from app.modules.antispoof.library.utils.vector import euclidean_distance
+
+
+def reference(retina_face: RetinaFace, locations, confident, landms, threshold, top=500):
+    variance = retina_face.model.cfg["variance"]
+    boxes = decode(locations.data.squeeze(0), retina_face.prior_data, variance)
+    boxes = (boxes * retina_face.box_scale).numpy()
+    scores = confident.squeeze(0).data[:, 1].numpy()
+    landms = decode_landm(landms.data.squeeze(0), retina_face.prior_data, variance)
+    landms = (landms * retina_face.landmark_scale).numpy()
+
+    inds = scores > threshold
+    boxes, landms, scores = boxes[inds], landms[inds], scores[inds]
+
+    order = scores.argsort()[::-1][:top]
+    boxes, landms, scores = boxes[order], landms[order], scores[order]
+
+    dets = np.hstack((boxes, scores[:, np.newaxis])).astype(np.float32, copy=False)
+    keep = py_cpu_nms(dets, 0.3)
+    faces = np.concatenate((dets[keep, :][:top], landms[keep][:top]), axis=1)
+
+    faces = faces[[np.any((face[:4] >= 0) & (face[:4] < 5000)) for face in faces]]
+    faces_size = np.array([euclidean_distance(face[:2], face[2:4]) for face in faces])
+    faces = faces[faces_size > 24]
+    order = np.argsort(faces_size[faces_size > 24])[::-1]
+    return faces[order]
+
+
+def crowded_outputs(height: int, width: int, faces: int, seed: int):
+    rng = np.random.default_rng(seed)
+    priors = PriorBox(cfg_mnet)((height, width), "cpu").numpy()
+    num_priors = priors.shape[0]
+
+    scores = rng.uniform(0, 0.5, num_priors).astype(np.float32)
+    centers = rng.uniform(0.05, 0.95, (faces, 2))
+    sizes = rng.uniform(24, 160, faces) / max(height, width)
+    for center, size in zip(centers, sizes):
+        near = np.all(np.abs(priors[:, :2] - center) < size / 2, axis=1)
+        near &= np.abs(priors[:, 2] - size) < size
+        scores[near] = rng.uniform(0.9, 1.0, np.count_nonzero(near))
+
+    locations = rng.normal(0, 0.3, (1, num_priors, 4)).astype(np.float32)
+    confident = np.stack([1 - scores, scores], axis=1)[np.newaxis]
+    landms = rng.normal(0, 0.3, (1, num_priors, 10)).astype(np.float32)
+    return torch.from_numpy(locations), torch.from_numpy(confident), torch.from_numpy(landms)
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - tic)
+    return float(np.median(durations)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument("--faces", type=int, default=150)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # weights do not matter for post-processing, the model is left untrained
+    retina_face = RetinaFace.__new__(RetinaFace)
+    retina_face.model = type("Model", (), {"cfg": cfg_mnet})()
+    retina_face.prior_box = PriorBox(cfg_mnet)
+    retina_face.device = "cpu"
+    retina_face.image_size = None
+    retina_face.prior_cache = OrderedDict()
+    retina_face.prior_cache_size = 8
+    retina_face.update_prior((args.height, args.width))
+
+    outputs = crowded_outputs(args.height, args.width, args.faces, args.seed)
+    candidates = int(np.count_nonzero(outputs[1][0, :, 1].numpy() > args.threshold))
+
+    expected = reference(retina_face, *outputs, args.threshold)
+    actual = retina_face.decode(*outputs, args.threshold)
+    same = expected.shape == actual.shape and np.allclose(expected, actual)
+
+    reference_ms = measure(lambda: reference(retina_face, *outputs, args.threshold), args.repeat)
+    decode_ms = measure(lambda: retina_face.decode(*outputs, args.threshold), args.repeat)
+    print(
+        f"{args.faces} faces in {args.width}x{args.height}, {candidates} candidates,"
+        f" {len(actual)} kept"
+    )
+    print(f"reference: {reference_ms:.2f} ms")
+    print(f"   decode: {decode_ms:.2f} ms, speedup {reference_ms / decode_ms:.2f}x")
+    print(f"same faces: {same}")
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Accuracy parity and latency of the faceapi spoofing detector.
+
+Usage:
+    python benchmarks/spoofing.py --faces 8
+    python benchmarks/spoofing.py --image tests/dataset/couple.jpg --int8-tolerance 0.05
+
+The reference path is the one SpoofingDetector used to follow: every box is cropped, converted
+and resized through a Transform chain into a tensor of its own scale, then MulFasNet runs its
+two backbones one after another and accumulates their softmax scores in float64. It is compared
+with the fused path in eager mode, traced into TorchScript and with int8 dynamic quantization.
+The script exits with 1 if a mode disagrees with the reference on any label or its scores drift
+more than the tolerance.
+"""
+
+# built-in dependencies
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Sequence
+
+# 3rd party dependencies
+import cv2
+import numpy as np
+import torch
+from torch.nn.functional import softmax
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACEAPI = os.path.join(os.path.dirname(REPO), "faceapi")
+sys.path.insert(0, FACEAPI)
+
+# pylint: disable=wrong-import-position
+from app.modules.antispoof.library.face_antspoofing.detector import SpoofingDetector
+from app.modules.antispoof.library.utils.transform import Transform, resize
+from app.modules.antispoof.library.utils.util import scale_box
+
+
+def reference(detector: SpoofingDetector, boxes: Sequence[Sequence[int]], image: np.ndarray):
+    transform = Transform(
+        [
+            lambda x: cv2.cvtColor(x, cv2.COLOR_RGB2BGR),
+            resize(*detector.face_size),
+            lambda x: torch.from_numpy(x.transpose((2, 0, 1))).float(),
+        ]
+    )
+    height, width = image.shape[:2]
+    faces_scale = []
+    for scale in detector.model.max_scale:
+        face_tensor = torch.zeros(len(boxes), 3, *detector.face_size, dtype=torch.float32)
+        for idx, box in enumerate(boxes):
+            box_scaled = scale_box(width, height, box, scale)
+            face_img = image[box_scaled[1] : box_scaled[3], box_scaled[0] : box_scaled[2]]
+            face_tensor[idx] = transform(face_img)
+        faces_scale.append(face_tensor)
+
+    predict = torch.zeros(len(boxes), 3, dtype=torch.float64)
+    with torch.no_grad():
+        for model, images in zip(detector.model.models, faces_scale):
+            predict += softmax(model(images), dim=1)
+    return predict.numpy()
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - tic)
+    return float(np.median(durations)) * 1000
+
+
+def random_boxes(image: np.ndarray, faces: int, seed: int) -> List[List[int]]:
+    rng = np.random.default_rng(seed)
+    height, width = image.shape[:2]
+    boxes = []
+    for _ in range(faces):
+        side = int(rng.integers(min(height, width) // 8, min(height, width) // 2))
+        x = int(rng.integers(0, width - side))
+        y = int(rng.integers(0, height - side))
+        boxes.append([x, y, x + side, y + side])
+    return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=2)[1])
+    parser.add_argument(
+        "--model", default=os.path.join(FACEAPI, "weights", "fasnet_v1se_v2.pth.tar")
+    )
+    parser.add_argument("--image", default=os.path.join(REPO, "tests", "dataset", "img1.jpg"))
+    parser.add_argument("--faces", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    parser.add_argument("--int8-tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    image = cv2.cvtColor(cv2.imread(args.image), cv2.COLOR_BGR2RGB)
+    boxes = random_boxes(image, args.faces, args.seed)
+
+    baseline = SpoofingDetector(args.model)
+    expected = reference(baseline, boxes, image)
+    reference_ms = measure(lambda: reference(baseline, boxes, image), args.repeat)
+    print(f"{args.faces} faces of {os.path.basename(args.image)}")
+    print(f"reference: {reference_ms:.2f} ms")
+
+    failures = []
+    modes = {
+        "eager": (SpoofingDetector(args.model), args.tolerance),
+        "traced": (SpoofingDetector(args.model, traced=True), args.tolerance),
+        "int8": (SpoofingDetector(args.model, quantized=True), args.int8_tolerance),
+    }
+    for mode, (detector, tolerance) in modes.items():
+        actual = detector.model(detector.preprocess(boxes, image))
+        error = float(np.abs(expected - actual).max())
+        mismatches = int(np.count_nonzero(expected.argmax(axis=1) != actual.argmax(axis=1)))
+        mode_ms = measure(lambda detector=detector: detector.predict(boxes, image), args.repeat)
+        print(
+            f"{mode:>9}: {mode_ms:.2f} ms, speedup {reference_ms / mode_ms:.2f}x,"
+            f" max abs difference {error:.2e}, label mismatches {mismatches}"
+        )
+        if error > tolerance or mismatches > 0:
+            failures.append(mode)
+
+    if failures:
+        print(f"parity failed for {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,20 @@
 # common dependencies
 import os
 import warnings
-import logging
 from typing import Any, Dict, List, Union, Optional
 
 # this has to be set before importing tensorflow
 os.environ["TF_USE_LEGACY_KERAS"] = "1"
+os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
 # pylint: disable=wrong-import-position
 
 # 3rd party dependencies
 import numpy as np
 import pandas as pd
-import tensorflow as tf
 
 # package dependencies
-from deepface.commons import package_utils, folder_utils
+from deepface.commons import folder_utils
 from deepface.commons.logger import Logger
 from deepface.modules import (
     modeling,
@@ -26,6 +25,7 @@ from deepface.modules import (
     detection,
     streaming,
     preprocessing,
+    caching,
 )
 from deepface import __version__
 
@@ -34,14 +34,8 @@ logger = Logger()
 # -----------------------------------
 # configurations for dependencies
 
-# users should install tf_keras package if they are using tf 2.16 or later versions
-package_utils.validate_for_keras3()
-
+# tensorflow is imported and configured by package_utils once a keras based model is built
 warnings.filterwarnings("ignore")
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-tf_version = package_utils.get_tf_major_version()
-if tf_version == 2:
-    tf.get_logger().setLevel(logging.ERROR)
 # -----------------------------------
 
 # create required folders if necessary to store model weights
@@ -67,6 +61,32 @@ def build_model(model_name: str, task: str = "facial_recognition") -> Any:
     return modeling.build_model(task=task, model_name=model_name)
 
 
+def enable_embedding_cache(
+    max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[str] = None
+) -> caching.EmbeddingCache:
+    """
+    Enable the embedding cache consulted by verify, represent and find. Images represented
+        before with the same options are not detected and represented again, even if they
+        are renamed or copied. It is disabled by default.
+    Args:
+        max_bytes (int): memory budget of embeddings kept in memory. Least recently used
+            ones are evicted (default is 256 MB).
+        cache_dir (str): directory of the on-disk tier shared by processes and restarts.
+            Entries are kept in memory only if it is left unset (default is None).
+    Returns:
+        cache (EmbeddingCache): enabled cache. Its stats method reports hits, disk hits,
+            misses and evictions.
+    """
+    return caching.enable(max_bytes=max_bytes, cache_dir=cache_dir)
+
+
+def disable_embedding_cache() -> None:
+    """
+    Disable the embedding cache enabled with enable_embedding_cache
+    """
+    caching.disable()
+
+
 def verify(
     img1_path: Union[str, np.ndarray, List[float]],
     img2_path: Union[str, np.ndarray, List[float]],
@@ -163,6 +183,109 @@ def verify(
     )
 
 
+def verify_many(
+    probes: List[Union[str, np.ndarray, List[float]]],
+    candidates: List[Union[str, np.ndarray, List[float]]],
+    model_name: str = "VGG-Face",
+    detector_backend: str = "opencv",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    silent: bool = False,
+    threshold: Optional[float] = None,
+    anti_spoofing: bool = False,
+    batch_size: int = 32,
+) -> Dict[str, Any]:
+    """
+    Verify every probe against every candidate. Each unique image is represented once and
+        the distance matrix of all pairs is calculated at once instead of calling verify
+        for each pair.
+
+    Args:
+        probes (list): exact image paths, numpy arrays (BGR), base64 encoded images
+            or pre-calculated embeddings.
+
+        candidates (list): exact image paths, numpy arrays (BGR), base64 encoded images
+            or pre-calculated embeddings.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'centerface' or 'skip'
+            (default is opencv)
+
+        distance_metric (string): Metric for measuring similarity. Options: 'cosine',
+            'euclidean', 'euclidean_l2' (default is cosine).
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Set to False to avoid the exception for low-resolution images (default is True).
+
+        align (bool): Flag to enable face alignment (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace (default is base)
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process
+            (default is False).
+
+        threshold (float): Specify a threshold to determine whether a pair represents the same
+            person or different individuals. If left unset, default pre-tuned threshold values
+            will be applied based on the specified model name and distance metric
+            (default is None).
+
+        anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
+
+        batch_size (int): Number of faces fed to the model at once (default is 32).
+
+    Returns:
+        result (dict): A dictionary containing verification results of all pairs.
+
+        - 'verified' (np.ndarray): (P, C) boolean matrix, True if the probe and
+            the candidate represent the same person.
+
+        - 'distances' (np.ndarray): (P, C) distances of the closest face pairs.
+
+        - 'threshold' (float): The maximum threshold used for verification.
+
+        - 'model' (str): The chosen face recognition model.
+
+        - 'detector_backend' (str): The chosen face detector.
+
+        - 'similarity_metric' (str): The chosen similarity metric for measuring distances.
+
+        - 'facial_areas' (dict): Facial areas detected in each image.
+            - 'probes': list of facial areas of each probe
+            - 'candidates': list of facial areas of each candidate
+
+        - 'closest_faces' (dict): Indices of the closest face pair of each image pair
+            in the facial areas of its images.
+            - 'probes': (P, C) index of the probe's face
+            - 'candidates': (P, C) index of the candidate's face
+
+        - 'time' (float): Time taken for the verification process in seconds.
+    """
+    return verification.verify_many(
+        probes=probes,
+        candidates=candidates,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        distance_metric=distance_metric,
+        enforce_detection=enforce_detection,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        silent=silent,
+        threshold=threshold,
+        anti_spoofing=anti_spoofing,
+        batch_size=batch_size,
+    )
+
+
 def analyze(
     img_path: Union[str, np.ndarray],
     actions: Union[tuple, list] = ("emotion", "age", "gender", "race"),
@@ -262,6 +385,64 @@ def analyze(
     )
 
 
+def analyze_batch(
+    img_paths: List[Union[str, np.ndarray]],
+    actions: Union[tuple, list] = ("emotion", "age", "gender", "race"),
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    silent: bool = False,
+    anti_spoofing: bool = False,
+    batch_size: int = 32,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Analyze facial attributes of many images. Detected faces of all images are preprocessed
+        once and fed to each attribute model in batches instead of one by one.
+
+    Args:
+        img_paths (list): The exact paths to the images, numpy arrays in BGR format,
+            or base64 encoded images.
+
+        actions (tuple): Attributes to analyze. The default is ('age', 'gender', 'emotion', 'race').
+            You can exclude some of these attributes from the analysis if needed.
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Set to False to avoid the exception for low-resolution images (default is True).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'centerface' or 'skip'
+            (default is opencv).
+
+        align (boolean): Perform alignment based on the eye positions (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process
+            (default is False).
+
+        anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
+
+        batch_size (int): Number of faces fed to each model in a single forward pass
+            (default is 32).
+
+    Returns:
+        results (List[List[Dict[str, Any]]]): For each given image, a list of dictionaries
+            having the same fields with analyze.
+    """
+    return demography.analyze_batch(
+        img_paths=img_paths,
+        actions=actions,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        silent=silent,
+        anti_spoofing=anti_spoofing,
+        batch_size=batch_size,
+    )
+
+
 def find(
     img_path: Union[str, np.ndarray],
     db_path: str,
@@ -276,6 +457,11 @@ def find(
     silent: bool = False,
     refresh_database: bool = True,
     anti_spoofing: bool = False,
+    top_k: Optional[int] = None,
+    index_type: str = "flat",
+    batch_size: int = 32,
+    workers: int = 1,
+    watch_database: bool = False,
 ) -> List[pd.DataFrame]:
     """
     Identify individuals in a database
@@ -321,6 +507,26 @@ def find(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        top_k (int): Return at most this many closest identities for each detected face.
+            If left unset, all identities within the threshold are returned (default is None).
+
+        index_type (str): Nearest neighbour index used to search the datastore. Options: flat,
+            ivf or hnsw. flat is exact, ivf and hnsw are approximate and stored next to the
+            datastore. hnsw requires hnswlib (default is flat).
+
+        batch_size (int): Number of faces fed to the model at once while representing
+            new images of the database (default is 32).
+
+        workers (int): Number of threads decoding new images of the database and of workers
+            detecting their faces. More than 1 worker runs detection in a pool of spawned
+            processes which is kept alive for later calls. It is meant for bulk re-indexing of
+            large databases and the calling script must be guarded with
+            if __name__ == "__main__" (default is 1).
+
+        watch_database (bool): Watch db_path for changes with inotify in a background thread,
+            so later calls do not even scan the directory while nothing changes in it.
+            Requires inotify_simple (default is False).
+
     Returns:
         results (List[pd.DataFrame]): A list of pandas dataframes. Each dataframe corresponds
             to the identity information for an individual detected in the source image.
@@ -353,6 +559,11 @@ def find(
         silent=silent,
         refresh_database=refresh_database,
         anti_spoofing=anti_spoofing,
+        top_k=top_k,
+        index_type=index_type,
+        batch_size=batch_size,
+        workers=workers,
+        watch_database=watch_database,
     )
 
 
@@ -366,6 +577,7 @@ def represent(
     normalization: str = "base",
     anti_spoofing: bool = False,
     max_faces: Optional[int] = None,
+    compiled: bool = False,
 ) -> List[Dict[str, Any]]:
     """
     Represent facial images as multi-dimensional vector embeddings.
@@ -399,6 +611,10 @@ def represent(
 
         max_faces (int): Set a limit on the number of faces to be processed (default is None).
 
+        compiled (boolean): Run keras based models as a compiled tf.function graph. It is
+            traced and warmed up once, then reused by later calls asking for it to lower
+            latency per face. Calls without it keep running eagerly (default is False).
+
     Returns:
         results (List[Dict[str, Any]]): A list of dictionaries, each containing the
             following fields:
@@ -425,6 +641,79 @@ def represent(
         normalization=normalization,
         anti_spoofing=anti_spoofing,
         max_faces=max_faces,
+        compiled=compiled,
+    )
+
+
+def represent_batch(
+    img_paths: List[Union[str, np.ndarray]],
+    model_name: str = "VGG-Face",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    anti_spoofing: bool = False,
+    max_faces: Optional[int] = None,
+    batch_size: int = 32,
+    compiled: bool = False,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Represent many facial images as multi-dimensional vector embeddings. Detected faces
+        of all images are fed to the model in batches instead of one by one.
+
+    Args:
+        img_paths (list): The exact paths to the images, numpy arrays in BGR format,
+            or base64 encoded images.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet
+            (default is VGG-Face.).
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Default is True. Set to False to avoid the exception for low-resolution images
+            (default is True).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'centerface' or 'skip'
+            (default is opencv).
+
+        align (boolean): Perform alignment based on the eye positions (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Default is base. Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace
+            (default is base).
+
+        anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
+
+        max_faces (int): Set a limit on the number of faces to be processed per image
+            (default is None).
+
+        batch_size (int): Number of faces fed to the model in a single forward pass
+            (default is 32).
+
+        compiled (boolean): Run keras based models as a compiled tf.function graph. It is
+            traced and warmed up once, then reused by later calls asking for it to lower
+            latency per face. Calls without it keep running eagerly (default is False).
+
+    Returns:
+        results (List[List[Dict[str, Any]]]): For each given image, a list of dictionaries
+            having the same fields with represent. Embeddings are float32 numpy arrays.
+    """
+    return representation.represent_batch(
+        img_paths=img_paths,
+        model_name=model_name,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        normalization=normalization,
+        anti_spoofing=anti_spoofing,
+        max_faces=max_faces,
+        batch_size=batch_size,
+        compiled=compiled,
     )
 
 
@@ -496,6 +785,7 @@ def extract_faces(
     color_face: str = "rgb",
     normalize_face: bool = True,
     anti_spoofing: bool = False,
+    detection_max_side: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Extract faces from a given image
@@ -526,6 +816,10 @@ def extract_faces(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        detection_max_side (int): Downscale the image so that its longer side is at most this
+            many pixels before running the detector. Facial areas are mapped back, and faces
+            are cropped and aligned from the full resolution image (default is None).
+
     Returns:
         results (List[Dict[str, Any]]): A list of dictionaries, where each dictionary contains:
 
@@ -556,6 +850,7 @@ def extract_faces(
         color_face=color_face,
         normalize_face=normalize_face,
         anti_spoofing=anti_spoofing,
+        detection_max_side=detection_max_side,
     )
 
 
@@ -12,6 +12,9 @@ import numpy as np
 import cv2
 from PIL import Image
 
+# extensions of images loaded into databases
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
 
 def list_images(path: str) -> List[str]:
     """
@@ -28,15 +31,26 @@ def list_images(path: str) -> List[str]:
 
             ext_lower = os.path.splitext(exact_path)[-1].lower()
 
-            if ext_lower not in {".jpg", ".jpeg", ".png"}:
+            if ext_lower not in IMAGE_EXTENSIONS:
                 continue
 
-            with Image.open(exact_path) as img:  # lazy
-                if img.format.lower() in {"jpeg", "png"}:
-                    images.append(exact_path)
+            if is_image(exact_path):
+                images.append(exact_path)
     return images
 
 
+def is_image(file_path: str) -> bool:
+    """
+    Check the content of a file is a jpg or png image
+    Args:
+        file_path (str): exact file path
+    Returns:
+        is_image (bool): True if the file is in jpeg or png format
+    """
+    with Image.open(file_path) as img:  # lazy
+        return img.format.lower() in {"jpeg", "png"}
+
+
 def find_image_hash(file_path: str) -> str:
     """
     Find the hash of given image file with its properties
@@ -1,36 +1,75 @@
 # built-in dependencies
 import hashlib
-
-# 3rd party dependencies
-import tensorflow as tf
+import logging
+import os
+import threading
+from types import ModuleType
+from typing import Optional
 
 # package dependencies
 from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# tensorflow is imported on first use, code paths relying on torch or opencv only never pay for it
+_tf: Optional[ModuleType] = None
+_tf_lock = threading.Lock()
+
+
+def import_tensorflow() -> ModuleType:
+    """
+    Import and configure tensorflow once
+    Returns
+        tf (module)
+    """
+    global _tf
+    if _tf is not None:
+        return _tf
+
+    with _tf_lock:
+        if _tf is None:
+            # these have to be set before importing tensorflow
+            os.environ.setdefault("TF_USE_LEGACY_KERAS", "1")
+            os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+            import tensorflow as tf
+
+            # users should install tf_keras package if they are using tf 2.16 or later versions
+            # tf is cached only once validated, so a failed check runs again on the next call
+            validate_for_keras3(tf)
+            if get_tf_major_version(tf) == 2:
+                tf.get_logger().setLevel(logging.ERROR)
+            _tf = tf
+    return _tf
 
-def get_tf_major_version() -> int:
+
+def get_tf_major_version(tf: Optional[ModuleType] = None) -> int:
     """
     Find tensorflow's major version
+    Args:
+        tf (module): tensorflow module, imported if not given (default is None)
     Returns
         major_version (int)
     """
+    tf = tf or _tf or import_tensorflow()
     return int(tf.__version__.split(".", maxsplit=1)[0])
 
 
-def get_tf_minor_version() -> int:
+def get_tf_minor_version(tf: Optional[ModuleType] = None) -> int:
     """
     Find tensorflow's minor version
+    Args:
+        tf (module): tensorflow module, imported if not given (default is None)
     Returns
         minor_version (int)
     """
+    tf = tf or _tf or import_tensorflow()
     return int(tf.__version__.split(".", maxsplit=-1)[1])
 
 
-def validate_for_keras3():
-    tf_major = get_tf_major_version()
-    tf_minor = get_tf_minor_version()
+def validate_for_keras3(tf: Optional[ModuleType] = None):
+    tf_major = get_tf_major_version(tf)
+    tf_minor = get_tf_minor_version(tf)
 
     # tf_keras is a must dependency after tf 2.16
     if tf_major == 1 or (tf_major == 2 and tf_minor < 16):
@@ -43,7 +82,7 @@ def validate_for_keras3():
     except ImportError as err:
         # you may consider to install that package here
         raise ValueError(
-            f"You have tensorflow {tf.__version__} and this requires "
+            f"You have tensorflow {tf_major}.{tf_minor} and this requires "
             "tf-keras package. Please run `pip install tf-keras` "
             "or downgrade your tensorflow."
         ) from err
@@ -1,6 +1,6 @@
 # built-in dependencies
 import os
-from typing import Optional
+from typing import Any, Optional
 import zipfile
 import bz2
 
@@ -8,15 +8,9 @@ import bz2
 import gdown
 
 # project dependencies
-from deepface.commons import folder_utils, package_utils
+from deepface.commons import folder_utils
 from deepface.commons.logger import Logger
 
-tf_version = package_utils.get_tf_major_version()
-if tf_version == 1:
-    from keras.models import Sequential
-else:
-    from tensorflow.keras.models import Sequential
-
 logger = Logger()
 
 
@@ -69,7 +63,7 @@ def download_weights_if_necessary(
     return target_file
 
 
-def load_model_weights(model: Sequential, weight_file: str) -> Sequential:
+def load_model_weights(model: Any, weight_file: str) -> Any:
     """
     Load pre-trained weights for a given model
     Args:
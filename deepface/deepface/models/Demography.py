@@ -1,22 +1,26 @@
-from typing import Union
+from typing import Any, Union
 from abc import ABC, abstractmethod
 import numpy as np
-from deepface.commons import package_utils
-
-tf_version = package_utils.get_tf_major_version()
-if tf_version == 1:
-    from keras.models import Model
-else:
-    from tensorflow.keras.models import Model
 
 # Notice that all facial attribute analysis models must be inherited from this class
 
 
 # pylint: disable=too-few-public-methods
 class Demography(ABC):
-    model: Model
+    model: Any
     model_name: str
 
     @abstractmethod
     def predict(self, img: np.ndarray) -> Union[np.ndarray, np.float64]:
         pass
+
+    def predict_batch(self, imgs: np.ndarray) -> np.ndarray:
+        """
+        Predict facial attributes of many faces. Models able to run a batched forward pass
+            overwrite this, others predict faces one by one.
+        Args:
+            imgs (np.ndarray): faces in shape (N, 224, 224, 3)
+        Returns:
+            predictions (np.ndarray): predictions of each face stacked on the first axis
+        """
+        return np.stack([self.predict(imgs[i : i + 1]) for i in range(imgs.shape[0])])
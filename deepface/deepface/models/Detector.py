@@ -27,6 +27,19 @@ class Detector(ABC):
         """
         pass
 
+    def detect_faces_batch(self, imgs: List[np.ndarray]) -> List[List["FacialAreaRegion"]]:
+        """
+        Detect faces of many images. Detectors able to run a batched forward pass
+            overwrite this, others detect faces image by image.
+
+        Args:
+            imgs (List[np.ndarray]): pre-loaded images as numpy arrays
+
+        Returns:
+            results (List[List[FacialAreaRegion]]): facial areas of each image
+        """
+        return [self.detect_faces(img) for img in imgs]
+
 
 @dataclass
 class FacialAreaRegion:
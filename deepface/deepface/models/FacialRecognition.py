@@ -1,29 +1,100 @@
+import sys
+import threading
 from abc import ABC
-from typing import Any, Union, List, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 import numpy as np
 from deepface.commons import package_utils
 
-tf_version = package_utils.get_tf_major_version()
-if tf_version == 2:
-    from tensorflow.keras.models import Model
-else:
-    from keras.models import Model
-
 # Notice that all facial recognition models must be inherited from this class
 
 # pylint: disable=too-few-public-methods
 class FacialRecognition(ABC):
-    model: Union[Model, Any]
+    model: Any
     model_name: str
     input_shape: Tuple[int, int]
     output_shape: int
 
+    # graph compiled inference function, set by compile_inference and shared by the callers
+    # asking for compiled forward passes
+    _compiled: Optional[Callable] = None
+    _compile_lock = threading.Lock()
+
     def forward(self, img: np.ndarray) -> List[float]:
-        if not isinstance(self.model, Model):
+        if not _is_keras_model(self.model):
             raise ValueError(
                 "You must overwrite forward method if it is not a keras model,"
                 f"but {self.model_name} not overwritten!"
             )
         # model.predict causes memory issue when it is called in a for loop
         # embedding = model.predict(img, verbose=0)[0].tolist()
-        return self.model(img, training=False).numpy()[0].tolist()
+        return self._predict(img)[0].tolist()
+
+    def forward_batch(self, imgs: np.ndarray, compiled: bool = False) -> np.ndarray:
+        """
+        Find embeddings of many preprocessed faces with a single forward pass
+        Args:
+            imgs (np.ndarray): batch of preprocessed faces in shape (N, H, W, C)
+            compiled (bool): run the compiled graph of keras based models, it is traced on
+                first use (default is False)
+        Returns:
+            embeddings (np.ndarray): float32 embeddings in shape (N, output_shape)
+        """
+        if len(imgs) == 0:
+            return np.zeros((0, self.output_shape), dtype=np.float32)
+
+        if not _is_keras_model(self.model):
+            # models having a custom forward cannot consume batches, feed faces one by one
+            return np.array(
+                [self.forward(img[np.newaxis]) for img in imgs], dtype=np.float32
+            )
+
+        return np.asarray(self._predict(imgs, compiled=compiled), dtype=np.float32)
+
+    def compile_inference(self) -> bool:
+        """
+        Trace the keras model into a tf.function accepting batches of any size, and warm it up
+            with a dummy batch. Forward passes asking for it run the compiled graph, which
+            saves the per call overhead of eager execution. Other forward passes keep running
+            eagerly. Models not based on keras are left as is.
+        Returns:
+            compiled (bool): True if a compiled graph is available
+        """
+        if self._compiled is not None:
+            return True
+        if not _is_keras_model(self.model):
+            return False
+
+        with self._compile_lock:
+            if self._compiled is None:
+                tf = package_utils.import_tensorflow()
+                model = self.model
+                signature = [tf.TensorSpec(shape=(None, *model.input_shape[1:]), dtype=tf.float32)]
+
+                @tf.function(input_signature=signature)
+                def compiled(imgs):
+                    return model(imgs, training=False)
+
+                # tracing happens on the first call, do it before serving real faces
+                compiled(np.zeros((1, *model.input_shape[1:]), dtype=np.float32))
+                self._compiled = compiled
+        return True
+
+    def _predict(self, imgs: np.ndarray, compiled: bool = False) -> np.ndarray:
+        """
+        Feed a batch of preprocessed faces to the keras model, through its compiled graph
+            if compiled is True
+        """
+        if compiled and self.compile_inference():
+            return self._compiled(np.asarray(imgs, dtype=np.float32)).numpy()
+        return self.model(imgs, training=False).numpy()
+
+
+def _is_keras_model(model: Any) -> bool:
+    # keras is imported only if tensorflow is already loaded by a keras based model
+    if "tensorflow" not in sys.modules:
+        return False
+    if package_utils.get_tf_major_version() == 2:
+        from tensorflow.keras.models import Model
+    else:
+        from keras.models import Model
+    return isinstance(model, Model)
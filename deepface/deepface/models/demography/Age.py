@@ -34,9 +34,12 @@ class ApparentAgeClient(Demography):
         self.model_name = "Age"
 
     def predict(self, img: np.ndarray) -> np.float64:
+        return self.predict_batch(img)[0]
+
+    def predict_batch(self, imgs: np.ndarray) -> np.ndarray:
         # model.predict causes memory issue when it is called in a for loop
-        # age_predictions = self.model.predict(img, verbose=0)[0, :]
-        age_predictions = self.model(img, training=False).numpy()[0, :]
+        # age_predictions = self.model.predict(imgs, verbose=0)
+        age_predictions = self.model(imgs, training=False).numpy()
         return find_apparent_age(age_predictions)
 
 
@@ -80,10 +83,10 @@ def find_apparent_age(age_predictions: np.ndarray) -> np.float64:
     """
     Find apparent age prediction from a given probas of ages
     Args:
-        age_predictions (?)
+        age_predictions (?): probas of a face, or of many faces stacked on the first axis
     Returns:
-        apparent_age (float)
+        apparent_age (float): apparent age, or an array of them for many faces
     """
     output_indexes = np.arange(0, 101)
-    apparent_age = np.sum(age_predictions * output_indexes)
+    apparent_age = np.sum(age_predictions * output_indexes, axis=-1)
     return apparent_age
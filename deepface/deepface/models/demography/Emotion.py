@@ -44,13 +44,16 @@ class EmotionClient(Demography):
         self.model_name = "Emotion"
 
     def predict(self, img: np.ndarray) -> np.ndarray:
-        img_gray = cv2.cvtColor(img[0], cv2.COLOR_BGR2GRAY)
-        img_gray = cv2.resize(img_gray, (48, 48))
-        img_gray = np.expand_dims(img_gray, axis=0)
+        return self.predict_batch(img)[0, :]
+
+    def predict_batch(self, imgs: np.ndarray) -> np.ndarray:
+        imgs_gray = np.empty((imgs.shape[0], 48, 48), dtype=np.float32)
+        for img, img_gray in zip(imgs, imgs_gray):
+            img_gray[:] = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), (48, 48))
 
         # model.predict causes memory issue when it is called in a for loop
-        # emotion_predictions = self.model.predict(img_gray, verbose=0)[0, :]
-        emotion_predictions = self.model(img_gray, training=False).numpy()[0, :]
+        # emotion_predictions = self.model.predict(imgs_gray, verbose=0)
+        emotion_predictions = self.model(imgs_gray, training=False).numpy()
 
         return emotion_predictions
 
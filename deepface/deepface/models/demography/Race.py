@@ -36,9 +36,12 @@ class RaceClient(Demography):
         self.model_name = "Race"
 
     def predict(self, img: np.ndarray) -> np.ndarray:
+        return self.predict_batch(img)[0, :]
+
+    def predict_batch(self, imgs: np.ndarray) -> np.ndarray:
         # model.predict causes memory issue when it is called in a for loop
-        # return self.model.predict(img, verbose=0)[0, :]
-        return self.model(img, training=False).numpy()[0, :]
+        # return self.model.predict(imgs, verbose=0)
+        return self.model(imgs, training=False).numpy()
 
 
 def load_model(
@@ -1,6 +1,6 @@
 # built-in dependencies
 import os
-from typing import List
+from typing import Dict, List, Tuple
 
 # 3rd party dependencies
 import numpy as np
@@ -44,18 +44,50 @@ class CenterFaceClient(Detector):
         Returns:
             results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
         """
-        resp = []
+        return self.detect_faces_batch([img])[0]
+
+    def detect_faces_batch(self, imgs: List[np.ndarray]) -> List[List["FacialAreaRegion"]]:
+        """
+        Detect and align faces of many images with CenterFace. Images of the same size
+            are fed to the network in a single forward pass.
+
+        Args:
+            imgs (List[np.ndarray]): pre-loaded images as numpy arrays
 
+        Returns:
+            results (List[List[FacialAreaRegion]]): facial areas of each image
+        """
         threshold = float(os.getenv("CENTERFACE_THRESHOLD", "0.80"))
 
         # BUG: model causes problematic results from 2nd call if it is not flushed
-        # detections, landmarks = self.model.forward(
-        #     img, img.shape[0], img.shape[1], threshold=threshold
-        # )
-        detections, landmarks = self.build_model().forward(
-            img, img.shape[0], img.shape[1], threshold=threshold
-        )
+        # so that it is built once per call instead of once per client
+        model = self.build_model()
 
+        # input size of the network depends on image size
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for idx, img in enumerate(imgs):
+            groups.setdefault(img.shape[:2], []).append(idx)
+
+        resp: List[List[FacialAreaRegion]] = [[] for _ in imgs]
+        for (height, width), indices in groups.items():
+            outputs = model.forward_batch([imgs[idx] for idx in indices], height, width, threshold)
+            for idx, (detections, landmarks) in zip(indices, outputs):
+                resp[idx] = self.__find_facial_areas(detections, landmarks)
+
+        return resp
+
+    def __find_facial_areas(
+        self, detections: np.ndarray, landmarks: np.ndarray
+    ) -> List["FacialAreaRegion"]:
+        """
+        Turn CenterFace detections of an image into facial areas
+        Args:
+            detections (np.ndarray): boxes and confidence scores
+            landmarks (np.ndarray): landmarks of each detection
+        Returns:
+            results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
+        """
+        resp = []
         for i, detection in enumerate(detections):
             boxes, confidence = detection[:4], detection[4]
 
@@ -100,6 +132,28 @@ class CenterFace:
         self.img_h_new, self.img_w_new, self.scale_h, self.scale_w = self.transform(height, width)
         return self.inference_opencv(img, threshold)
 
+    def forward_batch(self, imgs, height, width, threshold=0.5):
+        """
+        Detect faces of many images having the same size in a single forward pass
+        """
+        self.img_h_new, self.img_w_new, self.scale_h, self.scale_w = self.transform(height, width)
+        blob = cv2.dnn.blobFromImages(
+            imgs,
+            scalefactor=1.0,
+            size=(self.img_w_new, self.img_h_new),
+            mean=(0, 0, 0),
+            swapRB=True,
+            crop=False,
+        )
+        self.net.setInput(blob)
+        heatmap, scale, offset, lms = self.net.forward(["537", "538", "539", "540"])
+        return [
+            self.postprocess(
+                heatmap[i : i + 1], lms[i : i + 1], offset[i : i + 1], scale[i : i + 1], threshold
+            )
+            for i in range(len(imgs))
+        ]
+
     def inference_opencv(self, img, threshold):
         blob = cv2.dnn.blobFromImage(
             img,
@@ -61,53 +61,74 @@ class SsdClient(Detector):
         Returns:
             results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
         """
+        return self.detect_faces_batch([img])[0]
 
-        # Because cv2.dnn.blobFromImage expects CV_8U (8-bit unsigned integer) values
-        if img.dtype != np.uint8:
-            img = img.astype(np.uint8)
-
-        opencv_module: OpenCv.OpenCvClient = self.model["opencv_module"]
+    def detect_faces_batch(self, imgs: List[np.ndarray]) -> List[List[FacialAreaRegion]]:
+        """
+        Detect and align faces of many images with a single forward pass of ssd
 
-        target_size = (300, 300)
+        Args:
+            imgs (List[np.ndarray]): pre-loaded images as numpy arrays
 
-        original_size = img.shape
+        Returns:
+            results (List[List[FacialAreaRegion]]): facial areas of each image
+        """
+        if len(imgs) == 0:
+            return []
 
-        current_img = cv2.resize(img, target_size)
+        # Because cv2.dnn.blobFromImage expects CV_8U (8-bit unsigned integer) values
+        imgs = [img if img.dtype == np.uint8 else img.astype(np.uint8) for img in imgs]
 
-        aspect_ratio_x = original_size[1] / target_size[1]
-        aspect_ratio_y = original_size[0] / target_size[0]
+        target_size = (300, 300)
 
-        imageBlob = cv2.dnn.blobFromImage(image=current_img)
+        imageBlob = cv2.dnn.blobFromImages(images=[cv2.resize(img, target_size) for img in imgs])
 
         face_detector = self.model["face_detector"]
         face_detector.setInput(imageBlob)
         detections = face_detector.forward()
 
-        class ssd_labels(IntEnum):
-            img_id = 0
-            is_face = 1
-            confidence = 2
-            left = 3
-            top = 4
-            right = 5
-            bottom = 6
-
+        # detections of all images come together, first column is index of their image
         faces = detections[0][0]
+        return [
+            self.__find_facial_areas(
+                img=img, faces=faces[faces[:, SsdLabels.img_id] == img_id].copy()
+            )
+            for img_id, img in enumerate(imgs)
+        ]
+
+    def __find_facial_areas(self, img: np.ndarray, faces: np.ndarray) -> List[FacialAreaRegion]:
+        """
+        Turn ssd detections of an image into facial areas
+        Args:
+            img (np.ndarray): image given to the detector
+            faces (np.ndarray): detections of the image
+        Returns:
+            results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
+        """
+        opencv_module: OpenCv.OpenCvClient = self.model["opencv_module"]
+
+        target_size = (300, 300)
+
+        original_size = img.shape
+
+        aspect_ratio_x = original_size[1] / target_size[1]
+        aspect_ratio_y = original_size[0] / target_size[0]
+
         faces = faces[
-            (faces[:, ssd_labels.is_face] == 1) & (faces[:, ssd_labels.confidence] >= 0.90)
+            (faces[:, SsdLabels.is_face] == 1) & (faces[:, SsdLabels.confidence] >= 0.90)
         ]
-        margins = [ssd_labels.left, ssd_labels.top, ssd_labels.right, ssd_labels.bottom]
+        margins = [SsdLabels.left, SsdLabels.top, SsdLabels.right, SsdLabels.bottom]
         faces[:, margins] = np.int32(faces[:, margins] * 300)
         faces[:, margins] = np.int32(
             faces[:, margins] * [aspect_ratio_x, aspect_ratio_y, aspect_ratio_x, aspect_ratio_y]
         )
-        faces[:, [ssd_labels.right, ssd_labels.bottom]] -= faces[
-            :, [ssd_labels.left, ssd_labels.top]
+        faces[:, [SsdLabels.right, SsdLabels.bottom]] -= faces[
+            :, [SsdLabels.left, SsdLabels.top]
         ]
 
         resp = []
         for face in faces:
-            confidence = float(face[ssd_labels.confidence])
+            confidence = float(face[SsdLabels.confidence])
             x, y, w, h = map(int, face[margins])
             detected_face = img[y : y + h, x : x + w]
 
@@ -131,3 +152,13 @@ class SsdClient(Detector):
             )
             resp.append(facial_area)
         return resp
+
+
+class SsdLabels(IntEnum):
+    img_id = 0
+    is_face = 1
+    confidence = 2
+    left = 3
+    top = 4
+    right = 5
+    bottom = 6
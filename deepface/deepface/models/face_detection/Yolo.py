@@ -55,10 +55,34 @@ class YoloClient(Detector):
         Returns:
             results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
         """
-        resp = []
+        return self.detect_faces_batch([img])[0]
+
+    def detect_faces_batch(self, imgs: List[np.ndarray]) -> List[List[FacialAreaRegion]]:
+        """
+        Detect and align faces of many images with a single yolo prediction
+
+        Args:
+            imgs (List[np.ndarray]): pre-loaded images as numpy arrays
+
+        Returns:
+            results (List[List[FacialAreaRegion]]): facial areas of each image
+        """
+        if len(imgs) == 0:
+            return []
 
-        # Detect faces
-        results = self.model.predict(img, verbose=False, show=False, conf=0.25)[0]
+        # Detect faces, yolo returns results of each image in the given order
+        results = self.model.predict(list(imgs), verbose=False, show=False, conf=0.25)
+        return [self.__find_facial_areas(result) for result in results]
+
+    def __find_facial_areas(self, results: Any) -> List[FacialAreaRegion]:
+        """
+        Turn yolo results of an image into facial areas
+        Args:
+            results (Any): yolo results of an image
+        Returns:
+            results (List[FacialAreaRegion]): A list of FacialAreaRegion objects
+        """
+        resp = []
 
         # For each face, extract the bounding box, the landmarks and confidence
         for result in results:
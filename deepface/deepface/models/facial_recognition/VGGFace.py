@@ -68,10 +68,24 @@ class VggFaceClient(FacialRecognition):
 
         # having normalization layer in descriptor troubles for some gpu users (e.g. issue 957, 966)
         # instead we are now calculating it with traditional way not with keras backend
-        embedding = self.model(img, training=False).numpy()[0].tolist()
+        embedding = self._predict(img)[0].tolist()
         embedding = verification.l2_normalize(embedding)
         return embedding.tolist()
 
+    def forward_batch(self, imgs: np.ndarray, compiled: bool = False) -> np.ndarray:
+        """
+        Generates embeddings of many faces with a single forward pass of VGG-Face model
+        Args:
+            imgs (np.ndarray): batch of preprocessed faces in shape (N, 224, 224, 3)
+            compiled (bool): run the compiled graph of the model (default is False)
+        Returns
+            embeddings (np.ndarray): l2 normalized float32 embeddings in shape (N, 4096)
+        """
+        if len(imgs) == 0:
+            return np.zeros((0, self.output_shape), dtype=np.float32)
+        embeddings = self._predict(imgs, compiled=compiled).astype(np.float32)
+        return verification.l2_normalize(embeddings, axis=1)
+
 
 
 def base_model() -> Sequential:
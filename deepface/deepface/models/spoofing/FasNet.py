@@ -1,5 +1,7 @@
 # built-in dependencies
-from typing import Union
+import os
+from functools import lru_cache
+from typing import List, Tuple, Union
 
 # 3rd party dependencies
 import cv2
@@ -11,6 +13,11 @@ from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# torch uses all cores by default, DEEPFACE_TORCH_THREADS limits them to share cores with
+# tensorflow. Like CENTERFACE_THRESHOLD and yunet_score_threshold of detectors, it is an
+# environment variable, read once when this module is imported.
+TORCH_THREADS = os.getenv("DEEPFACE_TORCH_THREADS")
+
 # pylint: disable=line-too-long, too-few-public-methods, nested-min-max
 class Fasnet:
     """
@@ -32,6 +39,8 @@ class Fasnet:
         device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
         self.device = device
 
+        _set_torch_threads()
+
         # download pre-trained models if not installed yet
         first_model_weight_file = weight_utils.download_weights_if_necessary(
             file_name="2.7_80x80_MiniFASNetV2.pth",
@@ -100,83 +109,67 @@ class Fasnet:
         Returns:
             result (tuple): a result tuple consisting of is_real and score
         """
+        return self.analyze_batch(img=img, facial_areas=[facial_area])[0]
+
+    def analyze_batch(
+        self, img: np.ndarray, facial_areas: List[Union[list, tuple]]
+    ) -> List[Tuple[bool, float]]:
+        """
+        Analyze many faces of a given image spoofed or not. Faces are cropped at both scales
+            into two batches and each model runs a single forward pass over them.
+        Args:
+            img (np.ndarray): pre loaded image
+            facial_areas (list): facial rectangle area coordinates with x, y, w, h respectively
+        Returns:
+            results (list): a result tuple consisting of is_real and score for each face
+        """
         import torch
         import torch.nn.functional as F
 
-        x, y, w, h = facial_area
-        first_img = crop(img, (x, y, w, h), 2.7, 80, 80)
-        second_img = crop(img, (x, y, w, h), 4, 80, 80)
-
-        test_transform = Compose(
-            [
-                ToTensor(),
-            ]
-        )
-
-        first_img = test_transform(first_img)
-        first_img = first_img.unsqueeze(0).to(self.device)
+        if len(facial_areas) == 0:
+            return []
 
-        second_img = test_transform(second_img)
-        second_img = second_img.unsqueeze(0).to(self.device)
+        # channels first batches the models expect, filled in place
+        first_imgs = np.empty((len(facial_areas), 3, 80, 80), dtype=np.float32)
+        second_imgs = np.empty((len(facial_areas), 3, 80, 80), dtype=np.float32)
+        for i, (x, y, w, h) in enumerate(facial_areas):
+            first_imgs[i] = crop(img, (x, y, w, h), 2.7, 80, 80).transpose((2, 0, 1))
+            second_imgs[i] = crop(img, (x, y, w, h), 4, 80, 80).transpose((2, 0, 1))
 
         with torch.no_grad():
-            first_result = self.first_model.forward(first_img)
-            first_result = F.softmax(first_result).cpu().numpy()
+            first_result = self.first_model.forward(torch.from_numpy(first_imgs).to(self.device))
+            first_result = F.softmax(first_result, dim=1).cpu().numpy()
 
-            second_result = self.second_model.forward(second_img)
-            second_result = F.softmax(second_result).cpu().numpy()
+            second_result = self.second_model.forward(
+                torch.from_numpy(second_imgs).to(self.device)
+            )
+            second_result = F.softmax(second_result, dim=1).cpu().numpy()
 
-        prediction = np.zeros((1, 3))
-        prediction += first_result
-        prediction += second_result
+        predictions = first_result.astype(np.float64) + second_result
 
-        label = np.argmax(prediction)
-        is_real = True if label == 1 else False  # pylint: disable=simplifiable-if-expression
-        score = prediction[0][label] / 2
+        results = []
+        for prediction in predictions:
+            label = np.argmax(prediction)
+            is_real = True if label == 1 else False  # pylint: disable=simplifiable-if-expression
+            score = prediction[label] / 2
+            results.append((is_real, score))
 
-        return is_real, score
+        return results
 
 
 # subsdiary classes and functions
 
 
-def to_tensor(pic):
-    """Convert a ``numpy.ndarray`` to tensor.
-
-    See ``ToTensor`` for more details.
-
-    Args:
-        pic (PIL Image or numpy.ndarray): Image to be converted to tensor.
-
-    Returns:
-        Tensor: Converted image.
+@lru_cache(maxsize=None)
+def _set_torch_threads() -> None:
     """
-    import torch
-
-    # handle numpy array
-    # IR image channel=1: modify by lzc --> 20190730
-    if pic.ndim == 2:
-        pic = pic.reshape((pic.shape[0], pic.shape[1], 1))
-
-    img = torch.from_numpy(pic.transpose((2, 0, 1)))
-    # backward compatibility
-    # return img.float().div(255)  modify by zkx
-    return img.float()
-
-
-class Compose:
-    def __init__(self, transforms):
-        self.transforms = transforms
-
-    def __call__(self, img):
-        for t in self.transforms:
-            img = t(img)
-        return img
-
+    Apply DEEPFACE_TORCH_THREADS to torch once per process, so building Fasnet again
+        does not overwrite a number of threads set by the caller in the meantime
+    """
+    if TORCH_THREADS is not None:
+        import torch
 
-class ToTensor:
-    def __call__(self, pic):
-        return to_tensor(pic)
+        torch.set_num_threads(int(TORCH_THREADS))
 
 
 def _get_new_box(src_w, src_h, bbox, scale):
@@ -0,0 +1,318 @@
+# built-in dependencies
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# embedding cache shared by represent, verify and find. it is disabled unless enabled explicitly
+_cache: Optional["EmbeddingCache"] = None
+_cache_lock = threading.Lock()
+
+
+class EmbeddingCache:
+    """
+    Content addressed cache of facial embeddings.
+        Entries are keyed by the hash of the image content and the options changing its
+        embeddings, so a renamed or copied image is not represented again. Recently used
+        entries are kept in memory up to max_bytes, least recently used ones are evicted.
+        Entries are also written into cache_dir if it is set, so they survive restarts and
+        are shared with other processes.
+    Attributes:
+        max_bytes (int): memory budget of embeddings kept in memory
+        cache_dir (str or None): directory of the on-disk tier
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[str] = None):
+        if max_bytes < 0:
+            raise ValueError(f"max_bytes must be a non-negative integer but it is {max_bytes}")
+        self.max_bytes = max_bytes
+        self.cache_dir = None if cache_dir is None else str(cache_dir)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find the cached representations of a key
+        Args:
+            key (str or None): key returned by find_key. None is always a miss.
+        Returns:
+            representations (list or None): copies of the cached representations having
+                embedding, facial_area and face_confidence fields. Embeddings are read-only
+                float32 arrays. None if the key is not cached.
+        """
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return _copy_entry(entry)
+
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._store(key, entry)
+        return _copy_entry(entry)
+
+    def put(self, key: Optional[str], representations: List[Dict[str, Any]]) -> None:
+        """
+        Cache the representations of a key
+        Args:
+            key (str or None): key returned by find_key. Nothing is cached if it is None.
+            representations (list): representations having embedding, facial_area and
+                face_confidence fields as returned by represent
+        """
+        if key is None or len(representations) == 0:
+            return
+        if any(rep["embedding"] is None for rep in representations):
+            return
+
+        entry = []
+        for rep in representations:
+            embedding = np.array(rep["embedding"], dtype=np.float32).reshape(-1)
+            embedding.setflags(write=False)
+            entry.append(
+                {
+                    "embedding": embedding,
+                    "facial_area": dict(rep["facial_area"]),
+                    "face_confidence": rep["face_confidence"],
+                }
+            )
+
+        with self._lock:
+            self._store(key, entry)
+        self._write(key, entry)
+
+    def clear(self) -> None:
+        """
+        Drop entries kept in memory and reset counters. On-disk tier is left untouched.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters of the cache
+        Returns:
+            stats (dict): hits served from memory, disk_hits served from the on-disk tier,
+                misses, evictions from memory, number of entries and bytes kept in memory
+        """
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes}
+
+    def _store(self, key: str, entry: List[Dict[str, Any]]) -> None:
+        # caller must hold the lock
+        size = sum(rep["embedding"].nbytes for rep in entry)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(evicted)
+            self._counters["evictions"] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npz")
+
+    def _read(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                embeddings = data["embeddings"]
+                facial_areas = json.loads(str(data["facial_areas"]))
+                confidences = data["confidences"].tolist()
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError) as err:
+            logger.warn(f"Ignoring corrupted embedding cache entry {path}: {err}")
+            return None
+
+        entry = []
+        for embedding, facial_area, confidence in zip(embeddings, facial_areas, confidences):
+            embedding.setflags(write=False)
+            entry.append(
+                {
+                    "embedding": embedding,
+                    # eye coordinates are tuples, json turns them into lists
+                    "facial_area": {
+                        name: tuple(value) if isinstance(value, list) else value
+                        for name, value in facial_area.items()
+                    },
+                    "face_confidence": confidence,
+                }
+            )
+        return entry
+
+    def _write(self, key: str, entry: List[Dict[str, Any]]) -> None:
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path[: -len('.npz')]}.{uuid.uuid4().hex[:12]}.tmp.npz"
+        np.savez(
+            tmp_path,
+            embeddings=np.stack([rep["embedding"] for rep in entry]),
+            facial_areas=np.array(
+                json.dumps(
+                    [rep["facial_area"] for rep in entry],
+                    # numpy scalars of detectors
+                    default=lambda value: value.item(),
+                )
+            ),
+            confidences=np.array(
+                [rep["face_confidence"] or 0 for rep in entry], dtype=np.float64
+            ),
+        )
+        os.replace(tmp_path, path)
+
+
+def enable(max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[str] = None) -> EmbeddingCache:
+    """
+    Enable the embedding cache consulted by represent, verify and find
+    Args:
+        max_bytes (int): memory budget of embeddings kept in memory (default is 256 MB)
+        cache_dir (str): directory of the on-disk tier. Entries are kept in memory only
+            if it is left unset (default is None).
+    Returns:
+        cache (EmbeddingCache): enabled cache, its stats method reports hits and misses
+    """
+    global _cache
+    with _cache_lock:
+        _cache = EmbeddingCache(max_bytes=max_bytes, cache_dir=cache_dir)
+        return _cache
+
+
+def disable() -> None:
+    """
+    Disable the embedding cache and drop its in-memory entries
+    """
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the enabled embedding cache
+    Returns:
+        cache (EmbeddingCache or None): None if the cache is disabled
+    """
+    return _cache
+
+
+def find_key(
+    img: Union[str, Path, np.ndarray],
+    model_name: str,
+    detector_backend: str,
+    align: bool,
+    normalization: str,
+    expand_percentage: int,
+    enforce_detection: bool = True,
+    anti_spoofing: bool = False,
+    max_faces: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Find the cache key of an image's representations
+    Args:
+        img (str or np.ndarray): exact image path, base64 encoded image or numpy array in BGR
+        model_name (str): facial recognition model
+        detector_backend (str): face detector backend
+        align (bool): alignment flag
+        normalization (str): normalization technique
+        expand_percentage (int): expand percentage of detected facial areas
+        enforce_detection (bool): enforce detection flag (default is True)
+        anti_spoofing (bool): anti spoofing flag (default is False)
+        max_faces (int): limit of faces to be represented (default is None)
+    Returns:
+        key (str or None): hex digest. None if the image cannot be addressed by its
+            content, e.g. urls whose content may change.
+    """
+    content_hash = find_content_hash(img)
+    if content_hash is None:
+        return None
+    options = (
+        f"{content_hash}|{model_name}|{detector_backend}|{align}|{normalization}"
+        f"|{expand_percentage}|{enforce_detection}|{anti_spoofing}|{max_faces}"
+    )
+    return hashlib.sha1(options.encode("utf-8")).hexdigest()
+
+
+def find_content_hash(img: Union[str, Path, np.ndarray]) -> Optional[str]:
+    """
+    Hash the content of an image
+    Args:
+        img (str or np.ndarray): exact image path, base64 encoded image or numpy array
+    Returns:
+        hash (str or None): digest of the content, None for urls and other inputs
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    if isinstance(img, np.ndarray):
+        hasher.update(f"{img.shape}{img.dtype}".encode("utf-8"))
+        hasher.update(np.ascontiguousarray(img).data)
+        return hasher.hexdigest()
+
+    if isinstance(img, Path):
+        img = str(img)
+    if not isinstance(img, str) or img.lower().startswith(("http://", "https://")):
+        return None
+
+    if img.startswith("data:image/"):
+        hasher.update(img.encode("utf-8"))
+        return hasher.hexdigest()
+
+    try:
+        with open(img, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def _copy_entry(entry: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "embedding": rep["embedding"],
+            "facial_area": dict(rep["facial_area"]),
+            "face_confidence": rep["face_confidence"],
+        }
+        for rep in entry
+    ]
@@ -0,0 +1,418 @@
+# built-in dependencies
+import os
+import pickle
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# 3rd party dependencies
+import numpy as np
+import pandas as pd
+
+# project dependencies
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# required keys of each representation
+REPRESENTATION_KEYS = [
+    "identity",
+    "hash",
+    "embedding",
+    "target_x",
+    "target_y",
+    "target_w",
+    "target_h",
+]
+
+FACIAL_AREA_KEYS = ["target_x", "target_y", "target_w", "target_h"]
+
+# face_id of representations not bound to any face id
+NO_FACE_ID = -1
+
+
+@dataclass
+class Datastore:
+    """
+    Columnar store of representations.
+        Embeddings are kept in a float32 matrix which is memory mapped when loaded
+        from disk, so worker processes share the page cache instead of holding
+        their own copy. Metadata is kept in compact numpy columns.
+    Attributes:
+        ids (np.ndarray): (N,) int64 stable id of each row
+        identities (np.ndarray): (N,) image paths
+        hashes (np.ndarray): (N,) image hashes
+        face_ids (np.ndarray or None): (N,) int64 face ids, None if not tracked
+        facial_areas (np.ndarray): (N, 4) int32 x, y, w, h of detected faces
+        valid_rows (np.ndarray): (N,) bool mask of rows having an embedding
+        embeddings (np.ndarray): (N, D) float32 embeddings, zeros for invalid rows
+        next_id (int): smallest id never used by this store. Ids of removed rows are not
+            reused, so indexes built from an older version can be updated by id.
+    """
+
+    ids: np.ndarray
+    identities: np.ndarray
+    hashes: np.ndarray
+    face_ids: Optional[np.ndarray]
+    facial_areas: np.ndarray
+    valid_rows: np.ndarray
+    embeddings: np.ndarray
+    next_id: int = 0
+
+    def __post_init__(self):
+        if len(self.ids) > 0:
+            self.next_id = max(self.next_id, int(self.ids.max()) + 1)
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+    def select(self, mask: np.ndarray) -> "Datastore":
+        """
+        Keep the rows of the store where mask is True
+        Args:
+            mask (np.ndarray): (N,) boolean mask
+        Returns:
+            store (Datastore): new store with selected rows
+        """
+        return Datastore(
+            ids=self.ids[mask],
+            identities=self.identities[mask],
+            hashes=self.hashes[mask],
+            face_ids=None if self.face_ids is None else self.face_ids[mask],
+            facial_areas=self.facial_areas[mask],
+            valid_rows=self.valid_rows[mask],
+            embeddings=np.asarray(self.embeddings[mask], dtype=np.float32),
+            next_id=self.next_id,
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Metadata of the store as a DataFrame indexed by row ids
+        Returns:
+            df (pd.DataFrame): identity, hash, face_id (if tracked) and
+                target_x, target_y, target_w, target_h columns
+        """
+        columns: Dict[str, Any] = {
+            "identity": self.identities.astype(object),
+            "hash": self.hashes.astype(object),
+        }
+        if self.face_ids is not None:
+            columns["face_id"] = self.face_ids
+        for i, key in enumerate(FACIAL_AREA_KEYS):
+            columns[key] = self.facial_areas[:, i]
+        return pd.DataFrame(columns, index=pd.Index(self.ids))
+
+    def to_representations(self) -> List[Dict[str, Any]]:
+        """
+        Convert the store back into the legacy list of dict representations
+        Returns:
+            representations (list): representations with embeddings as list of floats
+        """
+        representations = []
+        for i in range(len(self)):
+            representation = {
+                "identity": str(self.identities[i]),
+                "hash": str(self.hashes[i]),
+                "embedding": self.embeddings[i].tolist() if self.valid_rows[i] else None,
+            }
+            if self.face_ids is not None:
+                representation["face_id"] = int(self.face_ids[i])
+            for j, key in enumerate(FACIAL_AREA_KEYS):
+                representation[key] = int(self.facial_areas[i, j])
+            representations.append(representation)
+        return representations
+
+
+def from_representations(
+    representations: List[Dict[str, Any]], ids: Optional[Union[List[int], np.ndarray]] = None
+) -> Datastore:
+    """
+    Build a store from a list of dict representations
+    Args:
+        representations (list): representations as returned by find's bulk embedding
+        ids (list or np.ndarray): stable id of each row. Row numbers are used
+            if left unset (default is None).
+    Returns:
+        store (Datastore): columnar store
+    """
+    for i, current_representation in enumerate(representations):
+        missing_keys = set(REPRESENTATION_KEYS) - set(current_representation.keys())
+        if len(missing_keys) > 0:
+            raise ValueError(f"{i}-th item does not have some required keys - {missing_keys}.")
+
+    valid_rows = np.array(
+        [rep["embedding"] is not None for rep in representations], dtype=bool
+    ).reshape(-1)
+
+    dims = {len(rep["embedding"]) for rep in representations if rep["embedding"] is not None}
+    if len(dims) > 1:
+        raise ValueError(
+            f"Embeddings have different dimensions - {dims}. Model structure may change."
+        )
+    embeddings = np.zeros((len(representations), dims.pop() if dims else 0), dtype=np.float32)
+    for i, rep in enumerate(representations):
+        if rep["embedding"] is not None:
+            embeddings[i] = rep["embedding"]
+
+    face_ids = None
+    if any("face_id" in rep for rep in representations):
+        face_ids = np.array(
+            [
+                NO_FACE_ID if rep.get("face_id") is None else rep["face_id"]
+                for rep in representations
+            ],
+            dtype=np.int64,
+        ).reshape(-1)
+
+    return Datastore(
+        ids=(
+            np.arange(len(representations), dtype=np.int64)
+            if ids is None
+            else np.asarray(ids, dtype=np.int64).reshape(-1)
+        ),
+        identities=np.array([rep["identity"] for rep in representations], dtype=str).reshape(-1),
+        hashes=np.array([rep["hash"] for rep in representations], dtype=str).reshape(-1),
+        face_ids=face_ids,
+        facial_areas=np.array(
+            [[rep[key] or 0 for key in FACIAL_AREA_KEYS] for rep in representations],
+            dtype=np.int32,
+        ).reshape(-1, 4),
+        valid_rows=valid_rows,
+        embeddings=embeddings,
+    )
+
+
+def concat(stores: List[Datastore]) -> Datastore:
+    """
+    Append stores one after another
+    Args:
+        stores (list): stores having same embedding dimensions
+    Returns:
+        store (Datastore): concatenated store
+    """
+    next_id = max(store.next_id for store in stores)
+    stores = [store for store in stores if len(store) > 0] or stores[:1]
+    dims = {store.embeddings.shape[1] for store in stores if store.valid_rows.any()}
+    if len(dims) > 1:
+        raise ValueError(
+            f"Embeddings have different dimensions - {dims}. Model structure may change."
+        )
+    dimensions = dims.pop() if dims else 0
+    tracks_face_ids = any(store.face_ids is not None for store in stores)
+
+    return Datastore(
+        ids=np.concatenate([store.ids for store in stores]),
+        identities=np.concatenate([store.identities for store in stores]).astype(str),
+        hashes=np.concatenate([store.hashes for store in stores]).astype(str),
+        face_ids=(
+            np.concatenate(
+                [
+                    (
+                        store.face_ids
+                        if store.face_ids is not None
+                        else np.full(len(store), NO_FACE_ID, dtype=np.int64)
+                    )
+                    for store in stores
+                ]
+            )
+            if tracks_face_ids
+            else None
+        ),
+        facial_areas=np.concatenate([store.facial_areas for store in stores]),
+        valid_rows=np.concatenate([store.valid_rows for store in stores]),
+        embeddings=np.concatenate(
+            [
+                (
+                    store.embeddings
+                    if store.embeddings.shape[1] == dimensions
+                    else np.zeros((len(store), dimensions), dtype=np.float32)
+                )
+                for store in stores
+            ]
+        ).astype(np.float32, copy=False),
+        next_id=next_id,
+    )
+
+
+def append(store: Datastore, representations: List[Dict[str, Any]]) -> Datastore:
+    """
+    Append representations to a store with fresh ids
+    Args:
+        store (Datastore): existing store
+        representations (list): representations as returned by find's bulk embedding
+    Returns:
+        store (Datastore): new store, appended rows get ids starting from store.next_id
+    """
+    ids = np.arange(store.next_id, store.next_id + len(representations), dtype=np.int64)
+    return concat([store, from_representations(representations, ids=ids)])
+
+
+def find_store_path(path: str) -> str:
+    """
+    Find path of the columnar store replacing a legacy pickle datastore
+    Args:
+        path (str): path of the pickle datastore, e.g. ds_model_vggface_....pkl
+    Returns:
+        store_path (str): path of the store's metadata file ending with .npz
+    """
+    root, extension = os.path.splitext(path)
+    if extension == ".npz":
+        return path
+    return (root if extension == ".pkl" else path) + ".npz"
+
+
+def exists(path: str) -> bool:
+    """
+    Check a store was saved to the given path
+    Args:
+        path (str): path of the store's metadata file
+    Returns:
+        exists (bool)
+    """
+    return os.path.exists(path)
+
+
+def signature(path: str) -> Tuple[int, int, int]:
+    """
+    Inode, modification time and size of a store. Metadata file is replaced on every save,
+        so its inode changes whenever the store changes, even within the same mtime tick.
+    Args:
+        path (str): path of the store's metadata file
+    Returns:
+        signature (tuple): inode, modification time in nanoseconds and file size in bytes
+    """
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def save(path: str, store: Datastore) -> None:
+    """
+    Store representations on disk.
+        Embeddings are written into a new .npy file, then the metadata file referring to
+        it is replaced atomically. Readers see either the previous or the new version.
+    Args:
+        path (str): path of the store's metadata file, must end with .npz
+        store (Datastore): representations to be stored
+    """
+    if not path.endswith(".npz"):
+        raise ValueError(f"Datastore path must end with .npz but it was {path}")
+
+    previous_embeddings_path = None
+    if exists(path):
+        previous_embeddings_path = __find_embeddings_path(path)
+
+    root = path[: -len(".npz")]
+    embeddings_path = f"{root}.{uuid.uuid4().hex[:12]}.npy"
+    np.save(embeddings_path, np.ascontiguousarray(store.embeddings, dtype=np.float32))
+
+    columns = {
+        "ids": store.ids.astype(np.int64),
+        "identities": store.identities.astype(str),
+        "hashes": store.hashes.astype(str),
+        "facial_areas": store.facial_areas.astype(np.int32),
+        "valid_rows": store.valid_rows.astype(bool),
+        "next_id": np.array(store.next_id, dtype=np.int64),
+        "embeddings_file": np.array(os.path.basename(embeddings_path)),
+    }
+    if store.face_ids is not None:
+        columns["face_ids"] = store.face_ids.astype(np.int64)
+
+    tmp_path = f"{root}.{uuid.uuid4().hex[:12]}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
+
+    # processes still mapping the previous version keep reading it until they reload
+    if previous_embeddings_path is not None and previous_embeddings_path != embeddings_path:
+        try:
+            os.remove(previous_embeddings_path)
+        except FileNotFoundError:
+            pass
+
+
+def load(path: str, mmap: bool = True) -> Datastore:
+    """
+    Load a store saved with save
+    Args:
+        path (str): path of the store's metadata file
+        mmap (bool): map embeddings into memory lazily instead of reading them (default is True)
+    Returns:
+        store (Datastore): loaded store. Embeddings are read-only if memory mapped.
+    """
+    # metadata might be replaced by another process while embeddings file is opened
+    for attempt in range(3):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {key: data[key] for key in data.files}
+        embeddings_path = os.path.join(
+            os.path.dirname(path), str(columns["embeddings_file"])
+        )
+        try:
+            embeddings = np.load(embeddings_path, mmap_mode="r" if mmap else None)
+            break
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+    return Datastore(
+        ids=columns["ids"],
+        identities=columns["identities"],
+        hashes=columns["hashes"],
+        face_ids=columns.get("face_ids"),
+        facial_areas=columns["facial_areas"],
+        valid_rows=columns["valid_rows"],
+        embeddings=embeddings,
+        next_id=int(columns.get("next_id", 0)),
+    )
+
+
+def remove(path: str) -> None:
+    """
+    Delete a store from disk. Processes still mapping it keep reading it.
+    Args:
+        path (str): path of the store's metadata file
+    """
+    if not exists(path):
+        return
+    embeddings_path = __find_embeddings_path(path)
+    os.remove(path)
+    if embeddings_path is not None and os.path.exists(embeddings_path):
+        os.remove(embeddings_path)
+
+
+def migrate(pickle_path: str, path: Optional[str] = None) -> Datastore:
+    """
+    One-shot migration of a legacy pickle datastore into a columnar store.
+        Both pickled list of dict representations and pickled DataFrames are supported.
+        Pickle file is left untouched.
+    Args:
+        pickle_path (str): path of the legacy pickle datastore
+        path (str): path of the store's metadata file. It is derived from
+            pickle_path if left unset (default is None).
+    Returns:
+        store (Datastore): migrated store
+    """
+    path = path or find_store_path(pickle_path)
+
+    with open(pickle_path, "rb") as f:
+        representations = pickle.load(f)
+
+    ids = None
+    if isinstance(representations, pd.DataFrame):
+        ids = representations.index.to_numpy()
+        representations = representations.to_dict("records")
+
+    try:
+        store = from_representations(representations, ids=ids)
+    except ValueError as err:
+        raise ValueError(f"{err} Consider to delete {pickle_path}") from err
+
+    save(path, store)
+    logger.info(f"{len(store)} representations in {pickle_path} migrated to {path}")
+    return store
+
+
+def __find_embeddings_path(path: str) -> Optional[str]:
+    with np.load(path, allow_pickle=False) as data:
+        if "embeddings_file" not in data.files:
+            return None
+        embeddings_file = str(data["embeddings_file"])
+    return os.path.join(os.path.dirname(path), embeddings_file)
@@ -7,7 +7,6 @@ from tqdm import tqdm
 
 # project dependencies
 from deepface.modules import modeling, detection, preprocessing
-from deepface.models.demography import Gender, Race, Emotion
 
 
 def analyze(
@@ -100,6 +99,48 @@ def analyze(
                - 'white': Confidence score for White ethnicity.
     """
 
+    return analyze_batch(
+        img_paths=[img_path],
+        actions=actions,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        silent=silent,
+        anti_spoofing=anti_spoofing,
+    )[0]
+
+
+def analyze_batch(
+    img_paths: List[Union[str, np.ndarray]],
+    actions: Union[tuple, list] = ("emotion", "age", "gender", "race"),
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    silent: bool = False,
+    anti_spoofing: bool = False,
+    batch_size: int = 32,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Analyze facial attributes of many images. Faces of all images are preprocessed once and
+        each attribute model is run over them in chunks of batch_size instead of one forward
+        pass per face and action.
+
+    Args:
+        img_paths (list): exact paths of images, numpy arrays in BGR format,
+            or base64 encoded images.
+
+        actions, enforce_detection, detector_backend, align, expand_percentage, silent,
+            anti_spoofing: see analyze.
+
+        batch_size (int): Number of faces fed to the models at once (default is 32).
+
+    Returns:
+        results (List[List[Dict[str, Any]]]): For each image, a list of dictionaries having
+            same fields with analyze's response.
+    """
+
     # if actions is passed as tuple with single item, interestingly it becomes str here
     if isinstance(actions, str):
         actions = (actions,)
@@ -117,96 +158,153 @@ def analyze(
                 f"Invalid action passed ({repr(action)})). "
                 "Valid actions are `emotion`, `age`, `gender`, `race`."
             )
+
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer but it is {batch_size}")
+
     # ---------------------------------
-    resp_objects = []
+    resp_objects: List[List[Dict[str, Any]]] = []
+    pending: List[Dict[str, Any]] = []
+    faces: List[np.ndarray] = []
+    img_objs_pending: List[Dict[str, Any]] = []
+
+    def flush():
+        __analyze_faces(
+            faces=faces,
+            img_objs=img_objs_pending,
+            resp_objs=pending,
+            actions=actions,
+            silent=silent,
+        )
+        pending.clear()
+        faces.clear()
+        img_objs_pending.clear()
 
-    img_objs = detection.extract_faces(
-        img_path=img_path,
+    # faces are kept as uint8 bgr crops, they are scaled while resizing
+    img_objs_batch = detection.extract_faces_batch(
+        img_paths=img_paths,
         detector_backend=detector_backend,
         enforce_detection=enforce_detection,
         grayscale=False,
+        color_face="bgr",
+        normalize_face=False,
         align=align,
         expand_percentage=expand_percentage,
         anti_spoofing=anti_spoofing,
     )
 
-    for img_obj in img_objs:
-        if anti_spoofing is True and img_obj.get("is_real", True) is False:
-            raise ValueError("Spoof detected in the given image.")
+    for img_objs in img_objs_batch:
+        img_resp_objs = []
+        for img_obj in img_objs:
+            if anti_spoofing is True and img_obj.get("is_real", True) is False:
+                raise ValueError("Spoof detected in the given image.")
 
-        img_content = img_obj["face"]
-        img_region = img_obj["facial_area"]
-        img_confidence = img_obj["confidence"]
-        if img_content.shape[0] == 0 or img_content.shape[1] == 0:
-            continue
+            img_content = img_obj["face"]
+            if img_content.shape[0] == 0 or img_content.shape[1] == 0:
+                continue
 
-        # rgb to bgr
-        img_content = img_content[:, :, ::-1]
+            obj: Dict[str, Any] = {}
+            img_resp_objs.append(obj)
+            pending.append(obj)
+            faces.append(img_content)
+            img_objs_pending.append(img_obj)
+            if len(faces) >= batch_size:
+                flush()
+        resp_objects.append(img_resp_objs)
 
-        # resize input image
-        img_content = preprocessing.resize_image(img=img_content, target_size=(224, 224))
+    if len(faces) > 0:
+        flush()
 
-        obj = {}
-        # facial attribute analysis
-        pbar = tqdm(
-            range(0, len(actions)),
-            desc="Finding actions",
-            disable=silent if len(actions) > 1 else True,
-        )
-        for index in pbar:
-            action = actions[index]
-            pbar.set_description(f"Action: {action}")
+    return resp_objects
 
-            if action == "emotion":
-                emotion_predictions = modeling.build_model(
-                    task="facial_attribute", model_name="Emotion"
-                ).predict(img_content)
-                sum_of_predictions = emotion_predictions.sum()
 
+def __analyze_faces(
+    faces: List[np.ndarray],
+    img_objs: List[Dict[str, Any]],
+    resp_objs: List[Dict[str, Any]],
+    actions: List[str],
+    silent: bool,
+) -> None:
+    """
+    Run each attribute model once over a chunk of faces and store results in their objects
+    Args:
+        faces (list): detected faces as uint8 bgr crops
+        img_objs (list): extracted face objects of the faces
+        resp_objs (list): response objects of the faces to be filled
+        actions (list): attributes to analyze
+        silent (bool): suppress or allow the progress bar of actions
+    """
+    # demography clients import tensorflow, so they are loaded once an analysis is asked for
+    from deepface.models.demography import Gender, Race, Emotion
+
+    # Age, Gender and Race models share the architecture of VGG-Face but each of them is
+    # fine tuned as a whole, so preprocessing is what can be shared between them.
+    imgs = np.empty((len(faces), 224, 224, 3), dtype=np.float32)
+    for face, out in zip(faces, imgs):
+        preprocessing.prepare_face(img=face, target_size=(224, 224), out=out)
+
+    # facial attribute analysis
+    pbar = tqdm(
+        range(0, len(actions)),
+        desc="Finding actions",
+        disable=silent if len(actions) > 1 else True,
+    )
+    for index in pbar:
+        action = actions[index]
+        pbar.set_description(f"Action: {action}")
+
+        if action == "emotion":
+            emotion_predictions = modeling.build_model(
+                task="facial_attribute", model_name="Emotion"
+            ).predict_batch(imgs)
+            sum_of_predictions = emotion_predictions.sum(axis=1)
+
+            for obj, predictions, total in zip(resp_objs, emotion_predictions, sum_of_predictions):
                 obj["emotion"] = {}
                 for i, emotion_label in enumerate(Emotion.labels):
-                    emotion_prediction = 100 * emotion_predictions[i] / sum_of_predictions
+                    emotion_prediction = 100 * predictions[i] / total
                     obj["emotion"][emotion_label] = emotion_prediction
 
-                obj["dominant_emotion"] = Emotion.labels[np.argmax(emotion_predictions)]
+                obj["dominant_emotion"] = Emotion.labels[np.argmax(predictions)]
 
-            elif action == "age":
-                apparent_age = modeling.build_model(
-                    task="facial_attribute", model_name="Age"
-                ).predict(img_content)
+        elif action == "age":
+            apparent_ages = modeling.build_model(
+                task="facial_attribute", model_name="Age"
+            ).predict_batch(imgs)
+            for obj, apparent_age in zip(resp_objs, apparent_ages):
                 # int cast is for exception - object of type 'float32' is not JSON serializable
                 obj["age"] = int(apparent_age)
 
-            elif action == "gender":
-                gender_predictions = modeling.build_model(
-                    task="facial_attribute", model_name="Gender"
-                ).predict(img_content)
+        elif action == "gender":
+            gender_predictions = modeling.build_model(
+                task="facial_attribute", model_name="Gender"
+            ).predict_batch(imgs)
+            for obj, predictions in zip(resp_objs, gender_predictions):
                 obj["gender"] = {}
                 for i, gender_label in enumerate(Gender.labels):
-                    gender_prediction = 100 * gender_predictions[i]
+                    gender_prediction = 100 * predictions[i]
                     obj["gender"][gender_label] = gender_prediction
 
-                obj["dominant_gender"] = Gender.labels[np.argmax(gender_predictions)]
+                obj["dominant_gender"] = Gender.labels[np.argmax(predictions)]
 
-            elif action == "race":
-                race_predictions = modeling.build_model(
-                    task="facial_attribute", model_name="Race"
-                ).predict(img_content)
-                sum_of_predictions = race_predictions.sum()
+        elif action == "race":
+            race_predictions = modeling.build_model(
+                task="facial_attribute", model_name="Race"
+            ).predict_batch(imgs)
+            sum_of_predictions = race_predictions.sum(axis=1)
 
+            for obj, predictions, total in zip(resp_objs, race_predictions, sum_of_predictions):
                 obj["race"] = {}
                 for i, race_label in enumerate(Race.labels):
-                    race_prediction = 100 * race_predictions[i] / sum_of_predictions
+                    race_prediction = 100 * predictions[i] / total
                     obj["race"][race_label] = race_prediction
 
-                obj["dominant_race"] = Race.labels[np.argmax(race_predictions)]
-
-            # -----------------------------
-            # mention facial areas
-            obj["region"] = img_region
-            # include image confidence
-            obj["face_confidence"] = img_confidence
+                obj["dominant_race"] = Race.labels[np.argmax(predictions)]
 
-        resp_objects.append(obj)
-
-    return resp_objects
+        # region and confidence follow the keys of the first action in responses
+        if index == 0:
+            for obj, img_obj in zip(resp_objs, img_objs):
+                # mention facial areas
+                obj["region"] = img_obj["facial_area"]
+                # include image confidence
+                obj["face_confidence"] = img_obj["confidence"]
@@ -1,5 +1,5 @@
 # built-in dependencies
-from typing import Any, Dict, List, Tuple, Union, Optional
+from typing import Any, Callable, Dict, List, Tuple, Union, Optional
 
 # 3rd part dependencies
 from heapq import nlargest
@@ -29,6 +29,7 @@ def extract_faces(
     normalize_face: bool = True,
     anti_spoofing: bool = False,
     max_faces: Optional[int] = None,
+    detection_max_side: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
     Extract faces from a given image
@@ -59,6 +60,10 @@ def extract_faces(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        detection_max_side (int): Downscale the image so that its longer side is at most this
+            many pixels before running the detector. Facial areas are mapped back, and faces
+            are cropped and aligned from the full resolution image (default is None).
+
     Returns:
         results (List[Dict[str, Any]]): A list of dictionaries, where each dictionary contains:
 
@@ -79,20 +84,14 @@ def extract_faces(
             just available in the result only if anti_spoofing is set to True in input arguments.
     """
 
-    resp_objs = []
-
     # img might be path, base64 or numpy array. Convert it to numpy whatever it is.
     img, img_name = image_utils.load_image(img_path)
 
     if img is None:
         raise ValueError(f"Exception while loading {img_name}")
 
-    height, width, _ = img.shape
-
-    base_region = FacialAreaRegion(x=0, y=0, w=width, h=height, confidence=0)
-
     if detector_backend == "skip":
-        face_objs = [DetectedFace(img=img, facial_area=base_region, confidence=0)]
+        face_objs = None
     else:
         face_objs = detect_faces(
             detector_backend=detector_backend,
@@ -100,8 +99,116 @@ def extract_faces(
             align=align,
             expand_percentage=expand_percentage,
             max_faces=max_faces,
+            detection_max_side=detection_max_side,
         )
 
+    return __build_face_objs(
+        img=img,
+        img_name=img_name,
+        face_objs=face_objs,
+        enforce_detection=enforce_detection,
+        grayscale=grayscale,
+        color_face=color_face,
+        normalize_face=normalize_face,
+        anti_spoofing=anti_spoofing,
+    )
+
+
+def extract_faces_batch(
+    img_paths: List[Union[str, np.ndarray]],
+    detector_backend: str = "opencv",
+    enforce_detection: bool = True,
+    align: bool = True,
+    expand_percentage: int = 0,
+    grayscale: bool = False,
+    color_face: str = "rgb",
+    normalize_face: bool = True,
+    anti_spoofing: bool = False,
+    max_faces: Optional[int] = None,
+    detection_max_side: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Extract faces from many images. Detectors supporting batches find faces of all images
+        with a single forward pass, others are run image by image.
+
+    Args:
+        img_paths (list): exact image paths as strings, numpy arrays (BGR),
+            or base64 encoded images.
+
+        detector_backend, enforce_detection, align, expand_percentage, grayscale, color_face,
+            normalize_face, anti_spoofing, max_faces, detection_max_side: see extract_faces.
+
+    Returns:
+        results (List[List[Dict[str, Any]]]): For each image, a list of dictionaries having
+            the same fields with extract_faces. An exception is raised for the first image
+            extract_faces would raise for.
+    """
+    imgs = []
+    img_names = []
+    for img_path in img_paths:
+        img, img_name = image_utils.load_image(img_path)
+        if img is None:
+            raise ValueError(f"Exception while loading {img_name}")
+        imgs.append(img)
+        img_names.append(img_name)
+
+    if detector_backend == "skip":
+        face_objs_batch: List[Optional[List[DetectedFace]]] = [None] * len(imgs)
+    else:
+        face_objs_batch = detect_faces_batch(
+            detector_backend=detector_backend,
+            imgs=imgs,
+            align=align,
+            expand_percentage=expand_percentage,
+            max_faces=max_faces,
+            detection_max_side=detection_max_side,
+        )
+
+    return [
+        __build_face_objs(
+            img=img,
+            img_name=img_name,
+            face_objs=face_objs,
+            enforce_detection=enforce_detection,
+            grayscale=grayscale,
+            color_face=color_face,
+            normalize_face=normalize_face,
+            anti_spoofing=anti_spoofing,
+        )
+        for img, img_name, face_objs in zip(imgs, img_names, face_objs_batch)
+    ]
+
+
+def __build_face_objs(
+    img: np.ndarray,
+    img_name: Optional[str],
+    face_objs: Optional[List[DetectedFace]],
+    enforce_detection: bool,
+    grayscale: bool,
+    color_face: str,
+    normalize_face: bool,
+    anti_spoofing: bool,
+) -> List[Dict[str, Any]]:
+    """
+    Turn detected faces of an image into the response of extract_faces
+    Args:
+        img (np.ndarray): loaded image
+        img_name (str): name of the image used in error messages
+        face_objs (list): detected faces, None if detection is skipped
+        enforce_detection, grayscale, color_face, normalize_face, anti_spoofing:
+            see extract_faces
+    Returns:
+        results (List[Dict[str, Any]]): see extract_faces
+    """
+    resp_objs = []
+
+    height, width, _ = img.shape
+
+    base_region = FacialAreaRegion(x=0, y=0, w=width, h=height, confidence=0)
+
+    if face_objs is None:
+        face_objs = [DetectedFace(img=img, facial_area=base_region, confidence=0)]
+
     # in case of no face found
     if len(face_objs) == 0 and enforce_detection is True:
         if img_name is not None:
@@ -161,14 +268,22 @@ def extract_faces(
             "confidence": round(float(current_region.confidence or 0), 2),
         }
 
-        if anti_spoofing is True:
-            antispoof_model = modeling.build_model(task="spoofing", model_name="Fasnet")
-            is_real, antispoof_score = antispoof_model.analyze(img=img, facial_area=(x, y, w, h))
+        resp_objs.append(resp_obj)
+
+    if anti_spoofing is True and len(resp_objs) > 0:
+        # all faces of the image are checked with a single forward pass of each model
+        antispoof_model = modeling.build_model(task="spoofing", model_name="Fasnet")
+        antispoof_results = antispoof_model.analyze_batch(
+            img=img,
+            facial_areas=[
+                tuple(resp_obj["facial_area"][key] for key in ["x", "y", "w", "h"])
+                for resp_obj in resp_objs
+            ],
+        )
+        for resp_obj, (is_real, antispoof_score) in zip(resp_objs, antispoof_results):
             resp_obj["is_real"] = is_real
             resp_obj["antispoof_score"] = antispoof_score
 
-        resp_objs.append(resp_obj)
-
     if len(resp_objs) == 0 and enforce_detection == True:
         raise ValueError(
             f"Exception while extracting faces from {img_name}."
@@ -184,6 +299,9 @@ def detect_faces(
     align: bool = True,
     expand_percentage: int = 0,
     max_faces: Optional[int] = None,
+    align_mode: str = "patch",
+    detection_max_side: Optional[int] = None,
+    bordered_detection: bool = True,
 ) -> List[DetectedFace]:
     """
     Detect face(s) from a given image
@@ -196,6 +314,20 @@ def detect_faces(
 
         expand_percentage (int): expand detected facial area with a percentage (default is 0).
 
+        align_mode (str): patch warps only the facial area of each face. image rotates the
+            whole bordered image once per face. A face is aligned the same way by both modes
+            (default is patch).
+
+        bordered_detection (bool): run the detector on a copy of the image bordered by half
+            its size when align is True. Set it to False to detect on the image as it is in
+            patch mode, which skips the copy but may find different faces close to the image
+            boundaries (default is True).
+
+        detection_max_side (int): run the detector on a copy of the image downscaled so that
+            its longer side is at most this many pixels. Facial areas and eyes are mapped back
+            to the full resolution image, which faces are cropped and aligned from
+            (default is None).
+
     Returns:
         results (List[DetectedFace]): A list of DetectedFace objects
             where each object contains:
@@ -208,7 +340,48 @@ def detect_faces(
 
         - confidence (float): The confidence score associated with the detected face.
     """
-    height, width, _ = img.shape
+    return detect_faces_batch(
+        detector_backend=detector_backend,
+        imgs=[img],
+        align=align,
+        expand_percentage=expand_percentage,
+        max_faces=max_faces,
+        align_mode=align_mode,
+        detection_max_side=detection_max_side,
+        bordered_detection=bordered_detection,
+    )[0]
+
+
+def detect_faces_batch(
+    detector_backend: str,
+    imgs: List[np.ndarray],
+    align: bool = True,
+    expand_percentage: int = 0,
+    max_faces: Optional[int] = None,
+    align_mode: str = "patch",
+    detection_max_side: Optional[int] = None,
+    bordered_detection: bool = True,
+) -> List[List[DetectedFace]]:
+    """
+    Detect face(s) from many images, the detector is fed all of them at once
+    Args:
+        detector_backend (str): detector name
+
+        imgs (list): pre-loaded images
+
+        align, expand_percentage, max_faces, align_mode, detection_max_side,
+            bordered_detection: see detect_faces
+
+    Returns:
+        results (List[List[DetectedFace]]): For each image, a list of DetectedFace objects
+    """
+    if align_mode not in ("patch", "image"):
+        raise ValueError(f"align_mode must be patch or image, but it is {align_mode}")
+    if detection_max_side is not None and detection_max_side < 1:
+        raise ValueError(
+            f"detection_max_side must be a positive integer but it is {detection_max_side}"
+        )
+
     face_detector: Detector = modeling.build_model(
         task="face_detector", model_name=detector_backend
     )
@@ -221,40 +394,187 @@ def detect_faces(
         )
         expand_percentage = 0
 
-    # If faces are close to the upper boundary, alignment move them outside
-    # Add a black border around an image to avoid this.
-    height_border = int(0.5 * height)
-    width_border = int(0.5 * width)
-    if align is True:
-        img = cv2.copyMakeBorder(
-            img,
-            height_border,
-            height_border,
-            width_border,
-            width_border,
-            cv2.BORDER_CONSTANT,
-            value=[0, 0, 0],  # Color of the border (black)
+    bordered_imgs = []
+    borders = []
+    detector_imgs = []
+    mappings = []
+    for img in imgs:
+        height, width, _ = img.shape
+
+        # If faces are close to the upper boundary, alignment move them outside
+        # Add a black border around an image to avoid this. Patch alignment treats pixels
+        # out of the image as this border, so only the detector may need the bordered copy.
+        height_border = int(0.5 * height)
+        width_border = int(0.5 * width)
+        bordered = align is True and (align_mode == "image" or bordered_detection is True)
+        bordered_img = img
+        if bordered:
+            bordered_img = cv2.copyMakeBorder(
+                img,
+                height_border,
+                height_border,
+                width_border,
+                width_border,
+                cv2.BORDER_CONSTANT,
+                value=[0, 0, 0],  # Color of the border (black)
+            )
+        bordered_imgs.append(bordered_img)
+        borders.append((width_border, height_border))
+
+        if detection_max_side is not None and max(height, width) > detection_max_side:
+            small_img, mapping = __downscale_for_detection(
+                img=img,
+                bordered=bordered,
+                detection_max_side=detection_max_side,
+                width_border=width_border,
+                height_border=height_border,
+            )
+            detector_imgs.append(small_img)
+            mappings.append(mapping)
+        else:
+            detector_imgs.append(bordered_img)
+            mappings.append(None)
+
+    # find facial areas of given images
+    if len(detector_imgs) == 1:
+        facial_areas_batch = [face_detector.detect_faces(detector_imgs[0])]
+    else:
+        facial_areas_batch = face_detector.detect_faces_batch(detector_imgs)
+
+    results = []
+    for img, bordered_img, (width_border, height_border), mapping, facial_areas in zip(
+        imgs, bordered_imgs, borders, mappings, facial_areas_batch
+    ):
+        if mapping is not None:
+            facial_areas = [mapping(facial_area) for facial_area in facial_areas]
+
+        if align is True and align_mode == "patch":
+            # patch alignment reads the image as it is, so faces found in the bordered copy
+            # are moved back to its coordinates
+            if bordered_img is not img:
+                facial_areas = [
+                    __shift_facial_area(facial_area, -width_border, -height_border)
+                    for facial_area in facial_areas
+                ]
+            bordered_img = img
+
+        if max_faces is not None and max_faces < len(facial_areas):
+            facial_areas = nlargest(
+                max_faces, facial_areas, key=lambda facial_area: facial_area.w * facial_area.h
+            )
+
+        results.append(
+            [
+                expand_and_align_face(
+                    facial_area=facial_area,
+                    img=bordered_img,
+                    align=align,
+                    expand_percentage=expand_percentage,
+                    width_border=width_border,
+                    height_border=height_border,
+                    align_mode=align_mode,
+                )
+                for facial_area in facial_areas
+            ]
         )
+    return results
+
+
+def __shift_facial_area(facial_area: FacialAreaRegion, dx: int, dy: int) -> FacialAreaRegion:
+    """
+    Move a facial area and its eyes
+    Args:
+        facial_area (FacialAreaRegion): facial area to move
+        dx (int): offset added to x coordinates
+        dy (int): offset added to y coordinates
+    Returns:
+        facial_area (FacialAreaRegion): moved facial area
+    """
+
+    def to_point(point: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        if point is None:
+            return None
+        return (point[0] + dx, point[1] + dy)
+
+    return FacialAreaRegion(
+        x=facial_area.x + dx,
+        y=facial_area.y + dy,
+        w=facial_area.w,
+        h=facial_area.h,
+        left_eye=to_point(facial_area.left_eye),
+        right_eye=to_point(facial_area.right_eye),
+        confidence=facial_area.confidence,
+    )
 
-    # find facial areas of given image
-    facial_areas = face_detector.detect_faces(img)
 
-    if max_faces is not None and max_faces < len(facial_areas):
-        facial_areas = nlargest(
-            max_faces, facial_areas, key=lambda facial_area: facial_area.w * facial_area.h
+def __downscale_for_detection(
+    img: np.ndarray,
+    bordered: bool,
+    detection_max_side: int,
+    width_border: int,
+    height_border: int,
+) -> Tuple[np.ndarray, Callable[[FacialAreaRegion], FacialAreaRegion]]:
+    """
+    Downscale an image to be fed to a detector
+    Args:
+        img (np.ndarray): full resolution image without borders
+        bordered (bool): whether detect_faces borders the full resolution image
+        detection_max_side (int): longer side of the downscaled image before bordering
+        width_border (int): left and right border added to the full resolution image
+        height_border (int): top and bottom border added to the full resolution image
+    Returns:
+        small_img (np.ndarray): downscaled image, bordered if bordered is True
+        mapping (callable): maps a facial area found in the downscaled image to coordinates
+            of the full resolution image, bordered if bordered is True
+    """
+    if bordered is False:
+        width_border, height_border = 0, 0
+
+    height, width = img.shape[:2]
+    factor = detection_max_side / max(height, width)
+    small_width, small_height = max(1, round(width * factor)), max(1, round(height * factor))
+    small_img = cv2.resize(img, (small_width, small_height), interpolation=cv2.INTER_AREA)
+
+    # border the downscaled image as detect_faces borders the full resolution one
+    small_width_border, small_height_border = 0, 0
+    if bordered is True:
+        small_height_border = int(0.5 * small_height)
+        small_width_border = int(0.5 * small_width)
+        small_img = cv2.copyMakeBorder(
+            small_img,
+            small_height_border,
+            small_height_border,
+            small_width_border,
+            small_width_border,
+            cv2.BORDER_CONSTANT,
+            value=[0, 0, 0],
         )
 
-    return [
-        expand_and_align_face(
-            facial_area=facial_area,
-            img=img,
-            align=align,
-            expand_percentage=expand_percentage,
-            width_border=width_border,
-            height_border=height_border,
+    scale_x, scale_y = width / small_width, height / small_height
+
+    def to_x(value: float) -> int:
+        return int(round((value - small_width_border) * scale_x + width_border))
+
+    def to_y(value: float) -> int:
+        return int(round((value - small_height_border) * scale_y + height_border))
+
+    def to_point(point: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        if point is None:
+            return None
+        return (to_x(point[0]), to_y(point[1]))
+
+    def mapping(facial_area: FacialAreaRegion) -> FacialAreaRegion:
+        return FacialAreaRegion(
+            x=to_x(facial_area.x),
+            y=to_y(facial_area.y),
+            w=int(round(facial_area.w * scale_x)),
+            h=int(round(facial_area.h * scale_y)),
+            left_eye=to_point(facial_area.left_eye),
+            right_eye=to_point(facial_area.right_eye),
+            confidence=facial_area.confidence,
         )
-        for facial_area in facial_areas
-    ]
+
+    return small_img, mapping
 
 
 def expand_and_align_face(
@@ -264,6 +584,7 @@ def expand_and_align_face(
     expand_percentage: int,
     width_border: int,
     height_border: int,
+    align_mode: str = "patch",
 ) -> DetectedFace:
     x = facial_area.x
     y = facial_area.y
@@ -273,6 +594,19 @@ def expand_and_align_face(
     right_eye = facial_area.right_eye
     confidence = facial_area.confidence
 
+    img_height, img_width = img.shape[:2]
+    if align is True and align_mode == "patch":
+        # image is not bordered in patch mode, faces are moved to the bordered frame to be
+        # expanded and aligned exactly as image mode does
+        x = x + width_border
+        y = y + height_border
+        if left_eye is not None:
+            left_eye = (left_eye[0] + width_border, left_eye[1] + height_border)
+        if right_eye is not None:
+            right_eye = (right_eye[0] + width_border, right_eye[1] + height_border)
+        img_height = img_height + 2 * height_border
+        img_width = img_width + 2 * width_border
+
     if expand_percentage > 0:
         # Expand the facial region height and width by the provided percentage
         # ensuring that the expanded region stays within img.shape limits
@@ -281,13 +615,23 @@ def expand_and_align_face(
 
         x = max(0, x - int((expanded_w - w) / 2))
         y = max(0, y - int((expanded_h - h) / 2))
-        w = min(img.shape[1] - x, expanded_w)
-        h = min(img.shape[0] - y, expanded_h)
-
-    # extract detected face unaligned
-    detected_face = img[int(y) : int(y + h), int(x) : int(x + w)]
-    # align original image, then find projection of detected face area after alignment
-    if align is True:  # and left_eye is not None and right_eye is not None:
+        w = min(img_width - x, expanded_w)
+        h = min(img_height - y, expanded_h)
+
+    if align is False:
+        # extract detected face unaligned
+        detected_face = img[int(y) : int(y + h), int(x) : int(x + w)]
+    elif align_mode == "patch":
+        # warp just the projection of detected face area in the aligned image
+        detected_face = align_facial_area_wrt_eyes(
+            img=img,
+            left_eye=left_eye,
+            right_eye=right_eye,
+            facial_area=(x, y, x + w, y + h),
+            border=(width_border, height_border),
+        )
+    else:  # left_eye and right_eye may be None, then the image is not rotated
+        # align original image, then find projection of detected face area after alignment
         aligned_img, angle = align_img_wrt_eyes(img=img, left_eye=left_eye, right_eye=right_eye)
 
         rotated_x1, rotated_y1, rotated_x2, rotated_y2 = project_facial_area(
@@ -297,6 +641,7 @@ def expand_and_align_face(
             int(rotated_y1) : int(rotated_y2), int(rotated_x1) : int(rotated_x2)
         ]
 
+    if align is True:
         # restore x, y, le and re before border added
         x = x - width_border
         y = y - height_border
@@ -349,6 +694,95 @@ def align_img_wrt_eyes(
     return img, angle
 
 
+def align_facial_area_wrt_eyes(
+    img: np.ndarray,
+    left_eye: Union[list, tuple],
+    right_eye: Union[list, tuple],
+    facial_area: Tuple[int, int, int, int],
+    border: Tuple[int, int] = (0, 0),
+) -> np.ndarray:
+    """
+    Find the aligned face align_img_wrt_eyes and project_facial_area would crop, without
+        rotating the whole image. The rotation is shifted to the projected facial area, so
+        only pixels of the face are interpolated.
+    Args:
+        img (np.ndarray): pre-loaded image with detected face
+        left_eye (list or tuple): coordinates of left eye with respect to the person itself
+        right_eye(list or tuple): coordinates of right eye with respect to the person itself
+        facial_area (tuple of int): (x1, y1, x2, y2) of the facial area in the image
+        border (tuple of int): width and height of a black border the image is aligned as if
+            it was surrounded by, without copying it. Eyes and facial area are given in the
+            bordered image (default is no border).
+    Returns:
+        img (np.ndarray): aligned facial image
+    """
+    x1, y1, x2, y2 = facial_area
+    width_border, height_border = border
+
+    # same early returns of align_img_wrt_eyes leave the image as it is
+    if left_eye is None or right_eye is None or img.shape[0] == 0 or img.shape[1] == 0:
+        return __crop_bordered(img, (int(x1), int(y1), int(x2), int(y2)), border)
+
+    angle = float(np.degrees(np.arctan2(left_eye[1] - right_eye[1], left_eye[0] - right_eye[0])))
+
+    (h, w) = img.shape[:2]
+    h, w = h + 2 * height_border, w + 2 * width_border
+    x1, y1, x2, y2 = project_facial_area(facial_area=facial_area, angle=angle, size=(h, w))
+    x1, y1, x2, y2 = max(int(x1), 0), max(int(y1), 0), min(int(x2), w), min(int(y2), h)
+    if x2 <= x1 or y2 <= y1:
+        return img[0:0, 0:0]
+
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    # rotate pixels of the image from where the border would have moved them
+    M[:, 2] += M[:, :2] @ np.array([width_border, height_border], dtype=np.float64)
+    # move origin of the rotated image to top left corner of the projected facial area
+    M[0, 2] -= x1
+    M[1, 2] -= y1
+    return cv2.warpAffine(
+        img,
+        M,
+        (x2 - x1, y2 - y1),
+        flags=cv2.INTER_CUBIC,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0),
+    )
+
+
+def __crop_bordered(
+    img: np.ndarray, facial_area: Tuple[int, int, int, int], border: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Crop an area of an image surrounded by a black border without copying the whole image
+    Args:
+        img (np.ndarray): pre-loaded image
+        facial_area (tuple of int): (x1, y1, x2, y2) of the area in the bordered image
+        border (tuple of int): width and height of the border
+    Returns:
+        img (np.ndarray): cropped area
+    """
+    width_border, height_border = border
+    if width_border == 0 and height_border == 0:
+        x1, y1, x2, y2 = facial_area
+        return img[y1:y2, x1:x2]
+
+    # clip the area to the bordered image as slicing it would
+    h, w = img.shape[0] + 2 * height_border, img.shape[1] + 2 * width_border
+    x1, y1, x2, y2 = [min(max(value, 0), size) for value, size in zip(facial_area, (w, h, w, h))]
+    cropped = np.zeros((max(y2 - y1, 0), max(x2 - x1, 0)) + img.shape[2:], dtype=img.dtype)
+
+    # copy the part of the area covering the image
+    src_x1, src_y1 = max(x1 - width_border, 0), max(y1 - height_border, 0)
+    src_x2 = min(x2 - width_border, img.shape[1])
+    src_y2 = min(y2 - height_border, img.shape[0])
+    if src_x2 > src_x1 and src_y2 > src_y1:
+        dst_x1, dst_y1 = src_x1 + width_border - x1, src_y1 + height_border - y1
+        cropped[dst_y1 : dst_y1 + src_y2 - src_y1, dst_x1 : dst_x1 + src_x2 - src_x1] = img[
+            src_y1:src_y2, src_x1:src_x2
+        ]
+    return cropped
+
+
 def project_facial_area(
     facial_area: Tuple[int, int, int, int], angle: float, size: Tuple[int, int]
 ) -> Tuple[int, int, int, int]:
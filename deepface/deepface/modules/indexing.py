@@ -0,0 +1,626 @@
+# built-in dependencies
+import os
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.modules import verification
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+AVAILABLE_INDEXES = ["flat", "ivf", "hnsw"]
+AVAILABLE_METRICS = ["cosine", "euclidean", "euclidean_l2"]
+
+
+class Index(ABC):
+    """
+    Nearest neighbour index of face embeddings.
+        Every embedding is stored with an integer id, e.g. face_id or row number
+        of the datastore. Adding an existing id replaces its embedding.
+    """
+
+    kind: str
+
+    def __init__(self, distance_metric: str = "cosine"):
+        if distance_metric not in AVAILABLE_METRICS:
+            raise ValueError(f"Invalid distance_metric passed - {distance_metric}")
+        self.distance_metric = distance_metric
+        self.dimensions: Optional[int] = None
+        # signature of the datastore this index is built from
+        self.source_signature: Optional[Tuple[int, ...]] = None
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def ids(self) -> np.ndarray:
+        """
+        Ids of stored embeddings
+        Returns:
+            ids (np.ndarray): int64 ids in ascending order
+        """
+
+    @abstractmethod
+    def add(self, ids: Union[List[int], np.ndarray], embeddings: Union[List, np.ndarray]) -> None:
+        """
+        Add embeddings into the index
+        Args:
+            ids (list or np.ndarray): integer id of each embedding
+            embeddings (list or np.ndarray): (N, D) embeddings
+        """
+
+    @abstractmethod
+    def remove(self, ids: Union[List[int], np.ndarray]) -> int:
+        """
+        Remove embeddings from the index
+        Args:
+            ids (list or np.ndarray): ids to be removed. Unknown ids are ignored.
+        Returns:
+            removed (int): number of removed embeddings
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        target: Union[List[float], np.ndarray],
+        k: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the closest embeddings to a target embedding
+        Args:
+            target (list or np.ndarray): embedding to search
+            k (int): maximum number of neighbours to return.
+                All candidates are returned if left unset (default is None).
+            threshold (float): drop neighbours farther than threshold (default is None).
+        Returns:
+            ids (np.ndarray): ids of neighbours, closest first
+            distances (np.ndarray): distances of neighbours as float64
+        """
+
+    @abstractmethod
+    def _save_state(self) -> Dict[str, np.ndarray]:
+        pass
+
+    @abstractmethod
+    def _load_state(self, state: Dict[str, np.ndarray], path: str) -> None:
+        pass
+
+    def save(self, path: str) -> None:
+        """
+        Store the index on disk. Existing file is replaced atomically.
+        Args:
+            path (str): exact path of the index file, must end with .npz
+        """
+        if not path.endswith(".npz"):
+            raise ValueError(f"Index path must end with .npz but it was {path}")
+
+        state = self._save_state()
+        state["kind"] = np.array(self.kind)
+        state["distance_metric"] = np.array(self.distance_metric)
+        state["dimensions"] = np.array(-1 if self.dimensions is None else self.dimensions)
+        state["source_signature"] = np.array(self.source_signature or (), dtype=np.int64)
+
+        tmp_path = f"{path[: -len('.npz')]}.{uuid.uuid4().hex[:12]}.tmp.npz"
+        np.savez(tmp_path, **state)
+        os.replace(tmp_path, path)
+
+    def _prepare(self, embeddings: Union[List, np.ndarray]) -> np.ndarray:
+        """
+        Convert embeddings into a contiguous float32 matrix in the space index works on
+        Args:
+            embeddings (list or np.ndarray): (N, D) or (D,) embeddings
+        Returns:
+            vectors (np.ndarray): (N, D) float32 matrix. Rows are l2 normalized
+                for cosine and euclidean_l2 metrics.
+        """
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2)
+        if vectors.ndim != 2:
+            raise ValueError(f"Embeddings must be 2 dimensional but it was {vectors.ndim}")
+
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+        elif vectors.shape[1] != self.dimensions:
+            raise ValueError(
+                "Source and target embeddings must have same dimensions but "
+                f"{vectors.shape[1]}:{self.dimensions}"
+            )
+
+        if self.distance_metric in ("cosine", "euclidean_l2"):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            vectors /= norms
+        return vectors
+
+    def _find_distances(
+        self, vectors: np.ndarray, norms: np.ndarray, target: np.ndarray
+    ) -> np.ndarray:
+        """
+        Find distances between stored vectors and a prepared target
+        Args:
+            vectors (np.ndarray): (N, D) stored vectors
+            norms (np.ndarray): (N,) l2 norms of stored vectors
+            target (np.ndarray): prepared target vector
+        Returns:
+            distances (np.ndarray): distances as float64
+        """
+        distances = verification.find_distances(
+            target, vectors, distance_metric=self.distance_metric, beta_norms=norms
+        )[0]
+        return distances.astype(np.float64)
+
+
+class FlatIndex(Index):
+    """
+    Exact index comparing the target with every stored embedding
+    """
+
+    kind = "flat"
+
+    def __init__(self, distance_metric: str = "cosine"):
+        super().__init__(distance_metric=distance_metric)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+    def ids(self) -> np.ndarray:
+        return np.sort(self._ids)
+
+    def add(self, ids: Union[List[int], np.ndarray], embeddings: Union[List, np.ndarray]) -> None:
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        vectors = self._prepare(embeddings)
+        if ids.shape[0] != vectors.shape[0]:
+            raise ValueError(f"Expected {vectors.shape[0]} ids but {ids.shape[0]} passed")
+
+        self.remove(ids)
+        if len(self) == 0:
+            self._vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        self._ids = np.concatenate([self._ids, ids])
+        self._vectors = np.concatenate([self._vectors, vectors])
+        self._norms = np.concatenate([self._norms, np.linalg.norm(vectors, axis=1)])
+
+    def remove(self, ids: Union[List[int], np.ndarray]) -> int:
+        keep = ~np.isin(self._ids, np.asarray(ids, dtype=np.int64))
+        removed = int(len(self) - keep.sum())
+        if removed > 0:
+            self._ids = self._ids[keep]
+            self._vectors = self._vectors[keep]
+            self._norms = self._norms[keep]
+        return removed
+
+    def search(
+        self,
+        target: Union[List[float], np.ndarray],
+        k: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        target = self._prepare(target)[0]
+        distances = self._find_distances(self._vectors, self._norms, target)
+        return _select(self._ids, distances, k=k, threshold=threshold)
+
+    def _save_state(self) -> Dict[str, np.ndarray]:
+        return {"ids": self._ids, "vectors": self._vectors}
+
+    def _load_state(self, state: Dict[str, np.ndarray], path: str) -> None:
+        self._ids = state["ids"].astype(np.int64)
+        self._vectors = state["vectors"].astype(np.float32)
+        self._norms = np.linalg.norm(self._vectors, axis=1)
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted file index. Embeddings are clustered with k-means and only
+        the clusters closest to the target are scanned.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        distance_metric: str = "cosine",
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        min_train_size: int = 1000,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            distance_metric (str): cosine, euclidean or euclidean_l2 (default is cosine)
+            n_lists (int): number of clusters. 4 * sqrt(N) is used
+                if left unset (default is None).
+            n_probe (int): number of closest clusters scanned per search (default is 8)
+            min_train_size (int): index behaves as a flat index until it has this many
+                embeddings (default is 1000)
+            seed (int): seed of k-means initialization (default is 0)
+        """
+        super().__init__(distance_metric=distance_metric)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        # row positions of each cluster, built lazily after add and remove
+        self._lists: Optional[List[np.ndarray]] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, ids: Union[List[int], np.ndarray], embeddings: Union[List, np.ndarray]) -> None:
+        super().add(ids=ids, embeddings=embeddings)
+        if not self.is_trained:
+            if len(self) >= self.min_train_size:
+                self.train()
+            return
+        # assign appended rows only, add keeps existing rows in front
+        self._assignments = np.concatenate(
+            [self._assignments, self._assign(self._vectors[self._assignments.shape[0] :])]
+        )
+        self._lists = None
+
+    def remove(self, ids: Union[List[int], np.ndarray]) -> int:
+        keep = ~np.isin(self._ids, np.asarray(ids, dtype=np.int64))
+        removed = super().remove(ids)
+        if removed > 0 and self.is_trained:
+            self._assignments = self._assignments[keep]
+            self._lists = None
+        return removed
+
+    def train(self, n_iter: int = 10, max_samples: int = 256) -> None:
+        """
+        Cluster stored embeddings with k-means and assign each of them to a cluster
+        Args:
+            n_iter (int): number of k-means iterations (default is 10)
+            max_samples (int): at most this many embeddings per cluster are used
+                for training (default is 256)
+        """
+        if len(self) == 0:
+            raise ValueError("Index must have embeddings to be trained")
+
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(len(self))))
+        n_lists = min(n_lists, len(self))
+        rng = np.random.default_rng(self.seed)
+
+        samples = self._vectors
+        if samples.shape[0] > n_lists * max_samples:
+            samples = samples[rng.choice(samples.shape[0], n_lists * max_samples, replace=False)]
+
+        self._centroids = samples[rng.choice(samples.shape[0], n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = self._assign(samples)
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(self._centroids)
+            order = np.argsort(labels, kind="stable")
+            non_empty = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts[non_empty])[:-1]])
+            sums[non_empty] = np.add.reduceat(samples[order], starts, axis=0)
+            empty = counts == 0
+            sums[~empty] /= counts[~empty, None]
+            # re-seed empty clusters with random samples
+            sums[empty] = samples[rng.choice(samples.shape[0], int(empty.sum()))]
+            self._centroids = self._normalize_centroids(sums)
+
+        self.n_lists = n_lists
+        self._assignments = self._assign(self._vectors)
+        self._lists = None
+        logger.debug(f"IVF index trained with {n_lists} lists on {samples.shape[0]} samples")
+
+    def search(
+        self,
+        target: Union[List[float], np.ndarray],
+        k: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.is_trained or len(self) == 0:
+            return super().search(target=target, k=k, threshold=threshold)
+
+        target = self._prepare(target)[0]
+        n_probe = min(self.n_probe, self._centroids.shape[0])
+        probe = np.argpartition(self._centroid_distances(target[None, :])[0], n_probe - 1)
+        rows = np.concatenate([self._inverted_lists()[i] for i in probe[:n_probe]])
+
+        distances = self._find_distances(self._vectors[rows], self._norms[rows], target)
+        return _select(self._ids[rows], distances, k=k, threshold=threshold)
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.cumsum(np.bincount(self._assignments, minlength=self.n_lists))
+            self._lists = np.split(order, bounds[:-1])
+        return self._lists
+
+    def _normalize_centroids(self, centroids: np.ndarray) -> np.ndarray:
+        if self.distance_metric in ("cosine", "euclidean_l2"):
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            centroids = centroids / norms
+        return centroids.astype(np.float32)
+
+    def _centroid_distances(self, vectors: np.ndarray) -> np.ndarray:
+        # rank-preserving distance to centroids, |x|^2 is same for each centroid
+        products = vectors @ self._centroids.T
+        if self.distance_metric in ("cosine", "euclidean_l2"):
+            return -products
+        return np.einsum("ij,ij->i", self._centroids, self._centroids)[None, :] - 2 * products
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+        labels = np.zeros(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], batch_size):
+            batch = vectors[start : start + batch_size]
+            labels[start : start + batch_size] = np.argmin(
+                self._centroid_distances(batch), axis=1
+            )
+        return labels
+
+    def _save_state(self) -> Dict[str, np.ndarray]:
+        state = super()._save_state()
+        state["n_probe"] = np.array(self.n_probe)
+        state["min_train_size"] = np.array(self.min_train_size)
+        state["seed"] = np.array(self.seed)
+        if self.is_trained:
+            state["centroids"] = self._centroids
+            state["assignments"] = self._assignments
+        return state
+
+    def _load_state(self, state: Dict[str, np.ndarray], path: str) -> None:
+        super()._load_state(state, path)
+        self.n_probe = int(state["n_probe"])
+        self.min_train_size = int(state["min_train_size"])
+        self.seed = int(state["seed"])
+        if "centroids" in state:
+            self._centroids = state["centroids"].astype(np.float32)
+            self._assignments = state["assignments"].astype(np.int32)
+            self.n_lists = self._centroids.shape[0]
+
+
+class HNSWIndex(Index):
+    """
+    Hierarchical navigable small world graph index backed by hnswlib
+    """
+
+    kind = "hnsw"
+
+    def __init__(
+        self,
+        distance_metric: str = "cosine",
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        default_k: int = 100,
+    ):
+        """
+        Args:
+            distance_metric (str): cosine, euclidean or euclidean_l2 (default is cosine)
+            m (int): number of graph neighbours per embedding (default is 16)
+            ef_construction (int): candidate list size while building (default is 200)
+            ef_search (int): candidate list size while searching (default is 64)
+            default_k (int): number of neighbours retrieved first if k is not passed to
+                search. It is doubled until all neighbours within threshold are found
+                (default is 100)
+        """
+        # This is not a must dependency. Don't import it in the global level.
+        try:
+            import hnswlib
+        except ModuleNotFoundError as e:
+            raise ImportError(
+                "hnswlib is an optional dependency, ensure the library is installed. "
+                "Please install using 'pip install hnswlib'"
+            ) from e
+
+        super().__init__(distance_metric=distance_metric)
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.default_k = default_k
+        self._index: Any = None
+        self._ids: set = set()
+        self._deleted: set = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> np.ndarray:
+        return np.array(sorted(self._ids), dtype=np.int64)
+
+    def _build(self, capacity: int) -> None:
+        # inner product on unit vectors is 1 - cosine similarity
+        space = "ip" if self.distance_metric in ("cosine", "euclidean_l2") else "l2"
+        self._index = self._hnswlib.Index(space=space, dim=self.dimensions)
+        self._index.init_index(
+            max_elements=capacity, ef_construction=self.ef_construction, M=self.m
+        )
+        self._index.set_ef(self.ef_search)
+
+    def add(self, ids: Union[List[int], np.ndarray], embeddings: Union[List, np.ndarray]) -> None:
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        vectors = self._prepare(embeddings)
+        if ids.shape[0] != vectors.shape[0]:
+            raise ValueError(f"Expected {vectors.shape[0]} ids but {ids.shape[0]} passed")
+
+        if self._index is None:
+            self._build(capacity=max(1024, 2 * ids.shape[0]))
+
+        required = len(self._ids) + len(self._deleted) + ids.shape[0]
+        if required > self._index.get_max_elements():
+            self._index.resize_index(max(required, 2 * self._index.get_max_elements()))
+
+        for restored in self._deleted.intersection(ids.tolist()):
+            self._index.unmark_deleted(restored)
+            self._deleted.discard(restored)
+
+        self._index.add_items(vectors, ids)
+        self._ids.update(ids.tolist())
+
+    def remove(self, ids: Union[List[int], np.ndarray]) -> int:
+        removed = 0
+        for current_id in np.asarray(ids, dtype=np.int64).reshape(-1).tolist():
+            if current_id in self._ids:
+                self._index.mark_deleted(current_id)
+                self._ids.discard(current_id)
+                self._deleted.add(current_id)
+                removed += 1
+        return removed
+
+    def search(
+        self,
+        target: Union[List[float], np.ndarray],
+        k: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        target = self._prepare(target)
+        if k is not None:
+            labels, distances = self._query(target, k=min(k, len(self)))
+            return _select(labels, distances, k=k, threshold=threshold)
+
+        if threshold is None:
+            labels, distances = self._query(target, k=len(self))
+            return _select(labels, distances, k=None, threshold=None)
+
+        # all neighbours within threshold are requested, widen the query
+        # until the farthest retrieved neighbour is out of threshold
+        current_k = min(self.default_k, len(self))
+        while True:
+            labels, distances = self._query(target, k=current_k)
+            if current_k == len(self) or distances.max() > threshold:
+                return _select(labels, distances, k=None, threshold=threshold)
+            current_k = min(2 * current_k, len(self))
+
+    def _query(self, target: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        self._index.set_ef(max(self.ef_search, k))
+        labels, raw_distances = self._index.knn_query(target, k=k)
+
+        raw_distances = raw_distances[0].astype(np.float64)
+        if self.distance_metric == "cosine":
+            distances = raw_distances
+        elif self.distance_metric == "euclidean_l2":
+            distances = np.sqrt(np.maximum(2 * raw_distances, 0))
+        else:
+            # hnswlib returns squared euclidean distances
+            distances = np.sqrt(np.maximum(raw_distances, 0))
+        return labels[0].astype(np.int64), distances
+
+    def _save_state(self) -> Dict[str, np.ndarray]:
+        return {
+            "ids": np.array(sorted(self._ids), dtype=np.int64),
+            "deleted": np.array(sorted(self._deleted), dtype=np.int64),
+            "params": np.array([self.m, self.ef_construction, self.ef_search, self.default_k]),
+        }
+
+    def save(self, path: str) -> None:
+        super().save(path)
+        if self._index is not None:
+            graph_path = _graph_path(path)
+            tmp_path = f"{graph_path}.{uuid.uuid4().hex[:12]}.tmp"
+            self._index.save_index(tmp_path)
+            os.replace(tmp_path, graph_path)
+
+    def _load_state(self, state: Dict[str, np.ndarray], path: str) -> None:
+        self.m, self.ef_construction, self.ef_search, self.default_k = [
+            int(param) for param in state["params"]
+        ]
+        self._ids = set(state["ids"].tolist())
+        self._deleted = set(state["deleted"].tolist())
+        if self.dimensions is not None:
+            space = "ip" if self.distance_metric in ("cosine", "euclidean_l2") else "l2"
+            self._index = self._hnswlib.Index(space=space, dim=self.dimensions)
+            self._index.load_index(_graph_path(path), allow_replace_deleted=False)
+            self._index.set_ef(self.ef_search)
+
+
+def build_index(index_type: str = "flat", distance_metric: str = "cosine", **kwargs) -> Index:
+    """
+    Create an empty index
+    Args:
+        index_type (str): flat, ivf or hnsw (default is flat)
+        distance_metric (str): cosine, euclidean or euclidean_l2 (default is cosine)
+        kwargs: index specific arguments, e.g. n_lists and n_probe for ivf
+    Returns:
+        index (Index): empty index
+    """
+    indexes = {
+        "flat": FlatIndex,
+        "ivf": IVFIndex,
+        "hnsw": HNSWIndex,
+    }
+    index_class = indexes.get(index_type)
+    if index_class is None:
+        raise ValueError(f"Invalid index_type passed - {index_type}. Options: {AVAILABLE_INDEXES}")
+    return index_class(distance_metric=distance_metric, **kwargs)
+
+
+def load_index(path: str) -> Index:
+    """
+    Load an index stored with Index.save
+    Args:
+        path (str): exact path of the index file
+    Returns:
+        index (Index): loaded index
+    """
+    with np.load(path, allow_pickle=False) as data:
+        state = {key: data[key] for key in data.files}
+
+    index = build_index(index_type=str(state["kind"]), distance_metric=str(state["distance_metric"]))
+    dimensions = int(state["dimensions"])
+    index.dimensions = None if dimensions == -1 else dimensions
+    signature = tuple(int(item) for item in state["source_signature"])
+    index.source_signature = None if len(signature) == 0 or signature == (-1, -1) else signature
+    index._load_state(state, path)  # pylint: disable=protected-access
+    return index
+
+
+def find_index_path(datastore_path: str, index_type: str, distance_metric: str) -> str:
+    """
+    Find the path of an index stored next to a datastore
+    Args:
+        datastore_path (str): exact path of the datastore, e.g. ds_model_vggface_....pkl
+        index_type (str): flat, ivf or hnsw
+        distance_metric (str): cosine, euclidean or euclidean_l2
+    Returns:
+        index_path (str): path of the index file
+    """
+    root, _ = os.path.splitext(datastore_path)
+    return f"{root}_index_{index_type}_{distance_metric}.npz"
+
+
+def _graph_path(path: str) -> str:
+    return path[: -len(".npz")] + ".hnsw"
+
+
+def _select(
+    ids: np.ndarray, distances: np.ndarray, k: Optional[int], threshold: Optional[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the closest k candidates within threshold, sorted by distance
+    Args:
+        ids (np.ndarray): ids of candidates
+        distances (np.ndarray): distances of candidates
+        k (int): maximum number of candidates to keep
+        threshold (float): drop candidates farther than threshold
+    Returns:
+        ids (np.ndarray): ids of kept candidates, closest first
+        distances (np.ndarray): distances of kept candidates
+    """
+    if threshold is not None:
+        within = distances <= threshold
+        ids, distances = ids[within], distances[within]
+    if k is not None and k < distances.shape[0]:
+        closest = np.argpartition(distances, k - 1)[:k]
+        ids, distances = ids[closest], distances[closest]
+    order = np.argsort(distances, kind="stable")
+    return ids[order], distances[order]
@@ -0,0 +1,304 @@
+# built-in dependencies
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# 3rd party dependencies
+import numpy as np
+
+# project dependencies
+from deepface.commons import image_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# size, modification time in nanoseconds, inode and whether the file is a jpg or png image
+Entry = Tuple[int, int, int, bool]
+
+# directories watched for changes, keyed by their real path
+_watchers: Dict[str, "Watcher"] = {}
+_watchers_lock = threading.Lock()
+
+# last committed listing of each manifest, reused while its watcher reports no change
+_listings: Dict[str, "Listing"] = {}
+
+
+@dataclass
+class Listing:
+    """
+    Images of a database directory and what changed since its manifest was committed
+    Attributes:
+        images (list): exact paths of jpg and png images
+        changed (set): image paths that are new or whose size, modification time
+            or inode differ from the manifest
+        entries (dict): manifest entries of candidate files keyed by exact path
+        removed (bool): some files of the manifest do not exist anymore
+        generation (int or None): generation of the directory's watcher when it was scanned
+    """
+
+    images: List[str]
+    changed: Set[str] = field(default_factory=set)
+    entries: Dict[str, Entry] = field(default_factory=dict)
+    removed: bool = False
+    generation: Optional[int] = None
+
+
+def find_manifest_path(datastore_path: str) -> str:
+    """
+    Find path of the manifest of the directory a datastore was synchronized with
+    Args:
+        datastore_path (str): path of the datastore's metadata file
+    Returns:
+        manifest_path (str): path ending with _manifest.npz
+    """
+    root, _ = os.path.splitext(datastore_path)
+    return f"{root}_manifest.npz"
+
+
+def scan(path: str) -> Dict[str, Tuple[int, int, int]]:
+    """
+    Find files having image extensions in a directory tree without opening them
+    Args:
+        path (str): directory's location
+    Returns:
+        stats (dict): size, modification time in nanoseconds and inode of each
+            file keyed by its exact path, the same paths image_utils.list_images returns
+    """
+    stats = {}
+    directories = [path]
+    while len(directories) > 0:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    # like os.walk, symbolic links to directories are not followed
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            directories.append(entry.path)
+                        continue
+                    extension = os.path.splitext(entry.name)[-1].lower()
+                    if extension not in image_utils.IMAGE_EXTENSIONS:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    stats[entry.path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return stats
+
+
+def list_images(db_path: str, manifest_path: str) -> Listing:
+    """
+    List images of a database directory. Only files which are new or changed since the
+        manifest was committed are opened to check their format. If the directory is
+        watched and nothing changed since the last commit, it is not even scanned.
+    Args:
+        db_path (str): database directory's location
+        manifest_path (str): path of the manifest stored with the datastore
+    Returns:
+        listing (Listing): images and changes since the manifest was committed
+    """
+    watcher = _watchers.get(os.path.realpath(db_path))
+    generation = None
+    if watcher is not None and watcher.is_alive():
+        generation = watcher.generation
+        committed = _listings.get(manifest_path)
+        if committed is not None and committed.generation == generation:
+            return committed
+
+    previous = load(manifest_path)
+    entries: Dict[str, Entry] = {}
+    changed = set()
+    for path, stat in sorted(scan(db_path).items()):
+        entry = previous.get(path)
+        if entry is None or entry[:3] != stat:
+            entry = (*stat, image_utils.is_image(path))
+            if entry[3]:
+                changed.add(path)
+        entries[path] = entry
+
+    return Listing(
+        images=[path for path, entry in entries.items() if entry[3]],
+        changed=changed,
+        entries=entries,
+        removed=any(path not in entries for path in previous),
+        generation=generation,
+    )
+
+
+def commit(manifest_path: str, listing: Listing) -> None:
+    """
+    Store the manifest of a listing once the datastore is synchronized with it
+    Args:
+        manifest_path (str): path of the manifest stored with the datastore
+        listing (Listing): listing returned by list_images
+    """
+    if len(listing.changed) > 0 or listing.removed or not os.path.exists(manifest_path):
+        save(manifest_path, listing.entries)
+    if listing.generation is not None:
+        _listings[manifest_path] = Listing(
+            images=listing.images, entries=listing.entries, generation=listing.generation
+        )
+
+
+def load(path: str) -> Dict[str, Entry]:
+    """
+    Load a manifest saved with save
+    Args:
+        path (str): path of the manifest
+    Returns:
+        entries (dict): size, modification time, inode and image flag keyed by exact path.
+            Empty if the manifest does not exist.
+    """
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as data:
+        return {
+            str(file_path): (int(size), int(mtime), int(inode), bool(image))
+            for file_path, size, mtime, inode, image in zip(
+                data["paths"], data["sizes"], data["mtimes"], data["inodes"], data["images"]
+            )
+        }
+
+
+def save(path: str, entries: Dict[str, Entry]) -> None:
+    """
+    Store a manifest on disk atomically
+    Args:
+        path (str): path of the manifest, must end with .npz
+        entries (dict): size, modification time, inode and image flag keyed by exact path
+    """
+    if not path.endswith(".npz"):
+        raise ValueError(f"Manifest path must end with .npz but it was {path}")
+    columns = np.array(list(entries.values()), dtype=np.int64).reshape(-1, 4)
+    tmp_path = f"{path[: -len('.npz')]}.{uuid.uuid4().hex[:12]}.tmp.npz"
+    np.savez(
+        tmp_path,
+        paths=np.array(list(entries.keys()), dtype=str),
+        sizes=columns[:, 0],
+        mtimes=columns[:, 1],
+        inodes=columns[:, 2],
+        images=columns[:, 3].astype(bool),
+    )
+    os.replace(tmp_path, path)
+
+
+class Watcher:
+    """
+    Background thread watching a directory tree with inotify. Its generation is increased
+        whenever an image or a directory is created, modified, moved or deleted, so listings
+        of unchanged directories are reused without scanning them.
+    Attributes:
+        path (str): real path of the watched directory
+        generation (int): number of changes seen so far
+    """
+
+    def __init__(self, path: str):
+        # This is not a must dependency. Don't import it in the global level.
+        try:
+            import inotify_simple
+        except ModuleNotFoundError as e:
+            raise ImportError(
+                "inotify_simple is an optional dependency, ensure the library is installed. "
+                "Please install using 'pip install inotify_simple'"
+            ) from e
+
+        self.path = os.path.realpath(path)
+        self.generation = 0
+        self._flags = inotify_simple.flags
+        self._mask = (
+            self._flags.CREATE
+            | self._flags.DELETE
+            | self._flags.CLOSE_WRITE
+            | self._flags.MOVED_FROM
+            | self._flags.MOVED_TO
+            | self._flags.ATTRIB
+            | self._flags.DELETE_SELF
+            | self._flags.MOVE_SELF
+        )
+        self._inotify = inotify_simple.INotify()
+        self._directories: Dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._watch_tree(self.path)
+        self._thread = threading.Thread(target=self._run, name="deepface-watcher", daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self._inotify.close()
+
+    def _watch_tree(self, path: str) -> None:
+        for directory, _, _ in os.walk(path):
+            try:
+                descriptor = self._inotify.add_watch(directory, self._mask)
+            except OSError as err:
+                logger.warn(f"Changes of {directory} cannot be watched: {err}")
+                continue
+            self._directories[descriptor] = directory
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            events = self._inotify.read(timeout=500)
+            changed = False
+            for event in events:
+                event_flags = self._flags.from_mask(event.mask)
+                if self._flags.Q_OVERFLOW in event_flags:
+                    changed = True
+                elif self._flags.ISDIR in event_flags:
+                    changed = True
+                    directory = self._directories.get(event.wd)
+                    if directory is not None and (
+                        self._flags.CREATE in event_flags or self._flags.MOVED_TO in event_flags
+                    ):
+                        self._watch_tree(os.path.join(directory, event.name))
+                elif self._flags.IGNORED in event_flags:
+                    self._directories.pop(event.wd, None)
+                elif (
+                    self._flags.DELETE_SELF in event_flags
+                    or self._flags.MOVE_SELF in event_flags
+                    or os.path.splitext(event.name)[-1].lower() in image_utils.IMAGE_EXTENSIONS
+                ):
+                    changed = True
+            if changed:
+                self.generation += 1
+
+
+def watch(db_path: str) -> Watcher:
+    """
+    Start watching a database directory in the background, once per process
+    Args:
+        db_path (str): database directory's location
+    Returns:
+        watcher (Watcher): watcher of the directory
+    """
+    with _watchers_lock:
+        key = os.path.realpath(db_path)
+        watcher = _watchers.get(key)
+        if watcher is None or not watcher.is_alive():
+            watcher = Watcher(key)
+            _watchers[key] = watcher
+            logger.info(f"Watching {db_path} for changes")
+        return watcher
+
+
+def unwatch(db_path: Optional[str] = None) -> None:
+    """
+    Stop watching a database directory
+    Args:
+        db_path (str): database directory's location. All watchers are stopped if it is
+            left unset (default is None).
+    """
+    with _watchers_lock:
+        keys = list(_watchers.keys()) if db_path is None else [os.path.realpath(db_path)]
+        for key in keys:
+            watcher = _watchers.pop(key, None)
+            if watcher is not None:
+                watcher.stop()
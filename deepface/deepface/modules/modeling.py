@@ -1,32 +1,255 @@
 # built-in dependencies
-from typing import Any
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# 3rd party dependencies
+import numpy as np
 
 # project dependencies
-from deepface.models.facial_recognition import (
-    VGGFace,
-    OpenFace,
-    FbDeepFace,
-    DeepID,
-    ArcFace,
-    SFace,
-    Dlib,
-    Facenet,
-    GhostFaceNet,
-)
-from deepface.models.face_detection import (
-    FastMtCnn,
-    MediaPipe,
-    MtCnn,
-    OpenCv,
-    Dlib as DlibDetector,
-    RetinaFace,
-    Ssd,
-    Yolo,
-    YuNet,
-    CenterFace,
-)
-from deepface.models.demography import Age, Gender, Race, Emotion
-from deepface.models.spoofing import FasNet
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+# import paths of model classes of each task, client modules are imported and built on first use
+available_models = {
+    "facial_recognition": {
+        "VGG-Face": "deepface.models.facial_recognition.VGGFace:VggFaceClient",
+        "OpenFace": "deepface.models.facial_recognition.OpenFace:OpenFaceClient",
+        "Facenet": "deepface.models.facial_recognition.Facenet:FaceNet128dClient",
+        "Facenet512": "deepface.models.facial_recognition.Facenet:FaceNet512dClient",
+        "DeepFace": "deepface.models.facial_recognition.FbDeepFace:DeepFaceClient",
+        "DeepID": "deepface.models.facial_recognition.DeepID:DeepIdClient",
+        "Dlib": "deepface.models.facial_recognition.Dlib:DlibClient",
+        "ArcFace": "deepface.models.facial_recognition.ArcFace:ArcFaceClient",
+        "SFace": "deepface.models.facial_recognition.SFace:SFaceClient",
+        "GhostFaceNet": "deepface.models.facial_recognition.GhostFaceNet:GhostFaceNetClient",
+    },
+    "spoofing": {
+        "Fasnet": "deepface.models.spoofing.FasNet:Fasnet",
+    },
+    "facial_attribute": {
+        "Emotion": "deepface.models.demography.Emotion:EmotionClient",
+        "Age": "deepface.models.demography.Age:ApparentAgeClient",
+        "Gender": "deepface.models.demography.Gender:GenderClient",
+        "Race": "deepface.models.demography.Race:RaceClient",
+    },
+    "face_detector": {
+        "opencv": "deepface.models.face_detection.OpenCv:OpenCvClient",
+        "mtcnn": "deepface.models.face_detection.MtCnn:MtCnnClient",
+        "ssd": "deepface.models.face_detection.Ssd:SsdClient",
+        "dlib": "deepface.models.face_detection.Dlib:DlibClient",
+        "retinaface": "deepface.models.face_detection.RetinaFace:RetinaFaceClient",
+        "mediapipe": "deepface.models.face_detection.MediaPipe:MediaPipeClient",
+        "yolov8": "deepface.models.face_detection.Yolo:YoloClient",
+        "yunet": "deepface.models.face_detection.YuNet:YuNetClient",
+        "fastmtcnn": "deepface.models.face_detection.FastMtCnn:FastMtCnnClient",
+        "centerface": "deepface.models.face_detection.CenterFace:CenterFaceClient",
+    },
+}
+
+
+class ModelRegistry:
+    """
+    Thread-safe registry of built models.
+        A model is built once even if many threads ask for it at the same time, each model
+        has its own build lock so building one model does not block using the others.
+        If a memory budget is set, least recently used models are dropped from the registry
+        once their weights exceed it. Models used within min_idle_seconds are kept even over
+        the budget, as a thread may still be running them and dropping them would only make
+        the next call build a second copy. A dropped model is built again when it is asked
+        for, callers still holding it can keep using it.
+    Attributes:
+        max_bytes (int or None): memory budget of model weights, unbounded if None
+        min_idle_seconds (float): time since last use before a model can be evicted
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, min_idle_seconds: float = 60.0):
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError(f"max_bytes must be a non-negative integer but it is {max_bytes}")
+        if min_idle_seconds < 0:
+            raise ValueError(
+                f"min_idle_seconds must be a non-negative number but it is {min_idle_seconds}"
+            )
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, task: str, model_name: str) -> Any:
+        """
+        Get a built model, build it if it is not in the registry
+        Args:
+            task (str): facial_recognition, facial_attribute, face_detector, spoofing
+            model_name (str): model identifier
+        Returns:
+            built model class
+        """
+        model_class = _find_model_class(task, model_name)
+        key = (task, model_name)
+
+        model = self._touch(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # another thread may have built it while this one was waiting
+            model = self._touch(key)
+            if model is not None:
+                return model
+
+            tic = time.time()
+            model = model_class()
+            load_time = time.time() - tic
+            size = _find_model_size(model)
+
+            with self._lock:
+                self._entries[key] = {
+                    "model": model,
+                    "load_time": load_time,
+                    "warmup_time": None,
+                    "bytes": size,
+                    "last_used": time.time(),
+                }
+                self._evict(keep=key)
+
+        logger.debug(
+            f"{task}/{model_name} built in {load_time:.2f} seconds"
+            f" and holds {size / (1024 * 1024):.1f} MB of weights"
+        )
+        return model
+
+    def warmup(self, task: str, model_name: str) -> Any:
+        """
+        Build a model and feed it a dummy input, so graph tracing and lazy initialization
+            of the first forward pass do not slow down the first real request
+        Args:
+            task (str): facial_recognition, facial_attribute, face_detector, spoofing
+            model_name (str): model identifier
+        Returns:
+            built model class
+        """
+        model = self.get(task, model_name)
+        tic = time.time()
+        _run_dummy_forward(task, model)
+        warmup_time = time.time() - tic
+
+        with self._lock:
+            entry = self._entries.get((task, model_name))
+            if entry is not None and entry["model"] is model:
+                entry["warmup_time"] = warmup_time
+
+        logger.debug(f"{task}/{model_name} warmed up in {warmup_time:.2f} seconds")
+        return model
+
+    def release(self, task: Optional[str] = None, model_name: Optional[str] = None) -> None:
+        """
+        Drop models from the registry
+        Args:
+            task (str): drop models of this task only. All models are dropped
+                if it is left unset (default is None).
+            model_name (str): drop this model of the task only (default is None).
+        """
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if task is not None and key[0] != task:
+                    continue
+                if model_name is not None and key[1] != model_name:
+                    continue
+                del self._entries[key]
+
+    def set_memory_budget(
+        self, max_bytes: Optional[int], min_idle_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Change the memory budget and evict idle models exceeding it
+        Args:
+            max_bytes (int or None): memory budget of model weights, unbounded if None
+            min_idle_seconds (float): time since last use before a model can be evicted,
+                left as it is if None (default is None)
+        """
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError(f"max_bytes must be a non-negative integer but it is {max_bytes}")
+        if min_idle_seconds is not None and min_idle_seconds < 0:
+            raise ValueError(
+                f"min_idle_seconds must be a non-negative number but it is {min_idle_seconds}"
+            )
+        with self._lock:
+            self.max_bytes = max_bytes
+            if min_idle_seconds is not None:
+                self.min_idle_seconds = min_idle_seconds
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report models in the registry
+        Returns:
+            stats (dict): total weight_bytes, memory budget, number of evictions and models
+                keyed by task/model_name, least recently used first. Each model has its
+                load_time and warmup_time in seconds, weight_bytes of its parameters and
+                buffers and idle_time in seconds since it was last used. Weights are counted
+                instead of resident memory, which other threads allocate in at the same time.
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                "weight_bytes": sum(entry["bytes"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "models": {
+                    f"{task}/{model_name}": {
+                        "load_time": entry["load_time"],
+                        "warmup_time": entry["warmup_time"],
+                        "weight_bytes": entry["bytes"],
+                        "idle_time": now - entry["last_used"],
+                    }
+                    for (task, model_name), entry in self._entries.items()
+                },
+            }
+
+    def _touch(self, key: Tuple[str, str]) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry["last_used"] = time.time()
+            return entry["model"]
+
+    def _evict(self, keep: Optional[Tuple[str, str]] = None) -> None:
+        # caller must hold the lock
+        if self.max_bytes is None:
+            return
+        total = sum(entry["bytes"] for entry in self._entries.values())
+        now = time.time()
+        for key in list(self._entries.keys()):
+            if total <= self.max_bytes:
+                break
+            if key == keep or now - self._entries[key]["last_used"] < self.min_idle_seconds:
+                continue
+            total -= self._entries.pop(key)["bytes"]
+            self._evictions += 1
+            logger.debug(f"{key[0]}/{key[1]} is evicted to fit into model memory budget")
+
+        if total > self.max_bytes:
+            logger.warn(
+                f"Models hold {total} bytes exceeding the memory budget of {self.max_bytes} bytes,"
+                f" models used in last {self.min_idle_seconds} seconds are not evicted"
+            )
+
+
+# models built in this process
+_registry = ModelRegistry()
 
 
 def build_model(task: str, model_name: str) -> Any:
@@ -44,57 +267,102 @@ def build_model(task: str, model_name: str) -> Any:
     Returns:
             built model class
     """
+    return _registry.get(task=task, model_name=model_name)
 
-    # singleton design pattern
-    global cached_models
-
-    models = {
-        "facial_recognition": {
-            "VGG-Face": VGGFace.VggFaceClient,
-            "OpenFace": OpenFace.OpenFaceClient,
-            "Facenet": Facenet.FaceNet128dClient,
-            "Facenet512": Facenet.FaceNet512dClient,
-            "DeepFace": FbDeepFace.DeepFaceClient,
-            "DeepID": DeepID.DeepIdClient,
-            "Dlib": Dlib.DlibClient,
-            "ArcFace": ArcFace.ArcFaceClient,
-            "SFace": SFace.SFaceClient,
-            "GhostFaceNet": GhostFaceNet.GhostFaceNetClient,
-        },
-        "spoofing": {
-            "Fasnet": FasNet.Fasnet,
-        },
-        "facial_attribute": {
-            "Emotion": Emotion.EmotionClient,
-            "Age": Age.ApparentAgeClient,
-            "Gender": Gender.GenderClient,
-            "Race": Race.RaceClient,
-        },
-        "face_detector": {
-            "opencv": OpenCv.OpenCvClient,
-            "mtcnn": MtCnn.MtCnnClient,
-            "ssd": Ssd.SsdClient,
-            "dlib": DlibDetector.DlibClient,
-            "retinaface": RetinaFace.RetinaFaceClient,
-            "mediapipe": MediaPipe.MediaPipeClient,
-            "yolov8": Yolo.YoloClient,
-            "yunet": YuNet.YuNetClient,
-            "fastmtcnn": FastMtCnn.FastMtCnnClient,
-            "centerface": CenterFace.CenterFaceClient,
-        },
-    }
-
-    if models.get(task) is None:
+
+def warmup(task: str, model_name: str) -> Any:
+    """
+    Build a model and run a dummy forward pass to trigger graph tracing
+    Parameters:
+        task (str): facial_recognition, facial_attribute, face_detector, spoofing
+        model_name (str): model identifier
+    Returns:
+            built model class
+    """
+    return _registry.warmup(task=task, model_name=model_name)
+
+
+def release(task: Optional[str] = None, model_name: Optional[str] = None) -> None:
+    """
+    Drop built models, they are built again on next use
+    Parameters:
+        task (str): drop models of this task only (default is None)
+        model_name (str): drop this model only (default is None)
+    """
+    _registry.release(task=task, model_name=model_name)
+
+
+def set_memory_budget(max_bytes: Optional[int], min_idle_seconds: Optional[float] = None) -> None:
+    """
+    Limit the memory held by built models, least recently used idle ones are evicted
+    Parameters:
+        max_bytes (int or None): memory budget of model weights, unbounded if None
+        min_idle_seconds (float): time since last use before a model can be evicted,
+            60 seconds unless it is set (default is None)
+    """
+    _registry.set_memory_budget(max_bytes, min_idle_seconds=min_idle_seconds)
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Report load time, warmup time and size of each built model
+    Returns:
+        stats (dict): see ModelRegistry.stats
+    """
+    return _registry.stats()
+
+
+def _find_model_class(task: str, model_name: str) -> Any:
+    if available_models.get(task) is None:
         raise ValueError(f"unimplemented task - {task}")
+    model_class = available_models[task].get(model_name)
+    if model_class is None:
+        raise ValueError(f"Invalid model_name passed - {task}/{model_name}")
+    if isinstance(model_class, str):
+        module_name, class_name = model_class.split(":")
+        model_class = getattr(importlib.import_module(module_name), class_name)
+    return model_class
 
-    if not "cached_models" in globals():
-        cached_models = {current_task: {} for current_task in models.keys()}
 
-    if cached_models[task].get(model_name) is None:
-        model = models[task].get(model_name)
-        if model:
-            cached_models[task][model_name] = model()
-        else:
-            raise ValueError(f"Invalid model_name passed - {task}/{model_name}")
+def _run_dummy_forward(task: str, model: Any) -> None:
+    if task == "facial_recognition":
+        width, height = model.input_shape
+        model.forward_batch(np.zeros((1, height, width, 3), dtype=np.float32))
+    elif task == "facial_attribute":
+        model.predict(np.zeros((1, 224, 224, 3), dtype=np.float32))
+    elif task == "face_detector":
+        model.detect_faces(np.zeros((224, 224, 3), dtype=np.uint8))
+    elif task == "spoofing":
+        model.analyze(np.zeros((224, 224, 3), dtype=np.uint8), facial_area=(0, 0, 224, 224))
 
-    return cached_models[task][model_name]
+
+def _find_model_size(model: Any) -> int:
+    """
+    Find bytes of weights a built model holds in keras models, torch modules and arrays
+    """
+    size = 0
+    seen = set()
+    values = list(vars(model).values()) if hasattr(model, "__dict__") else []
+    while len(values) > 0:
+        value = values.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, np.ndarray):
+            size += value.nbytes
+        elif isinstance(value, (list, tuple)):
+            values.extend(value)
+        elif isinstance(value, dict):
+            values.extend(value.values())
+        elif hasattr(value, "count_params") and hasattr(value, "weights"):
+            # keras model
+            for weight in value.weights:
+                itemsize = np.dtype(getattr(weight.dtype, "name", weight.dtype)).itemsize
+                size += int(np.prod(tuple(weight.shape))) * itemsize
+        elif callable(getattr(value, "parameters", None)) and callable(
+            getattr(value, "buffers", None)
+        ):
+            # torch module
+            for tensor in [*value.parameters(), *value.buffers()]:
+                size += tensor.numel() * tensor.element_size()
+    return size
@@ -1,20 +1,10 @@
 # built-in dependencies
-from typing import Tuple
+from typing import Optional, Tuple
 
 # 3rd party
 import numpy as np
 import cv2
 
-# project dependencies
-from deepface.commons import package_utils
-
-
-tf_major_version = package_utils.get_tf_major_version()
-if tf_major_version == 1:
-    from keras.preprocessing import image
-elif tf_major_version == 2:
-    from tensorflow.keras.preprocessing import image
-
 
 def normalize_input(img: np.ndarray, normalization: str = "base") -> np.ndarray:
     """Normalize input image.
@@ -112,10 +102,81 @@ def resize_image(img: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
         img = cv2.resize(img, target_size)
 
     # make it 4-dimensional how ML models expect
-    img = image.img_to_array(img)
+    img = np.asarray(img, dtype=np.float32)
     img = np.expand_dims(img, axis=0)
 
     if img.max() > 1:
         img = (img.astype(np.float32) / 255.0).astype(np.float32)
 
     return img
+
+
+# per channel means subtracted in scale of [0, 255] by mean subtraction normalizations
+CHANNEL_MEANS = {
+    "VGGFace": np.array([93.5940, 104.7624, 129.1863], dtype=np.float32),
+    "VGGFace2": np.array([91.4953, 103.8827, 131.0912], dtype=np.float32),
+}
+
+
+def prepare_face(
+    img: np.ndarray,
+    target_size: Tuple[int, int],
+    normalization: str = "base",
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Resize, pad and normalize a face in a single pass into a float32 model input. This is
+        the fused version of resize_image followed by normalize_input.
+    Args:
+        img (np.ndarray): face as a uint8 crop, or a float one in scale of [0, 1] as returned
+            by extract_faces
+        target_size (tuple): input shape of ml model as (rows, columns)
+        normalization (str): normalization technique, see normalize_input
+        out (np.ndarray): float32 buffer in shape (rows, columns, channels) to write into.
+            A new one is allocated if it is not given (default is None).
+    Returns:
+        img (np.ndarray): normalized input image in shape (rows, columns, channels)
+    """
+    if out is None:
+        out = np.empty((*target_size, img.shape[2]), dtype=np.float32)
+
+    factor = min(target_size[0] / img.shape[0], target_size[1] / img.shape[1])
+    dsize = (int(img.shape[1] * factor), int(img.shape[0] * factor))
+
+    # faces normalized in [0, 1] are brought back to [0, 255] like resize_image does
+    scale = 1.0 if img.dtype == np.uint8 or img.max() > 1 else 255.0
+
+    # resizing in float32 interpolates like the float faces resize_image gets
+    resized = cv2.resize(img.astype(np.float32, copy=False), dsize)
+    if resized.ndim == 2:
+        resized = resized[:, :, np.newaxis]
+
+    # put the base image in the middle of the black padded image
+    top = (target_size[0] - resized.shape[0]) // 2
+    left = (target_size[1] - resized.shape[1]) // 2
+    out.fill(0)
+    body = out[top : top + resized.shape[0], left : left + resized.shape[1]]
+
+    if normalization == "base":
+        np.multiply(resized, scale / 255, out=body)
+        return out
+
+    np.multiply(resized, scale, out=body)
+    if normalization == "raw":
+        pass
+    elif normalization == "Facenet":
+        mean, std = out.mean(), out.std()
+        out -= mean
+        out /= std
+    elif normalization == "Facenet2018":
+        out /= 127.5
+        out -= 1
+    elif normalization in CHANNEL_MEANS:
+        out -= CHANNEL_MEANS[normalization]
+    elif normalization == "ArcFace":
+        out -= 127.5
+        out /= 128
+    else:
+        raise ValueError(f"unimplemented normalization type - {normalization}")
+
+    return out
@@ -1,7 +1,11 @@
 # built-in dependencies
 import os
-import pickle
-from typing import List, Union, Optional, Dict, Any, Set
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Union, Optional, Dict, Any, Set, Tuple, Deque
 import time
 
 # 3rd party dependencies
@@ -11,11 +15,30 @@ from tqdm import tqdm
 
 # project dependencies
 from deepface.commons import image_utils
-from deepface.modules import representation, detection, verification
+from deepface.modules import (
+    representation,
+    detection,
+    verification,
+    indexing,
+    datastore,
+    caching,
+    manifest,
+)
 from deepface.commons.logger import Logger
 
 logger = Logger()
 
+# decoded datastores kept in memory, keyed by datastore path
+_gallery_cache: Dict[str, Dict[str, Any]] = {}
+_gallery_lock = threading.Lock()
+
+# process pools detecting faces of bulk embeddings, keyed by number of workers
+_detection_pools: Dict[int, ProcessPoolExecutor] = {}
+_detection_pools_lock = threading.Lock()
+
+# number of decoded images handed over to a detection worker at once
+DETECTION_BATCH_SIZE = 4
+
 
 def find(
     img_path: Union[str, np.ndarray],
@@ -31,6 +54,11 @@ def find(
     silent: bool = False,
     refresh_database: bool = True,
     anti_spoofing: bool = False,
+    top_k: Optional[int] = None,
+    index_type: str = "flat",
+    batch_size: int = 32,
+    workers: int = 1,
+    watch_database: bool = False,
 ) -> List[pd.DataFrame]:
     """
     Identify individuals in a database
@@ -75,6 +103,25 @@ def find(
 
         anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
 
+        top_k (int): Return at most this many closest identities for each detected face.
+            If left unset, all identities within the threshold are returned (default is None).
+
+        index_type (str): Nearest neighbour index used to search the datastore. Options: flat,
+            ivf or hnsw. flat is exact, ivf and hnsw are approximate and stored next to the
+            datastore. hnsw requires hnswlib (default is flat).
+
+        batch_size (int): Number of faces fed to the model at once while representing
+            new images of the database (default is 32).
+
+        workers (int): Number of threads decoding new images of the database and of workers
+            detecting their faces. More than 1 worker runs detection in a pool of spawned
+            processes which is kept alive for later calls. It is meant for bulk re-indexing of
+            large databases and the calling script must be guarded with
+            if __name__ == "__main__" (default is 1).
+
+        watch_database (bool): Watch db_path for changes with inotify in a background thread,
+            so later calls do not even scan the directory while nothing changes in it.
+            Requires inotify_simple (default is False).
 
     Returns:
         results (List[pd.DataFrame]): A list of pandas dataframes. Each dataframe corresponds
@@ -113,53 +160,40 @@ def find(
         str(expand_percentage),
     ]
 
-    file_name = "_".join(file_parts) + ".pkl"
+    file_name = "_".join(file_parts) + ".npz"
     file_name = file_name.replace("-", "").lower()
 
     datastore_path = os.path.join(db_path, file_name)
-    representations = []
 
-    # required columns for representations
-    df_cols = [
-        "identity",
-        "hash",
-        "embedding",
-        "target_x",
-        "target_y",
-        "target_w",
-        "target_h",
-    ]
+    # Ensure the proper datastore exists, migrate legacy pickle datastore once
+    if not datastore.exists(datastore_path):
+        pickle_path = datastore_path[: -len(".npz")] + ".pkl"
+        if os.path.exists(pickle_path):
+            datastore.migrate(pickle_path=pickle_path, path=datastore_path)
+        else:
+            datastore.save(datastore_path, datastore.from_representations([]))
 
-    # Ensure the proper pickle file exists
-    if not os.path.exists(datastore_path):
-        with open(datastore_path, "wb") as f:
-            pickle.dump([], f)
-
-    # Load the representations from the pickle file
-    with open(datastore_path, "rb") as f:
-        representations = pickle.load(f)
-
-    # check each item of representations list has required keys
-    for i, current_representation in enumerate(representations):
-        missing_keys = set(df_cols) - set(current_representation.keys())
-        if len(missing_keys) > 0:
-            raise ValueError(
-                f"{i}-th item does not have some required keys - {missing_keys}."
-                f"Consider to delete {datastore_path}"
-            )
+    # Load the representations from the gallery cache or the datastore
+    gallery = __load_gallery(datastore_path=datastore_path)
+    store: datastore.Datastore = gallery["store"]
 
     # embedded images
-    pickled_images = [representation["identity"] for representation in representations]
+    stored_images = dict(zip(store.identities.tolist(), store.hashes.tolist()))
 
-    # Get the list of images on storage
-    storage_images = image_utils.list_images(path=db_path)
+    # Get the list of images on storage. Only files changed since the directory's manifest
+    # was committed are opened, an unchanged watched directory is not even scanned.
+    if watch_database:
+        manifest.watch(db_path)
+    manifest_path = manifest.find_manifest_path(datastore_path)
+    listing = manifest.list_images(db_path=db_path, manifest_path=manifest_path)
+    storage_images = listing.images
 
     if len(storage_images) == 0 and refresh_database is True:
         raise ValueError(f"No item found in {db_path}")
-    if len(representations) == 0 and refresh_database is False:
+    if len(store) == 0 and refresh_database is False:
         raise ValueError(f"Nothing is found in {datastore_path}")
 
-    must_save_pickle = False
+    must_save_datastore = False
     new_images, old_images, replaced_images = set(), set(), set()
 
     if not refresh_database:
@@ -168,17 +202,15 @@ def find(
             "Set refresh_database to true to assure that any changes will be tracked."
         )
 
-    # Enforce data consistency amongst on disk images and pickle file
+    # Enforce data consistency amongst on disk images and datastore
     if refresh_database:
-        new_images = set(storage_images) - set(pickled_images)  # images added to storage
-        old_images = set(pickled_images) - set(storage_images)  # images removed from storage
+        new_images = set(storage_images) - set(stored_images)  # images added to storage
+        old_images = set(stored_images) - set(storage_images)  # images removed from storage
 
-        # detect replaced images
-        for current_representation in representations:
-            identity = current_representation["identity"]
-            if identity in old_images:
+        # detect replaced images, unchanged files of the manifest are not checked again
+        for identity, alpha_hash in stored_images.items():
+            if identity in old_images or identity not in listing.changed:
                 continue
-            alpha_hash = current_representation["hash"]
             beta_hash = image_utils.find_image_hash(identity)
             if alpha_hash != beta_hash:
                 logger.debug(f"Even though {identity} represented before, it's replaced later.")
@@ -197,12 +229,12 @@ def find(
 
     # remove old images first
     if len(old_images) > 0:
-        representations = [rep for rep in representations if rep["identity"] not in old_images]
-        must_save_pickle = True
+        store = store.select(~np.isin(store.identities, list(old_images)))
+        must_save_datastore = True
 
     # find representations for new images
     if len(new_images) > 0:
-        representations += __find_bulk_embeddings(
+        new_representations = __find_bulk_embeddings(
             employees=new_images,
             model_name=model_name,
             detector_backend=detector_backend,
@@ -211,17 +243,24 @@ def find(
             expand_percentage=expand_percentage,
             normalization=normalization,
             silent=silent,
-        )  # add new images
-        must_save_pickle = True
+            batch_size=batch_size,
+            workers=workers,
+        )
+        store = datastore.append(store, new_representations)
+        must_save_datastore = True
 
-    if must_save_pickle:
-        with open(datastore_path, "wb") as f:
-            pickle.dump(representations, f)
+    if must_save_datastore:
+        datastore.save(datastore_path, store)
+        gallery = __load_gallery(datastore_path=datastore_path)
         if not silent:
-            logger.info(f"There are now {len(representations)} representations in {file_name}")
+            logger.info(f"There are now {len(store)} representations in {file_name}")
+
+    # datastore is in sync with the directory now
+    if refresh_database:
+        manifest.commit(manifest_path, listing)
 
     # Should we have no representations bailout
-    if len(representations) == 0:
+    if len(store) == 0:
         if not silent:
             toc = time.time()
             logger.info(f"find function duration {toc - tic} seconds")
@@ -229,79 +268,66 @@ def find(
 
     # ----------------------------
     # now, we got representations for facial database
-    df = pd.DataFrame(representations)
+    # metadata dataframe is built once per datastore version, embeddings are memory mapped
+    df, embeddings, valid_rows, norms = __get_gallery_arrays(gallery=gallery)
+
+    index = None
+    if index_type != "flat":
+        index = __get_gallery_index(
+            gallery=gallery,
+            datastore_path=datastore_path,
+            index_type=index_type,
+            distance_metric=distance_metric,
+        )
 
     if silent is False:
         logger.info(f"Searching {img_path} in {df.shape[0]} length datastore")
 
     # img path might have more than once face
-    source_objs = detection.extract_faces(
+    target_objs = __find_target_embeddings(
         img_path=img_path,
+        model_name=model_name,
         detector_backend=detector_backend,
-        grayscale=False,
         enforce_detection=enforce_detection,
         align=align,
         expand_percentage=expand_percentage,
+        normalization=normalization,
         anti_spoofing=anti_spoofing,
     )
 
-    resp_obj = []
+    target_threshold = threshold or verification.find_threshold(model_name, distance_metric)
 
-    for source_obj in source_objs:
-        if anti_spoofing is True and source_obj.get("is_real", True) is False:
-            raise ValueError("Spoof detected in the given image.")
-        source_img = source_obj["face"]
-        source_region = source_obj["facial_area"]
-        target_embedding_obj = representation.represent(
-            img_path=source_img,
-            model_name=model_name,
-            enforce_detection=enforce_detection,
-            detector_backend="skip",
-            align=align,
-            normalization=normalization,
-        )
+    resp_obj = []
 
-        target_representation = target_embedding_obj[0]["embedding"]
+    for target_obj in target_objs:
+        source_region = target_obj["facial_area"]
+        target_representation = target_obj["embedding"]
+
+        if index is None:
+            indices, distances = __search_embeddings(
+                embeddings=embeddings,
+                valid_rows=valid_rows,
+                target_representation=target_representation,
+                distance_metric=distance_metric,
+                threshold=target_threshold,
+                top_k=top_k,
+                file_name=file_name,
+                norms=norms,
+            )
+        else:
+            ids, distances = index.search(
+                target=target_representation, k=top_k, threshold=target_threshold
+            )
+            indices = __find_rows(gallery=gallery, ids=ids)
 
-        result_df = df.copy()  # df will be filtered in each img
+        result_df = df.iloc[indices].reset_index(drop=True)
         result_df["source_x"] = source_region["x"]
         result_df["source_y"] = source_region["y"]
         result_df["source_w"] = source_region["w"]
         result_df["source_h"] = source_region["h"]
-
-        distances = []
-        for _, instance in df.iterrows():
-            source_representation = instance["embedding"]
-            if source_representation is None:
-                distances.append(float("inf"))  # no representation for this image
-                continue
-
-            target_dims = len(list(target_representation))
-            source_dims = len(list(source_representation))
-            if target_dims != source_dims:
-                raise ValueError(
-                    "Source and target embeddings must have same dimensions but "
-                    + f"{target_dims}:{source_dims}. Model structure may change"
-                    + " after pickle created. Delete the {file_name} and re-run."
-                )
-
-            distance = verification.find_distance(
-                source_representation, target_representation, distance_metric
-            )
-
-            distances.append(distance)
-
-            # ---------------------------
-        target_threshold = threshold or verification.find_threshold(model_name, distance_metric)
-
         result_df["threshold"] = target_threshold
         result_df["distance"] = distances
 
-        result_df = result_df.drop(columns=["embedding"])
-        # pylint: disable=unsubscriptable-object
-        result_df = result_df[result_df["distance"] <= target_threshold]
-        result_df = result_df.sort_values(by=["distance"], ascending=True).reset_index(drop=True)
-
         resp_obj.append(result_df)
 
     # -----------------------------------
@@ -313,6 +339,66 @@ def find(
     return resp_obj
 
 
+def __find_target_embeddings(
+    img_path: Union[str, np.ndarray],
+    model_name: str,
+    detector_backend: str,
+    enforce_detection: bool,
+    align: bool,
+    expand_percentage: int,
+    normalization: str,
+    anti_spoofing: bool,
+) -> List[Dict[str, Any]]:
+    """
+    Find embeddings and facial areas of faces in the searched image
+    Returns:
+        target_objs (list): embedding and facial_area of each face
+    """
+    if detector_backend != "skip":
+        # same as representing each extracted face, but in a single batch and
+        # served from the embedding cache if it is enabled
+        return representation.represent(
+            img_path=img_path,
+            model_name=model_name,
+            enforce_detection=enforce_detection,
+            detector_backend=detector_backend,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            anti_spoofing=anti_spoofing,
+        )
+
+    source_objs = detection.extract_faces(
+        img_path=img_path,
+        detector_backend=detector_backend,
+        grayscale=False,
+        enforce_detection=enforce_detection,
+        align=align,
+        expand_percentage=expand_percentage,
+        anti_spoofing=anti_spoofing,
+    )
+
+    target_objs = []
+    for source_obj in source_objs:
+        if anti_spoofing is True and source_obj.get("is_real", True) is False:
+            raise ValueError("Spoof detected in the given image.")
+        target_embedding_obj = representation.represent(
+            img_path=source_obj["face"],
+            model_name=model_name,
+            enforce_detection=enforce_detection,
+            detector_backend="skip",
+            align=align,
+            normalization=normalization,
+        )
+        target_objs.append(
+            {
+                "embedding": target_embedding_obj[0]["embedding"],
+                "facial_area": source_obj["facial_area"],
+            }
+        )
+    return target_objs
+
+
 def __find_bulk_embeddings(
     employees: Set[str],
     model_name: str = "VGG-Face",
@@ -322,9 +408,13 @@ def __find_bulk_embeddings(
     expand_percentage: int = 0,
     normalization: str = "base",
     silent: bool = False,
+    batch_size: int = 32,
+    workers: int = 1,
 ) -> List[Dict["str", Any]]:
     """
-    Find embeddings of a list of images
+    Find embeddings of a list of images with a staged pipeline. Images are hashed and decoded
+        in a thread pool, their faces are detected in detection workers and the calling thread
+        feeds detected faces to the facial recognition model in batches, so all stages overlap.
 
     Args:
         employees (list): list of exact image paths
@@ -346,68 +436,528 @@ def __find_bulk_embeddings(
         normalization (bool): normalization technique
 
         silent (bool): enable or disable informative logging
+
+        batch_size (int): number of detected faces fed to the model at once (default is 32)
+
+        workers (int): number of decoding threads and detection workers. Detection runs in a
+            background thread if it is 1. Otherwise it runs in a pool of spawned processes each
+            building its own detector. The pool is kept alive and reused by later calls, it is
+            meant for bulk re-indexing of large databases (default is 1).
     Returns:
         representations (list): pivot list of dict with
             image name, hash, embedding and detected face area's coordinates
     """
+    if workers < 1:
+        raise ValueError(f"workers must be a positive integer but it is {workers}")
+
     representations = []
-    for employee in tqdm(
-        employees,
-        desc="Finding representations",
-        disable=silent,
-    ):
-        file_hash = image_utils.find_image_hash(employee)
-
-        try:
-            img_objs = detection.extract_faces(
-                img_path=employee,
+
+    # detected faces waiting for their embeddings
+    pending: List[Dict[str, Any]] = []
+    faces: List[np.ndarray] = []
+
+    # images represented before are served from the embedding cache if it is enabled.
+    # skip backend feeds extracted faces to the model, so its embeddings are not
+    # the ones represent finds for the same image.
+    cache = caching.get_cache()
+    cache_options = None
+    if cache is not None and detector_backend != "skip":
+        cache_options = {
+            "model_name": model_name,
+            "detector_backend": detector_backend,
+            "align": align,
+            "normalization": normalization,
+            "expand_percentage": expand_percentage,
+            "enforce_detection": enforce_detection,
+        }
+    uncached: List[Tuple[Optional[str], List[Dict[str, Any]], List[Dict[str, Any]]]] = []
+
+    def flush():
+        embedding_objs = representation.represent_batch(
+            img_paths=faces,
+            model_name=model_name,
+            enforce_detection=enforce_detection,
+            detector_backend="skip",
+            align=align,
+            normalization=normalization,
+            batch_size=batch_size,
+        )
+        for rep, embedding_obj in zip(pending, embedding_objs):
+            rep["embedding"] = embedding_obj[0]["embedding"]
+        for cache_key, reps, img_objs in uncached:
+            cache.put(
+                cache_key,
+                [
+                    {
+                        "embedding": rep["embedding"],
+                        "facial_area": img_obj["facial_area"],
+                        "face_confidence": img_obj["confidence"],
+                    }
+                    for rep, img_obj in zip(reps, img_objs)
+                ],
+            )
+        pending.clear()
+        faces.clear()
+        uncached.clear()
+
+    # detectors are not thread safe (e.g. opencv's cascade classifiers), a single background
+    # thread is enough to overlap detection with recognition, more workers need processes.
+    detect_pool = (
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="deepface-detect")
+        if workers == 1
+        else __get_detection_pool(workers)
+    )
+    decode_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deepface-decode")
+
+    # bound the number of decoded images kept in memory
+    window = 2 * max(workers, DETECTION_BATCH_SIZE)
+    decoding: Deque[Tuple[str, Future]] = deque()
+    # each image waits for the detection of the chunk it belongs to and its index in it
+    detecting: Deque[
+        Tuple[str, str, Optional[str], Optional[list], Optional[Future], int]
+    ] = deque()
+    employees = list(employees)
+    employee_iterator = iter(employees)
+
+    def decode_next():
+        while len(decoding) < window:
+            employee = next(employee_iterator, None)
+            if employee is None:
+                return
+            decoding.append(
+                (employee, decode_pool.submit(__decode_image, employee, cache, cache_options))
+            )
+
+    try:
+        decode_next()
+        with tqdm(total=len(employees), desc="Finding representations", disable=silent) as pbar:
+            while len(decoding) > 0 or len(detecting) > 0:
+                # hand decoded images over to the detection stage in chunks
+                while len(decoding) > 0 and len(detecting) < window:
+                    chunk = []
+                    imgs: List[np.ndarray] = []
+                    while (
+                        len(decoding) > 0
+                        and len(detecting) + len(chunk) < window
+                        and len(imgs) < DETECTION_BATCH_SIZE
+                    ):
+                        employee, decoded = decoding.popleft()
+                        file_hash, img, cache_key, cached = decoded.result()
+                        index = -1
+                        if img is not None and cached is None:
+                            index = len(imgs)
+                            imgs.append(img)
+                        chunk.append((employee, file_hash, cache_key, cached, index))
+                        decode_next()
+
+                    detected = None
+                    if len(imgs) > 0:
+                        detected = detect_pool.submit(
+                            __detect_faces_batch,
+                            imgs=imgs,
+                            employees=[item[0] for item in chunk if item[4] >= 0],
+                            detector_backend=detector_backend,
+                            enforce_detection=enforce_detection,
+                            align=align,
+                            expand_percentage=expand_percentage,
+                        )
+                    for employee, file_hash, cache_key, cached, index in chunk:
+                        detecting.append(
+                            (
+                                employee,
+                                file_hash,
+                                cache_key,
+                                cached,
+                                detected if index >= 0 else None,
+                                index,
+                            )
+                        )
+
+                employee, file_hash, cache_key, cached, detected, index = detecting.popleft()
+                if cached is not None:
+                    for embedding_obj in cached:
+                        img_region = embedding_obj["facial_area"]
+                        representations.append(
+                            {
+                                "identity": employee,
+                                "hash": file_hash,
+                                "embedding": embedding_obj["embedding"],
+                                "target_x": img_region["x"],
+                                "target_y": img_region["y"],
+                                "target_w": img_region["w"],
+                                "target_h": img_region["h"],
+                            }
+                        )
+                    pbar.update(1)
+                    continue
+
+                img_objs = [] if detected is None else detected.result()[index]
+
+                if len(img_objs) == 0:
+                    representations.append(
+                        {
+                            "identity": employee,
+                            "hash": file_hash,
+                            "embedding": None,
+                            "target_x": 0,
+                            "target_y": 0,
+                            "target_w": 0,
+                            "target_h": 0,
+                        }
+                    )
+                else:
+                    reps = []
+                    for img_obj in img_objs:
+                        img_region = img_obj["facial_area"]
+                        rep = {
+                            "identity": employee,
+                            "hash": file_hash,
+                            "embedding": None,
+                            "target_x": img_region["x"],
+                            "target_y": img_region["y"],
+                            "target_w": img_region["w"],
+                            "target_h": img_region["h"],
+                        }
+                        representations.append(rep)
+                        reps.append(rep)
+                        pending.append(rep)
+                        faces.append(img_obj["face"])
+                    if cache_key is not None:
+                        uncached.append((cache_key, reps, img_objs))
+
+                    if len(faces) >= batch_size:
+                        flush()
+
+                pbar.update(1)
+    except BrokenProcessPool:
+        # a detection process died, do not hand the broken pool to later calls
+        with _detection_pools_lock:
+            _detection_pools.pop(workers, None)
+        raise
+    finally:
+        # the shared detection pool outlives this call, drop what is still queued for it
+        for _, _, _, _, detected, _ in detecting:
+            if detected is not None:
+                detected.cancel()
+        decode_pool.shutdown(wait=True, cancel_futures=True)
+        if workers == 1:
+            detect_pool.shutdown(wait=True)
+
+    if len(faces) > 0:
+        flush()
+
+    return representations
+
+
+def __get_detection_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Get the process pool detecting faces of bulk embeddings, spawned once per worker count
+    Args:
+        workers (int): number of detection processes
+    Returns:
+        pool (ProcessPoolExecutor): pool of spawned detection processes
+    """
+    with _detection_pools_lock:
+        pool = _detection_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+            _detection_pools[workers] = pool
+        return pool
+
+
+def __decode_image(
+    employee: str,
+    cache: Optional[caching.EmbeddingCache] = None,
+    cache_options: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Optional[np.ndarray], Optional[str], Optional[List[Dict[str, Any]]]]:
+    """
+    Hash and decode an image of the database. Runs in the decoding threads of bulk embeddings.
+    Args:
+        employee (str): exact image path
+        cache (EmbeddingCache): embedding cache to be consulted (default is None)
+        cache_options (dict): options of caching.find_key, the cache is consulted only
+            if they are set (default is None)
+    Returns:
+        result (tuple): hash of the image, its BGR pixels (None if it cannot be decoded or
+            it is cached), its embedding cache key and its cached representations
+    """
+    file_hash = image_utils.find_image_hash(employee)
+
+    cache_key = None
+    if cache is not None and cache_options is not None:
+        cache_key = caching.find_key(img=employee, **cache_options)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return file_hash, None, cache_key, cached
+
+    try:
+        img, _ = image_utils.load_image(employee)
+    except ValueError as err:
+        logger.error(f"Exception while loading {employee}: {str(err)}")
+        img = None
+    return file_hash, img, cache_key, None
+
+
+def __detect_faces(
+    img: np.ndarray,
+    employee: str,
+    detector_backend: str,
+    enforce_detection: bool,
+    align: bool,
+    expand_percentage: int,
+) -> List[Dict[str, Any]]:
+    """
+    Extract faces of a decoded image of the database. Runs in the detection workers.
+    Args:
+        img (np.ndarray): decoded image in BGR
+        employee (str): exact image path, used in log messages
+        detector_backend (str): face detector model name
+        enforce_detection (bool): raise an exception if no face is detected
+        align (bool): enable or disable alignment of the detected faces
+        expand_percentage (int): expand detected facial area with a percentage
+    Returns:
+        img_objs (list): extracted faces, empty if extraction failed
+    """
+    try:
+        return detection.extract_faces(
+            img_path=img,
+            detector_backend=detector_backend,
+            grayscale=False,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+        )
+    except ValueError as err:
+        logger.error(f"Exception while extracting faces from {employee}: {str(err)}")
+        return []
+
+
+def __detect_faces_batch(
+    imgs: List[np.ndarray],
+    employees: List[str],
+    detector_backend: str,
+    enforce_detection: bool,
+    align: bool,
+    expand_percentage: int,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Extract faces of a chunk of decoded images of the database with a single call
+        of the detector. Runs in the detection workers.
+    Args:
+        imgs (list): decoded images in BGR
+        employees (list): exact image paths, used in log messages
+        detector_backend (str): face detector model name
+        enforce_detection (bool): raise an exception if no face is detected
+        align (bool): enable or disable alignment of the detected faces
+        expand_percentage (int): expand detected facial area with a percentage
+    Returns:
+        img_objs (list): extracted faces of each image, empty if extraction failed
+    """
+    try:
+        return detection.extract_faces_batch(
+            img_paths=imgs,
+            detector_backend=detector_backend,
+            grayscale=False,
+            enforce_detection=enforce_detection,
+            align=align,
+            expand_percentage=expand_percentage,
+        )
+    except ValueError:
+        # an image of the chunk failed, retry one by one so that only it is skipped
+        return [
+            __detect_faces(
+                img=img,
+                employee=employee,
                 detector_backend=detector_backend,
-                grayscale=False,
                 enforce_detection=enforce_detection,
                 align=align,
                 expand_percentage=expand_percentage,
             )
+            for img, employee in zip(imgs, employees)
+        ]
+
+
+def __search_embeddings(
+    embeddings: np.ndarray,
+    valid_rows: np.ndarray,
+    target_representation: Union[np.ndarray, List[float]],
+    distance_metric: str,
+    threshold: float,
+    top_k: Optional[int] = None,
+    file_name: str = "",
+    norms: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the datastore rows closer than threshold to a target embedding
+        distances to all rows are calculated with a single matrix-vector product
+    Args:
+        embeddings (np.ndarray): (N, D) float32 matrix of datastore embeddings
+        valid_rows (np.ndarray): (N,) boolean mask of rows having a representation
+        target_representation (np.ndarray or list): embedding of the source face
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        threshold (float): maximum distance to be considered as a match
+        top_k (int): keep at most this many closest rows (default is None)
+        file_name (str): name of the datastore file, used in error messages
+        norms (np.ndarray): (N,) precomputed l2 norms of the embeddings. They are
+            calculated on the fly if left unset (default is None).
+    Returns:
+        indices (np.ndarray): row indices of matches, closest first
+        distances (np.ndarray): distances of matches as float64
+    """
+    target = np.asarray(target_representation, dtype=np.float32)
 
-        except ValueError as err:
-            logger.error(f"Exception while extracting faces from {employee}: {str(err)}")
-            img_objs = []
-
-        if len(img_objs) == 0:
-            representations.append(
-                {
-                    "identity": employee,
-                    "hash": file_hash,
-                    "embedding": None,
-                    "target_x": 0,
-                    "target_y": 0,
-                    "target_w": 0,
-                    "target_h": 0,
-                }
-            )
-        else:
-            for img_obj in img_objs:
-                img_content = img_obj["face"]
-                img_region = img_obj["facial_area"]
-                embedding_obj = representation.represent(
-                    img_path=img_content,
-                    model_name=model_name,
-                    enforce_detection=enforce_detection,
-                    detector_backend="skip",
-                    align=align,
-                    normalization=normalization,
-                )
-
-                img_representation = embedding_obj[0]["embedding"]
-                representations.append(
-                    {
-                        "identity": employee,
-                        "hash": file_hash,
-                        "embedding": img_representation,
-                        "target_x": img_region["x"],
-                        "target_y": img_region["y"],
-                        "target_w": img_region["w"],
-                        "target_h": img_region["h"],
-                    }
-                )
+    if not valid_rows.any():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
 
-    return representations
+    if target.shape[0] != embeddings.shape[1]:
+        raise ValueError(
+            "Source and target embeddings must have same dimensions but "
+            + f"{target.shape[0]}:{embeddings.shape[1]}. Model structure may change"
+            + f" after datastore created. Delete the {file_name} and re-run."
+        )
+
+    # one row of distances to every embedding, float32 memory mapped rows are not copied
+    distances = verification.find_distances(
+        target, embeddings, distance_metric=distance_metric, beta_norms=norms
+    )[0]
+    distances = distances.astype(np.float64)
+    distances[~valid_rows] = float("inf")
+
+    indices = np.flatnonzero(distances <= threshold)
+    if top_k is not None and top_k < len(indices):
+        partitioned = np.argpartition(distances[indices], top_k - 1)[:top_k]
+        indices = indices[partitioned]
+
+    indices = indices[np.argsort(distances[indices], kind="stable")]
+    return indices, distances[indices]
+
+
+def invalidate_gallery_cache(db_path: Optional[str] = None) -> None:
+    """
+    Drop decoded datastores from the in-process gallery cache.
+        Next find call will read the datastore from disk again.
+    Args:
+        db_path (str): Drop only datastores stored in this folder.
+            If left unset, whole cache is cleared (default is None).
+    """
+    with _gallery_lock:
+        if db_path is None:
+            _gallery_cache.clear()
+            return
+        db_path = os.path.abspath(db_path)
+        for datastore_path in list(_gallery_cache.keys()):
+            if os.path.dirname(datastore_path) == db_path:
+                del _gallery_cache[datastore_path]
+
+
+def __load_gallery(datastore_path: str) -> Dict[str, Any]:
+    """
+    Load a datastore from the gallery cache, map it from disk again if it is changed
+    Args:
+        datastore_path (str): exact path of the datastore
+    Returns:
+        gallery (dict): cache entry with memory mapped store and lazily built dataframe
+    """
+    key = os.path.abspath(datastore_path)
+    signature = datastore.signature(datastore_path)
+
+    with _gallery_lock:
+        gallery = _gallery_cache.get(key)
+        if gallery is not None and gallery["signature"] == signature:
+            return gallery
+
+    gallery = {"signature": signature, "store": datastore.load(datastore_path)}
+    with _gallery_lock:
+        _gallery_cache[key] = gallery
+    return gallery
+
+
+def __get_gallery_arrays(
+    gallery: Dict[str, Any]
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build metadata dataframe and embedding norms of a cached gallery once
+    Args:
+        gallery (dict): cache entry returned by __load_gallery
+    Returns:
+        df (pd.DataFrame): representations without embedding column
+        embeddings (np.ndarray): (N, D) float32 matrix
+        valid_rows (np.ndarray): (N,) boolean mask of rows having a representation
+        norms (np.ndarray): (N,) l2 norms of the embeddings
+    """
+    store: datastore.Datastore = gallery["store"]
+    with _gallery_lock:
+        if "df" not in gallery:
+            gallery["df"] = store.to_frame().reset_index(drop=True)
+            gallery["norms"] = np.linalg.norm(store.embeddings, axis=1)
+        return gallery["df"], store.embeddings, store.valid_rows, gallery["norms"]
+
+
+def __get_gallery_index(
+    gallery: Dict[str, Any], datastore_path: str, index_type: str, distance_metric: str
+) -> indexing.Index:
+    """
+    Find the nearest neighbour index of a cached gallery.
+        Index is read from disk and rows added or removed since it was stored are applied
+        to it by id. It is built from scratch only if there is no usable index on disk.
+    Args:
+        gallery (dict): cache entry returned by __load_gallery
+        datastore_path (str): exact path of the datastore
+        index_type (str): ivf or hnsw
+        distance_metric (str): cosine, euclidean or euclidean_l2
+    Returns:
+        index (indexing.Index): index whose ids are ids of the datastore rows
+    """
+    key = f"index_{index_type}_{distance_metric}"
+    with _gallery_lock:
+        if key in gallery:
+            return gallery[key]
+
+    store: datastore.Datastore = gallery["store"]
+    index_path = indexing.find_index_path(
+        datastore_path=datastore_path, index_type=index_type, distance_metric=distance_metric
+    )
+    index = None
+    if os.path.exists(index_path):
+        index = indexing.load_index(index_path)
+        if index.dimensions is not None and index.dimensions != store.embeddings.shape[1]:
+            # model structure changed after index was built
+            index = None
+
+    if index is None:
+        index = indexing.build_index(index_type=index_type, distance_metric=distance_metric)
+
+    if index.source_signature != gallery["signature"]:
+        valid_ids = store.ids[store.valid_rows]
+        removed = index.remove(np.setdiff1d(index.ids(), valid_ids))
+        added_ids = np.setdiff1d(valid_ids, index.ids())
+        if len(added_ids) > 0:
+            rows = __find_rows(gallery=gallery, ids=added_ids)
+            index.add(ids=added_ids, embeddings=store.embeddings[rows])
+        logger.debug(
+            f"{len(added_ids)} embeddings added to and {removed} embeddings removed from"
+            f" {index_path}"
+        )
+        index.source_signature = gallery["signature"]
+        index.save(index_path)
+
+    with _gallery_lock:
+        gallery[key] = index
+    return index
+
+
+def __find_rows(gallery: Dict[str, Any], ids: np.ndarray) -> np.ndarray:
+    """
+    Find row numbers of datastore ids in a cached gallery
+    Args:
+        gallery (dict): cache entry returned by __load_gallery
+        ids (np.ndarray): ids of datastore rows
+    Returns:
+        rows (np.ndarray): row number of each id
+    """
+    store: datastore.Datastore = gallery["store"]
+    with _gallery_lock:
+        if "id_order" not in gallery:
+            gallery["id_order"] = np.argsort(store.ids, kind="stable")
+        order = gallery["id_order"]
+    return order[np.searchsorted(store.ids, ids, sorter=order)]
@@ -1,14 +1,18 @@
 # built-in dependencies
-from typing import Any, Dict, List, Union, Optional
+import threading
+from typing import Any, Dict, List, Tuple, Union, Optional
 
 # 3rd party dependencies
 import numpy as np
 
 # project dependencies
 from deepface.commons import image_utils
-from deepface.modules import modeling, detection, preprocessing
+from deepface.modules import modeling, detection, preprocessing, caching
 from deepface.models.FacialRecognition import FacialRecognition
 
+# preprocessed face batches of each thread are written into the same buffer
+_buffers = threading.local()
+
 
 def represent(
     img_path: Union[str, np.ndarray],
@@ -20,6 +24,7 @@ def represent(
     normalization: str = "base",
     anti_spoofing: bool = False,
     max_faces: Optional[int] = None,
+    compiled: bool = False,
 ) -> List[Dict[str, Any]]:
     """
     Represent facial images as multi-dimensional vector embeddings.
@@ -49,6 +54,10 @@ def represent(
 
         max_faces (int): Set a limit on the number of faces to be processed (default is None).
 
+        compiled (boolean): Run keras based models as a compiled tf.function graph. It is
+            traced and warmed up once, then reused by later calls asking for it to lower
+            latency per face. Calls without it keep running eagerly (default is False).
+
     Returns:
         results (List[Dict[str, Any]]): A list of dictionaries, each containing the
             following fields:
@@ -63,20 +72,195 @@ def represent(
         - face_confidence (float): Confidence score of face detection. If `detector_backend` is set
             to 'skip', the confidence will be 0 and is nonsensical.
     """
-    resp_objs = []
+    # images represented before are served from the embedding cache if it is enabled
+    cache = caching.get_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = caching.find_key(
+            img=img_path,
+            model_name=model_name,
+            detector_backend=detector_backend,
+            align=align,
+            normalization=normalization,
+            expand_percentage=expand_percentage,
+            enforce_detection=enforce_detection,
+            anti_spoofing=anti_spoofing,
+            max_faces=max_faces,
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            for resp_obj in cached:
+                resp_obj["embedding"] = resp_obj["embedding"].tolist()
+            return cached
 
     model: FacialRecognition = modeling.build_model(
         task="facial_recognition", model_name=model_name
     )
 
+    img_objs = __find_img_objs(
+        img_path=img_path,
+        enforce_detection=enforce_detection,
+        detector_backend=detector_backend,
+        align=align,
+        expand_percentage=expand_percentage,
+        anti_spoofing=anti_spoofing,
+        max_faces=max_faces,
+    )
+
+    # feed all faces of the image to the model in a single batch
+    embeddings = model.forward_batch(
+        __stack_faces(
+            [img_obj["face"] for img_obj in img_objs],
+            target_size=model.input_shape,
+            normalization=normalization,
+        ),
+        compiled=compiled,
+    )
+
+    resp_objs = [
+        {
+            "embedding": embedding,
+            "facial_area": img_obj["facial_area"],
+            "face_confidence": img_obj["confidence"],
+        }
+        for img_obj, embedding in zip(img_objs, embeddings)
+    ]
+    if cache is not None:
+        cache.put(cache_key, resp_objs)
+
+    for resp_obj in resp_objs:
+        resp_obj["embedding"] = resp_obj["embedding"].tolist()
+    return resp_objs
+
+
+def represent_batch(
+    img_paths: List[Union[str, np.ndarray]],
+    model_name: str = "VGG-Face",
+    enforce_detection: bool = True,
+    detector_backend: str = "opencv",
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    anti_spoofing: bool = False,
+    max_faces: Optional[int] = None,
+    batch_size: int = 32,
+    compiled: bool = False,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Represent many facial images as multi-dimensional vector embeddings. Faces of all images
+        are fed to the model in chunks of batch_size instead of one forward pass per face.
+
+    Args:
+        img_paths (list): exact paths of images, numpy arrays in BGR format,
+            or base64 encoded images.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Default is True. Set to False to avoid the exception for low-resolution images.
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'centerface' or 'skip'.
+
+        align (boolean): Perform alignment based on the eye positions.
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Default is base. Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace
+
+        anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
+
+        max_faces (int): Set a limit on the number of faces to be processed per image
+            (default is None).
+
+        batch_size (int): Number of faces fed to the model at once (default is 32).
+
+        compiled (boolean): Run keras based models as a compiled tf.function graph. It is
+            traced and warmed up once, then reused by later calls asking for it to lower
+            latency per face. Calls without it keep running eagerly (default is False).
+
+    Returns:
+        results (List[List[Dict[str, Any]]]): For each image, a list of dictionaries having
+            same fields with represent's response. Embeddings are returned as float32
+            numpy arrays instead of lists.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be a positive integer but it is {batch_size}")
+
+    model: FacialRecognition = modeling.build_model(
+        task="facial_recognition", model_name=model_name
+    )
+
+    resp_objs: List[List[Dict[str, Any]]] = []
+    pending: List[Dict[str, Any]] = []
+    faces: List[np.ndarray] = []
+
+    def flush():
+        embeddings = model.forward_batch(
+            __stack_faces(faces, target_size=model.input_shape, normalization=normalization),
+            compiled=compiled,
+        )
+        for resp_obj, embedding in zip(pending, embeddings):
+            resp_obj["embedding"] = embedding
+        pending.clear()
+        faces.clear()
+
+    for img_path in img_paths:
+        img_objs = __find_img_objs(
+            img_path=img_path,
+            enforce_detection=enforce_detection,
+            detector_backend=detector_backend,
+            align=align,
+            expand_percentage=expand_percentage,
+            anti_spoofing=anti_spoofing,
+            max_faces=max_faces,
+        )
+        img_resp_objs = []
+        for img_obj in img_objs:
+            resp_obj = {
+                "embedding": None,
+                "facial_area": img_obj["facial_area"],
+                "face_confidence": img_obj["confidence"],
+            }
+            img_resp_objs.append(resp_obj)
+            pending.append(resp_obj)
+            faces.append(img_obj["face"])
+            if len(faces) >= batch_size:
+                flush()
+        resp_objs.append(img_resp_objs)
+
+    if len(faces) > 0:
+        flush()
+
+    return resp_objs
+
+
+def __find_img_objs(
+    img_path: Union[str, np.ndarray],
+    enforce_detection: bool,
+    detector_backend: str,
+    align: bool,
+    expand_percentage: int,
+    anti_spoofing: bool,
+    max_faces: Optional[int],
+) -> List[Dict[str, Any]]:
+    """
+    Detect faces to be represented in an image
+    Returns:
+        img_objs (list): extracted faces as returned by detection.extract_faces
+    """
     # ---------------------------------
     # we have run pre-process in verification. so, this can be skipped if it is coming from verify.
-    target_size = model.input_shape
     if detector_backend != "skip":
+        # faces are kept as uint8 bgr crops, __stack_faces scales them while resizing
         img_objs = detection.extract_faces(
             img_path=img_path,
             detector_backend=detector_backend,
             grayscale=False,
+            color_face="bgr",
+            normalize_face=False,
             enforce_detection=enforce_detection,
             align=align,
             expand_percentage=expand_percentage,
@@ -91,9 +275,10 @@ def represent(
             raise ValueError(f"Input img must be 3 dimensional but it is {img.shape}")
 
         # make dummy region and confidence to keep compatibility with `extract_faces`
+        # whole image is fed to the model with its channels flipped as it always was
         img_objs = [
             {
-                "face": img,
+                "face": img[:, :, ::-1],
                 "facial_area": {"x": 0, "y": 0, "w": img.shape[0], "h": img.shape[1]},
                 "confidence": 0,
             }
@@ -113,32 +298,35 @@ def represent(
     for img_obj in img_objs:
         if anti_spoofing is True and img_obj.get("is_real", True) is False:
             raise ValueError("Spoof detected in the given image.")
-        img = img_obj["face"]
-
-        # rgb to bgr
-        img = img[:, :, ::-1]
 
-        region = img_obj["facial_area"]
-        confidence = img_obj["confidence"]
+    return img_objs
 
-        # resize to expected shape of ml model
-        img = preprocessing.resize_image(
-            img=img,
-            # thanks to DeepId (!)
-            target_size=(target_size[1], target_size[0]),
-        )
 
-        # custom normalization
-        img = preprocessing.normalize_input(img=img, normalization=normalization)
+def __stack_faces(
+    faces: List[np.ndarray], target_size: Tuple[int, int], normalization: str
+) -> np.ndarray:
+    """
+    Preprocess detected faces and stack them into a single batch
+    Args:
+        faces (list): detected faces as uint8 bgr crops or [0, 1] scaled float ones
+        target_size (tuple): input shape of the facial recognition model
+        normalization (str): normalization technique
+    Returns:
+        batch (np.ndarray): preprocessed faces in shape (N, H, W, C). It is a view of a buffer
+            reused by the next call in the same thread.
+    """
+    # thanks to DeepId (!)
+    rows, columns = target_size[1], target_size[0]
+    shape = (len(faces), rows, columns, 3)
 
-        embedding = model.forward(img)
+    buffer = getattr(_buffers, "batch", None)
+    if buffer is None or buffer.shape[1:] != shape[1:] or buffer.shape[0] < shape[0]:
+        buffer = np.empty(shape, dtype=np.float32)
+        _buffers.batch = buffer
+    batch = buffer[: len(faces)]
 
-        resp_objs.append(
-            {
-                "embedding": embedding,
-                "facial_area": region,
-                "face_confidence": confidence,
-            }
+    for face, out in zip(faces, batch):
+        preprocessing.prepare_face(
+            img=face, target_size=(rows, columns), normalization=normalization, out=out
         )
-
-    return resp_objs
+    return batch
@@ -211,6 +211,7 @@ def search_identity(
             distance_metric=distance_metric,
             enforce_detection=False,
             silent=True,
+            top_k=1,
         )
     except ValueError as err:
         if f"No item found in {db_path}" in str(err):
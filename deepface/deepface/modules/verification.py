@@ -181,14 +181,15 @@ def verify(
     img1_embeddings, img1_facial_areas = extract_embeddings_and_facial_areas(img1_path, 1)
     img2_embeddings, img2_facial_areas = extract_embeddings_and_facial_areas(img2_path, 2)
 
+    # find the face pair with minimum distance
     min_distance, min_idx, min_idy = float("inf"), None, None
-    for idx, img1_embedding in enumerate(img1_embeddings):
-        for idy, img2_embedding in enumerate(img2_embeddings):
-            distance = find_distance(img1_embedding, img2_embedding, distance_metric)
-            if distance < min_distance:
-                min_distance, min_idx, min_idy = distance, idx, idy
+    if len(img1_embeddings) > 0 and len(img2_embeddings) > 0:
+        distances = find_distances(
+            np.asarray(img1_embeddings), np.asarray(img2_embeddings), distance_metric
+        )
+        min_idx, min_idy = np.unravel_index(np.argmin(distances), distances.shape)
+        min_distance = distances[min_idx, min_idy]
 
-    # find the face pair with minimum distance
     threshold = threshold or find_threshold(model_name, distance_metric)
     distance = float(min_distance)
     facial_areas = (
@@ -212,6 +213,267 @@ def verify(
     return resp_obj
 
 
+def verify_many(
+    probes: List[Union[str, np.ndarray, List[float]]],
+    candidates: List[Union[str, np.ndarray, List[float]]],
+    model_name: str = "VGG-Face",
+    detector_backend: str = "opencv",
+    distance_metric: str = "cosine",
+    enforce_detection: bool = True,
+    align: bool = True,
+    expand_percentage: int = 0,
+    normalization: str = "base",
+    silent: bool = False,
+    threshold: Optional[float] = None,
+    anti_spoofing: bool = False,
+    batch_size: int = 32,
+) -> Dict[str, Any]:
+    """
+    Verify every probe against every candidate.
+
+    Each unique image is detected once and faces of all images are represented in batches,
+    then distances of all face pairs are calculated at once. Distance of an image pair is the
+    distance of its closest face pair, as in verify.
+
+    Args:
+        probes (list): exact image paths, numpy arrays (BGR), base64 encoded images
+            or pre-calculated embeddings.
+
+        candidates (list): exact image paths, numpy arrays (BGR), base64 encoded images
+            or pre-calculated embeddings.
+
+        model_name (str): Model for face recognition. Options: VGG-Face, Facenet, Facenet512,
+            OpenFace, DeepFace, DeepID, Dlib, ArcFace, SFace and GhostFaceNet (default is VGG-Face).
+
+        detector_backend (string): face detector backend. Options: 'opencv', 'retinaface',
+            'mtcnn', 'ssd', 'dlib', 'mediapipe', 'yolov8', 'centerface' or 'skip'
+            (default is opencv)
+
+        distance_metric (string): Metric for measuring similarity. Options: 'cosine',
+            'euclidean', 'euclidean_l2' (default is cosine).
+
+        enforce_detection (boolean): If no face is detected in an image, raise an exception.
+            Set to False to avoid the exception for low-resolution images (default is True).
+
+        align (bool): Flag to enable face alignment (default is True).
+
+        expand_percentage (int): expand detected facial area with a percentage (default is 0).
+
+        normalization (string): Normalize the input image before feeding it to the model.
+            Options: base, raw, Facenet, Facenet2018, VGGFace, VGGFace2, ArcFace (default is base)
+
+        silent (boolean): Suppress or allow some log messages for a quieter analysis process
+            (default is False).
+
+        threshold (float): Specify a threshold to determine whether a pair represents the same
+            person or different individuals. If left unset, default pre-tuned threshold values
+            will be applied based on the specified model name and distance metric
+            (default is None).
+
+        anti_spoofing (boolean): Flag to enable anti spoofing (default is False).
+
+        batch_size (int): Number of faces fed to the model at once (default is 32).
+
+    Returns:
+        result (dict): A dictionary containing verification results of all pairs.
+
+        - 'verified' (np.ndarray): (P, C) boolean matrix, True if the probe and
+            the candidate represent the same person.
+
+        - 'distances' (np.ndarray): (P, C) distances of the closest face pairs.
+
+        - 'threshold' (float): The maximum threshold used for verification.
+
+        - 'model' (str): The chosen face recognition model.
+
+        - 'detector_backend' (str): The chosen face detector.
+
+        - 'similarity_metric' (str): The chosen similarity metric for measuring distances.
+
+        - 'facial_areas' (dict): Facial areas detected in each image.
+            - 'probes': list of facial areas of each probe
+            - 'candidates': list of facial areas of each candidate
+
+        - 'closest_faces' (dict): Indices of the closest face pair of each image pair
+            in the facial areas of its images.
+            - 'probes': (P, C) index of the probe's face
+            - 'candidates': (P, C) index of the candidate's face
+
+        - 'time' (float): Time taken for the verification process in seconds.
+    """
+    tic = time.time()
+
+    if len(probes) == 0 or len(candidates) == 0:
+        raise ValueError("Probes and candidates must have at least one item each")
+
+    model: FacialRecognition = modeling.build_model(
+        task="facial_recognition", model_name=model_name
+    )
+    dims = model.output_shape
+
+    no_facial_area = {
+        "x": None,
+        "y": None,
+        "w": None,
+        "h": None,
+        "left_eye": None,
+        "right_eye": None,
+    }
+
+    # detect faces of each unique image once
+    images = [("probes", i, img) for i, img in enumerate(probes)] + [
+        ("candidates", i, img) for i, img in enumerate(candidates)
+    ]
+    unique_positions: Dict[Any, int] = {}
+    positions = []
+    unique_embeddings: List[List[Optional[np.ndarray]]] = []
+    unique_facial_areas: List[List[dict]] = []
+    faces: List[np.ndarray] = []
+    face_owners: List[Tuple[int, int]] = []
+    for group, index, img in images:
+        # same path or same array object is a single image
+        key = img if isinstance(img, str) else id(img)
+        if key in unique_positions:
+            positions.append(unique_positions[key])
+            continue
+        position = len(unique_embeddings)
+        unique_positions[key] = position
+        positions.append(position)
+
+        if isinstance(img, list):
+            # given image is already pre-calculated embedding
+            if not all(isinstance(dim, float) for dim in img):
+                raise ValueError(
+                    f"When passing {group}[{index}] as a list,"
+                    " ensure that all its items are of type float."
+                )
+            if len(img) != dims:
+                raise ValueError(
+                    f"embeddings of {model_name} should have {dims} dimensions,"
+                    f" but {group}[{index}] has {len(img)} dimensions input"
+                )
+            unique_embeddings.append([np.array(img, dtype=np.float64)])
+            unique_facial_areas.append([no_facial_area])
+            continue
+
+        try:
+            img_objs = detection.extract_faces(
+                img_path=img,
+                detector_backend=detector_backend,
+                grayscale=False,
+                enforce_detection=enforce_detection,
+                align=align,
+                expand_percentage=expand_percentage,
+                anti_spoofing=anti_spoofing,
+            )
+            for img_obj in img_objs:
+                if anti_spoofing is True and img_obj.get("is_real", True) is False:
+                    raise ValueError("Spoof detected in given image.")
+        except ValueError as err:
+            raise ValueError(f"Exception while processing {group}[{index}]") from err
+
+        unique_embeddings.append([None] * len(img_objs))
+        unique_facial_areas.append([img_obj["facial_area"] for img_obj in img_objs])
+        for face_index, img_obj in enumerate(img_objs):
+            faces.append(img_obj["face"])
+            face_owners.append((position, face_index))
+
+    if not silent:
+        logger.info(
+            f"Representing {len(faces)} faces of {len(unique_embeddings)} unique images"
+        )
+
+    # feed extracted faces of all images to the model in batches
+    embedding_objs = representation.represent_batch(
+        img_paths=faces,
+        model_name=model_name,
+        enforce_detection=enforce_detection,
+        detector_backend="skip",
+        align=align,
+        normalization=normalization,
+        batch_size=batch_size,
+    )
+    for (position, face_index), embedding_obj in zip(face_owners, embedding_objs):
+        unique_embeddings[position][face_index] = embedding_obj[0]["embedding"]
+
+    unique_matrices = [np.stack(embeddings) for embeddings in unique_embeddings]
+    probe_positions = positions[: len(probes)]
+    candidate_positions = positions[len(probes) :]
+
+    # distances of all face pairs, then the closest face pair of each image pair
+    face_distances = find_distances(
+        np.concatenate([unique_matrices[position] for position in probe_positions]),
+        np.concatenate([unique_matrices[position] for position in candidate_positions]),
+        distance_metric=distance_metric,
+    )
+    distances, probe_faces, candidate_faces = __find_closest_faces(
+        face_distances=face_distances,
+        probe_counts=[len(unique_matrices[position]) for position in probe_positions],
+        candidate_counts=[len(unique_matrices[position]) for position in candidate_positions],
+    )
+
+    threshold = threshold or find_threshold(model_name, distance_metric)
+
+    toc = time.time()
+
+    return {
+        "verified": distances <= threshold,
+        "distances": distances,
+        "threshold": threshold,
+        "model": model_name,
+        "detector_backend": detector_backend,
+        "similarity_metric": distance_metric,
+        "facial_areas": {
+            "probes": [unique_facial_areas[position] for position in probe_positions],
+            "candidates": [unique_facial_areas[position] for position in candidate_positions],
+        },
+        "closest_faces": {"probes": probe_faces, "candidates": candidate_faces},
+        "time": round(toc - tic, 2),
+    }
+
+
+def __find_closest_faces(
+    face_distances: np.ndarray, probe_counts: List[int], candidate_counts: List[int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Reduce distances of face pairs to distances of image pairs
+    Args:
+        face_distances (np.ndarray): (Fp, Fc) distances of all face pairs. Faces of
+            each image are consecutive.
+        probe_counts (list): number of faces of each probe, at least 1
+        candidate_counts (list): number of faces of each candidate, at least 1
+    Returns:
+        distances (np.ndarray): (P, C) distance of the closest face pair of each image pair
+        probe_faces (np.ndarray): (P, C) index of the probe's face in the closest pair
+        candidate_faces (np.ndarray): (P, C) index of the candidate's face in the closest pair
+    """
+    probe_starts = np.cumsum([0] + probe_counts[:-1])
+    candidate_starts = np.cumsum([0] + candidate_counts[:-1])
+
+    # closest probe face for each candidate face, then closest candidate face
+    by_probe = np.minimum.reduceat(face_distances, probe_starts, axis=0)
+    distances = np.minimum.reduceat(by_probe, candidate_starts, axis=1)
+
+    # first face reaching the minimum, relative to the first face of its image
+    rows = np.arange(face_distances.shape[0])[:, None]
+    probe_rows = np.where(
+        face_distances == np.repeat(by_probe, probe_counts, axis=0), rows, rows.shape[0]
+    )
+    probe_rows = np.minimum.reduceat(probe_rows, probe_starts, axis=0)
+    columns = np.arange(by_probe.shape[1])[None, :]
+    candidate_columns = np.where(
+        by_probe == np.repeat(distances, candidate_counts, axis=1), columns, columns.shape[1]
+    )
+    candidate_columns = np.minimum.reduceat(candidate_columns, candidate_starts, axis=1)
+    probe_faces = np.take_along_axis(probe_rows, candidate_columns, axis=1)
+
+    return (
+        distances,
+        probe_faces - probe_starts[:, None],
+        candidate_columns - candidate_starts[None, :],
+    )
+
+
 def __extract_faces_and_embeddings(
     img_path: Union[str, np.ndarray],
     model_name: str = "VGG-Face",
@@ -228,6 +490,24 @@ def __extract_faces_and_embeddings(
         embeddings (List[float])
         facial areas (List[dict])
     """
+    if detector_backend != "skip":
+        # same as representing each extracted face, but in a single batch and
+        # served from the embedding cache if it is enabled
+        img_embedding_objs = representation.represent(
+            img_path=img_path,
+            model_name=model_name,
+            enforce_detection=enforce_detection,
+            detector_backend=detector_backend,
+            align=align,
+            expand_percentage=expand_percentage,
+            normalization=normalization,
+            anti_spoofing=anti_spoofing,
+        )
+        return (
+            [img_embedding_obj["embedding"] for img_embedding_obj in img_embedding_objs],
+            [img_embedding_obj["facial_area"] for img_embedding_obj in img_embedding_objs],
+        )
+
     embeddings = []
     facial_areas = []
 
@@ -272,16 +552,7 @@ def find_cosine_distance(
     Returns
         distance (np.float64): calculated cosine distance
     """
-    if isinstance(source_representation, list):
-        source_representation = np.array(source_representation)
-
-    if isinstance(test_representation, list):
-        test_representation = np.array(test_representation)
-
-    a = np.dot(source_representation, test_representation)
-    b = np.linalg.norm(source_representation)
-    c = np.linalg.norm(test_representation)
-    return 1 - a / (b * c)
+    return find_cosine_distances(source_representation, test_representation)[0, 0]
 
 
 def find_euclidean_distance(
@@ -295,27 +566,26 @@ def find_euclidean_distance(
     Returns
         distance (np.float64): calculated euclidean distance
     """
-    if isinstance(source_representation, list):
-        source_representation = np.array(source_representation)
-
-    if isinstance(test_representation, list):
-        test_representation = np.array(test_representation)
-
-    return np.linalg.norm(source_representation - test_representation)
+    return find_euclidean_distances(source_representation, test_representation)[0, 0]
 
 
-def l2_normalize(x: Union[np.ndarray, list]) -> np.ndarray:
+def l2_normalize(x: Union[np.ndarray, list], axis: Optional[int] = None) -> np.ndarray:
     """
     Normalize input vector with l2
     Args:
-        x (np.ndarray or list): given vector
+        x (np.ndarray or list): given vector or matrix
+        axis (int): normalize each vector along this axis of a matrix, e.g. 1 for
+            (N, D) embeddings. Whole input is normalized if left unset (default is None).
     Returns:
-        y (np.ndarray): l2 normalized vector
+        y (np.ndarray): l2 normalized vector. Vectors without magnitude are left as they are.
     """
     if isinstance(x, list):
         x = np.array(x)
-    norm = np.linalg.norm(x)
-    return x if norm == 0 else x / norm
+    if axis is None:
+        norm = np.linalg.norm(x)
+        return x if norm == 0 else x / norm
+    norms = np.linalg.norm(x, axis=axis, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
 
 
 def find_distance(
@@ -331,17 +601,193 @@ def find_distance(
     Returns
         distance (np.float64): calculated cosine distance
     """
+    return find_distances(alpha_embedding, beta_embedding, distance_metric)[0, 0]
+
+
+def find_distances(
+    alpha_embeddings: Union[np.ndarray, list],
+    beta_embeddings: Union[np.ndarray, list],
+    distance_metric: str,
+    alpha_norms: Optional[np.ndarray] = None,
+    beta_norms: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Find distances between every pair of vectors of two sets with a single matrix product.
+        This is the kernel of verify, verify_many, find and the indexes.
+    Args:
+        alpha_embeddings (np.ndarray or list): (N, D) vectors or a single (D,) vector
+        beta_embeddings (np.ndarray or list): (M, D) vectors or a single (D,) vector
+        distance_metric (str): cosine, euclidean or euclidean_l2
+        alpha_norms (np.ndarray): (N,) precomputed l2 norms of alpha embeddings. They are
+            calculated on the fly if left unset (default is None).
+        beta_norms (np.ndarray): (M,) precomputed l2 norms of beta embeddings
+            (default is None).
+        out (np.ndarray): preallocated (N, M) buffer distances are written into
+            (default is None).
+    Returns
+        distances (np.ndarray): (N, M) distances. float32 if both sets are float32 arrays,
+            float64 otherwise.
+    """
     if distance_metric == "cosine":
-        distance = find_cosine_distance(alpha_embedding, beta_embedding)
+        kernel = find_cosine_distances
     elif distance_metric == "euclidean":
-        distance = find_euclidean_distance(alpha_embedding, beta_embedding)
+        kernel = find_euclidean_distances
     elif distance_metric == "euclidean_l2":
-        distance = find_euclidean_distance(
-            l2_normalize(alpha_embedding), l2_normalize(beta_embedding)
-        )
+        kernel = find_euclidean_l2_distances
     else:
         raise ValueError("Invalid distance_metric passed - ", distance_metric)
-    return distance
+    return kernel(
+        alpha_embeddings,
+        beta_embeddings,
+        alpha_norms=alpha_norms,
+        beta_norms=beta_norms,
+        out=out,
+    )
+
+
+def find_cosine_distances(
+    alpha_embeddings: Union[np.ndarray, list],
+    beta_embeddings: Union[np.ndarray, list],
+    alpha_norms: Optional[np.ndarray] = None,
+    beta_norms: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Find cosine distances between every pair of vectors of two sets.
+        Pairs having a vector without magnitude are 1 apart.
+    Args:
+        alpha_embeddings (np.ndarray or list): (N, D) vectors or a single (D,) vector
+        beta_embeddings (np.ndarray or list): (M, D) vectors or a single (D,) vector
+        alpha_norms (np.ndarray): (N,) precomputed l2 norms of alpha embeddings (default is None)
+        beta_norms (np.ndarray): (M,) precomputed l2 norms of beta embeddings (default is None)
+        out (np.ndarray): preallocated (N, M) buffer (default is None)
+    Returns
+        distances (np.ndarray): (N, M) cosine distances
+    """
+    similarities, _, _ = __find_similarities(
+        alpha_embeddings, beta_embeddings, alpha_norms, beta_norms, out
+    )
+    return np.subtract(1, similarities, out=similarities)
+
+
+def find_euclidean_distances(
+    alpha_embeddings: Union[np.ndarray, list],
+    beta_embeddings: Union[np.ndarray, list],
+    alpha_norms: Optional[np.ndarray] = None,
+    beta_norms: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Find euclidean distances between every pair of vectors of two sets
+        as sqrt(|a|^2 + |b|^2 - 2 a.b)
+    Args:
+        alpha_embeddings (np.ndarray or list): (N, D) vectors or a single (D,) vector
+        beta_embeddings (np.ndarray or list): (M, D) vectors or a single (D,) vector
+        alpha_norms (np.ndarray): (N,) precomputed l2 norms of alpha embeddings (default is None)
+        beta_norms (np.ndarray): (M,) precomputed l2 norms of beta embeddings (default is None)
+        out (np.ndarray): preallocated (N, M) buffer (default is None)
+    Returns
+        distances (np.ndarray): (N, M) euclidean distances
+    """
+    alpha_embeddings, beta_embeddings = __as_matrices(alpha_embeddings, beta_embeddings)
+    alpha_norms = __find_norms(alpha_embeddings, alpha_norms)
+    beta_norms = __find_norms(beta_embeddings, beta_norms)
+
+    distances = np.matmul(alpha_embeddings, beta_embeddings.T, out=out)
+    distances *= -2
+    distances += np.square(alpha_norms)[:, None]
+    distances += np.square(beta_norms)[None, :]
+    np.maximum(distances, 0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def find_euclidean_l2_distances(
+    alpha_embeddings: Union[np.ndarray, list],
+    beta_embeddings: Union[np.ndarray, list],
+    alpha_norms: Optional[np.ndarray] = None,
+    beta_norms: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Find euclidean distances between every pair of l2 normalized vectors of two sets.
+        Vectors are not normalized in memory, their norms are applied to the products.
+        Vectors without magnitude are left as they are, as in l2_normalize.
+    Args:
+        alpha_embeddings (np.ndarray or list): (N, D) vectors or a single (D,) vector
+        beta_embeddings (np.ndarray or list): (M, D) vectors or a single (D,) vector
+        alpha_norms (np.ndarray): (N,) precomputed l2 norms of alpha embeddings (default is None)
+        beta_norms (np.ndarray): (M,) precomputed l2 norms of beta embeddings (default is None)
+        out (np.ndarray): preallocated (N, M) buffer (default is None)
+    Returns
+        distances (np.ndarray): (N, M) euclidean distances of normalized vectors
+    """
+    distances, alpha_norms, beta_norms = __find_similarities(
+        alpha_embeddings, beta_embeddings, alpha_norms, beta_norms, out
+    )
+    # squared norm of a normalized vector is 1, or 0 if it has no magnitude
+    distances *= -2
+    distances += (alpha_norms != 0)[:, None]
+    distances += (beta_norms != 0)[None, :]
+    np.maximum(distances, 0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def __as_matrices(
+    alpha_embeddings: Union[np.ndarray, list], beta_embeddings: Union[np.ndarray, list]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert two sets of vectors into 2 dimensional matrices of the same float type
+    """
+    alpha_embeddings = np.asarray(alpha_embeddings)
+    beta_embeddings = np.asarray(beta_embeddings)
+    # float32 embeddings, e.g. memory mapped datastores, are not copied into float64
+    if alpha_embeddings.dtype == np.float32 and beta_embeddings.dtype == np.float32:
+        dtype = np.float32
+    else:
+        dtype = np.float64
+    alpha_embeddings = np.atleast_2d(alpha_embeddings.astype(dtype, copy=False))
+    beta_embeddings = np.atleast_2d(beta_embeddings.astype(dtype, copy=False))
+    if alpha_embeddings.shape[1] != beta_embeddings.shape[1]:
+        raise ValueError(
+            "Source and target embeddings must have same dimensions but "
+            f"{alpha_embeddings.shape[1]}:{beta_embeddings.shape[1]}"
+        )
+    return alpha_embeddings, beta_embeddings
+
+
+def __find_norms(embeddings: np.ndarray, norms: Optional[np.ndarray]) -> np.ndarray:
+    if norms is None:
+        return np.linalg.norm(embeddings, axis=1)
+    norms = np.asarray(norms).reshape(-1)
+    if norms.shape[0] != embeddings.shape[0]:
+        raise ValueError(f"Expected {embeddings.shape[0]} norms but {norms.shape[0]} passed")
+    return norms
+
+
+def __find_similarities(
+    alpha_embeddings: Union[np.ndarray, list],
+    beta_embeddings: Union[np.ndarray, list],
+    alpha_norms: Optional[np.ndarray],
+    beta_norms: Optional[np.ndarray],
+    out: Optional[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find cosine similarities between every pair of vectors of two sets into out.
+        Similarity of a vector without magnitude is 0.
+    Returns:
+        similarities (np.ndarray): (N, M) cosine similarities
+        alpha_norms (np.ndarray): (N,) l2 norms of alpha embeddings
+        beta_norms (np.ndarray): (M,) l2 norms of beta embeddings
+    """
+    alpha_embeddings, beta_embeddings = __as_matrices(alpha_embeddings, beta_embeddings)
+    alpha_norms = __find_norms(alpha_embeddings, alpha_norms)
+    beta_norms = __find_norms(beta_embeddings, beta_norms)
+
+    similarities = np.matmul(alpha_embeddings, beta_embeddings.T, out=out)
+    similarities /= np.where(alpha_norms == 0, 1, alpha_norms)[:, None]
+    similarities /= np.where(beta_norms == 0, 1, beta_norms)[None, :]
+    return similarities, alpha_norms, beta_norms
 
 
 def find_threshold(model_name: str, distance_metric: str) -> float:
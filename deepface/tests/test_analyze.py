@@ -135,3 +135,41 @@ def test_analyze_for_different_detectors():
                     assert result["gender"]["Man"] > result["gender"]["Woman"]
                 else:
                     assert result["gender"]["Man"] < result["gender"]["Woman"]
+
+
+def test_analyze_batch_matches_analyze():
+    img_paths = ["dataset/img4.jpg", "dataset/couple.jpg", "dataset/img1.jpg"]
+    # a small batch size makes faces of different images share a forward pass
+    results = DeepFace.analyze_batch(img_paths, batch_size=2, silent=True)
+    assert len(results) == len(img_paths)
+
+    for img_path, demography_objs in zip(img_paths, results):
+        expected_objs = DeepFace.analyze(img_path, silent=True)
+        assert len(demography_objs) == len(expected_objs)
+        for demography, expected in zip(demography_objs, expected_objs):
+            assert list(demography.keys()) == list(expected.keys())
+            assert demography["region"] == expected["region"]
+            assert abs(demography["age"] - expected["age"]) <= 1
+            for action in ["gender", "race", "emotion"]:
+                assert demography[f"dominant_{action}"] == expected[f"dominant_{action}"]
+                for label, score in expected[action].items():
+                    assert abs(demography[action][label] - score) < 0.1
+
+    logger.info("✅ test analyze batch done")
+
+
+def test_analyze_keeps_response_key_order():
+    demography_objs = DeepFace.analyze("dataset/img4.jpg", silent=True)
+    assert list(demography_objs[0].keys()) == [
+        "emotion",
+        "dominant_emotion",
+        "region",
+        "face_confidence",
+        "age",
+        "gender",
+        "dominant_gender",
+        "race",
+        "dominant_race",
+    ]
+
+    logger.info("✅ test analyze key order done")
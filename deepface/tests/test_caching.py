@@ -0,0 +1,141 @@
+# built-in dependencies
+import os
+import shutil
+
+# 3rd party dependencies
+import numpy as np
+import pytest
+
+# project dependencies
+from deepface import DeepFace
+from deepface.modules import caching, modeling, recognition, representation
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+key_options = {
+    "model_name": "VGG-Face",
+    "detector_backend": "opencv",
+    "align": True,
+    "normalization": "base",
+    "expand_percentage": 0,
+}
+
+
+def build_representations(seed: int, faces: int = 1, dimensions: int = 128):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "embedding": rng.normal(size=dimensions).astype(np.float32),
+            "facial_area": {
+                "x": i,
+                "y": 0,
+                "w": 10,
+                "h": 10,
+                "left_eye": (3, 4),
+                "right_eye": None,
+            },
+            "face_confidence": 0.9,
+        }
+        for i in range(faces)
+    ]
+
+
+def test_cache_evicts_least_recently_used_entries():
+    # room for 2 embeddings of 128 float32
+    cache = caching.EmbeddingCache(max_bytes=2 * 128 * 4)
+    for key in ["a", "b"]:
+        cache.put(key, build_representations(seed=0))
+
+    assert cache.get("a") is not None
+    cache.put("c", build_representations(seed=1))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats() == {
+        "hits": 3,
+        "disk_hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 2 * 128 * 4,
+    }
+
+    # cached embeddings cannot be modified by callers
+    with pytest.raises(ValueError):
+        cache.get("a")[0]["embedding"][0] = 0
+
+    logger.info("✅ embedding cache eviction test done")
+
+
+def test_cache_reads_entries_of_disk_tier(tmp_path):
+    representations = build_representations(seed=0, faces=2)
+    caching.EmbeddingCache(cache_dir=str(tmp_path)).put("abc", representations)
+
+    cache = caching.EmbeddingCache(cache_dir=str(tmp_path))
+    cached = cache.get("abc")
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("abc") is not None
+    assert cache.stats()["hits"] == 1
+
+    assert len(cached) == 2
+    for rep, cached_rep in zip(representations, cached):
+        assert np.array_equal(rep["embedding"], cached_rep["embedding"])
+        assert rep["facial_area"] == cached_rep["facial_area"]
+        assert rep["face_confidence"] == cached_rep["face_confidence"]
+
+    logger.info("✅ embedding cache disk tier test done")
+
+
+def test_cache_keys_address_image_content(tmp_path):
+    img_path = os.path.join("dataset", "img1.jpg")
+    copy_path = os.path.join(tmp_path, "copy.jpg")
+    shutil.copy(img_path, copy_path)
+
+    key = caching.find_key(img=img_path, **key_options)
+    assert caching.find_key(img=copy_path, **key_options) == key
+    assert caching.find_key(img=img_path, **{**key_options, "align": False}) != key
+    assert caching.find_key(img=os.path.join("dataset", "img2.jpg"), **key_options) != key
+    assert caching.find_key(img="https://example.com/img1.jpg", **key_options) is None
+
+    img = np.zeros((4, 4, 3), dtype=np.uint8)
+    key = caching.find_key(img=img, **key_options)
+    assert caching.find_key(img=img.copy(), **key_options) == key
+    img[0, 0, 0] = 1
+    assert caching.find_key(img=img, **key_options) != key
+
+    logger.info("✅ embedding cache key test done")
+
+
+def test_represent_and_find_consult_cache(monkeypatch):
+    def build_model(*args, **kwargs):
+        raise AssertionError("cached images must not be represented again")
+
+    cache = DeepFace.enable_embedding_cache()
+    try:
+        img_path = os.path.join("dataset", "img1.jpg")
+        representations = build_representations(seed=0, faces=2)
+        cache.put(caching.find_key(img=img_path, **key_options), representations)
+
+        monkeypatch.setattr(modeling, "build_model", build_model)
+        monkeypatch.setattr(representation, "represent_batch", build_model)
+
+        embedding_objs = DeepFace.represent(img_path=img_path)
+        assert [obj["embedding"] for obj in embedding_objs] == [
+            rep["embedding"].tolist() for rep in representations
+        ]
+        assert embedding_objs[1]["facial_area"] == representations[1]["facial_area"]
+
+        # pylint: disable=protected-access
+        bulk = recognition.__find_bulk_embeddings(employees=[img_path], silent=True)
+        assert [rep["identity"] for rep in bulk] == [img_path, img_path]
+        assert [rep["target_x"] for rep in bulk] == [0, 1]
+        assert np.array_equal(bulk[0]["embedding"], representations[0]["embedding"])
+
+        assert cache.stats()["hits"] == 2
+    finally:
+        DeepFace.disable_embedding_cache()
+
+    assert caching.get_cache() is None
+    logger.info("✅ represent and find with embedding cache test done")
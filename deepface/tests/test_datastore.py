@@ -0,0 +1,82 @@
+# built-in dependencies
+import os
+import pickle
+
+# 3rd party dependencies
+import numpy as np
+import pandas as pd
+
+# project dependencies
+from deepface.modules import datastore
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+representations = [
+    {
+        "identity": f"dataset/img{i}.jpg",
+        "hash": f"hash{i}",
+        "embedding": None if i == 2 else [float(i), 0.5, -1.0],
+        "target_x": i,
+        "target_y": 2 * i,
+        "target_w": 10,
+        "target_h": 20,
+    }
+    for i in range(5)
+]
+
+
+def test_save_and_load_memory_mapped_store(tmp_path):
+    path = os.path.join(tmp_path, "ds_model_vggface.npz")
+    store = datastore.from_representations(representations)
+    datastore.save(path, store)
+
+    loaded = datastore.load(path)
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.embeddings.dtype == np.float32
+    assert loaded.embeddings.shape == (5, 3)
+    assert list(loaded.valid_rows) == [True, True, False, True, True]
+    assert loaded.face_ids is None
+    assert loaded.to_representations() == representations
+
+    df = loaded.to_frame()
+    assert list(df.columns) == ["identity", "hash"] + datastore.FACIAL_AREA_KEYS
+    assert df["identity"].tolist() == [rep["identity"] for rep in representations]
+
+    # saving again replaces the embeddings file, ids of removed rows are not reused
+    datastore.save(path, loaded.select(np.arange(5) < 4))
+    reloaded = datastore.load(path)
+    assert len(reloaded) == 4
+    assert reloaded.next_id == 5
+    assert list(datastore.append(reloaded, representations[:1]).ids) == [0, 1, 2, 3, 5]
+    assert len([file for file in os.listdir(tmp_path) if file.endswith(".npy")]) == 1
+
+    logger.info("✅ datastore save and load test done")
+
+
+def test_migrate_pickle_datastores(tmp_path):
+    pickle_path = os.path.join(tmp_path, "ds_model_vggface.pkl")
+    with open(pickle_path, "wb") as f:
+        pickle.dump(representations, f)
+
+    store = datastore.migrate(pickle_path=pickle_path)
+    path = datastore.find_store_path(pickle_path)
+    assert path == os.path.join(tmp_path, "ds_model_vggface.npz")
+    assert datastore.load(path).to_representations() == store.to_representations()
+
+    # global model of api is a pickled dataframe with face ids
+    df = pd.DataFrame([{**rep, "face_id": i % 2} for i, rep in enumerate(representations)])
+    df.index = pd.RangeIndex(10, 15)
+    model_path = os.path.join(tmp_path, "model1.pkl")
+    with open(model_path, "wb") as f:
+        pickle.dump(df, f)
+
+    store = datastore.migrate(pickle_path=model_path)
+    assert list(store.ids) == [10, 11, 12, 13, 14]
+    assert list(store.face_ids) == [0, 1, 0, 1, 0]
+    assert store.to_frame().loc[13, "identity"] == "dataset/img3.jpg"
+
+    merged = datastore.concat([store, datastore.from_representations(representations[:1])])
+    assert list(merged.face_ids) == [0, 1, 0, 1, 0, datastore.NO_FACE_ID]
+
+    logger.info("✅ datastore migration test done")
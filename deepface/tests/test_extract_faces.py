@@ -1,5 +1,6 @@
 # built-in dependencies
 import base64
+from itertools import product
 
 # 3rd party dependencies
 import cv2
@@ -9,6 +10,8 @@ import pytest
 # project dependencies
 from deepface import DeepFace
 from deepface.commons import image_utils
+from deepface.models.Detector import FacialAreaRegion
+from deepface.modules import detection, modeling
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -141,3 +144,168 @@ def test_facial_coordinates_are_in_borders():
         assert y + h < height
 
     logger.info("✅ facial area coordinates are all in image borders")
+
+
+def test_patch_alignment_matches_image_alignment():
+    img = cv2.imread("dataset/selfie-many-people.jpg")
+
+    for detector, expand_percentage in product(detectors, [0, 20]):
+        # both modes run the detector on the same bordered image
+        patch_objs = detection.detect_faces(
+            detector_backend=detector, img=img, expand_percentage=expand_percentage
+        )
+        image_objs = detection.detect_faces(
+            detector_backend=detector,
+            img=img,
+            expand_percentage=expand_percentage,
+            align_mode="image",
+        )
+        assert len(patch_objs) > 0
+        assert len(patch_objs) == len(image_objs)
+        for patch_obj, image_obj in zip(patch_objs, image_objs):
+            assert patch_obj.facial_area == image_obj.facial_area
+            assert patch_obj.img.shape == image_obj.img.shape
+            # cubic interpolation of sharp edges rounds a few pixels differently, by at most
+            # 4 intensity levels on less than 1% of pixels of dataset images
+            diff = np.abs(patch_obj.img.astype(int) - image_obj.img.astype(int))
+            assert diff.max(initial=0) <= 4
+            assert np.count_nonzero(diff) <= 0.01 * diff.size
+
+    with pytest.raises(ValueError, match="align_mode"):
+        detection.detect_faces(detector_backend="opencv", img=img, align_mode="fast")
+
+    logger.info("✅ patch alignment test done")
+
+
+def test_unbordered_detection_aligns_faces_as_image_mode():
+    img = cv2.imread("dataset/selfie-many-people.jpg")
+    height, width, _ = img.shape
+    height_border, width_border = int(0.5 * height), int(0.5 * width)
+    bordered_img = cv2.copyMakeBorder(
+        img,
+        height_border,
+        height_border,
+        width_border,
+        width_border,
+        cv2.BORDER_CONSTANT,
+        value=[0, 0, 0],
+    )
+
+    def shift(point):
+        return None if point is None else (point[0] + width_border, point[1] + height_border)
+
+    for detector in detectors:
+        # the detector may find other faces in the image as it is, so faces found there are
+        # aligned by both modes from the same areas
+        detected_faces = detection.detect_faces(
+            detector_backend=detector, img=img, bordered_detection=False
+        )
+        assert len(detected_faces) > 0
+        for detected_face, expand_percentage in product(detected_faces, [0, 20]):
+            facial_area = detected_face.facial_area
+            patch_obj = detection.expand_and_align_face(
+                facial_area=facial_area,
+                img=img,
+                align=True,
+                expand_percentage=expand_percentage,
+                width_border=width_border,
+                height_border=height_border,
+                align_mode="patch",
+            )
+            image_obj = detection.expand_and_align_face(
+                facial_area=FacialAreaRegion(
+                    x=facial_area.x + width_border,
+                    y=facial_area.y + height_border,
+                    w=facial_area.w,
+                    h=facial_area.h,
+                    left_eye=shift(facial_area.left_eye),
+                    right_eye=shift(facial_area.right_eye),
+                    confidence=facial_area.confidence,
+                ),
+                img=bordered_img,
+                align=True,
+                expand_percentage=expand_percentage,
+                width_border=width_border,
+                height_border=height_border,
+                align_mode="image",
+            )
+            if expand_percentage == 0:
+                assert patch_obj.facial_area == facial_area
+            assert patch_obj.facial_area == image_obj.facial_area
+            assert patch_obj.img.shape == image_obj.img.shape
+            diff = np.abs(patch_obj.img.astype(int) - image_obj.img.astype(int))
+            assert diff.max(initial=0) <= 4
+            assert np.count_nonzero(diff) <= 0.01 * diff.size
+
+    logger.info("✅ unbordered detection test done")
+
+
+def test_detection_on_downscaled_image():
+    img = cv2.imread("dataset/img11.jpg")
+    height, width, _ = img.shape
+    large_img = cv2.resize(img, (width * 2, height * 2))
+
+    expected_objs = DeepFace.extract_faces(img_path=img, detector_backend="opencv")
+    img_objs = DeepFace.extract_faces(
+        img_path=large_img, detector_backend="opencv", detection_max_side=max(height, width)
+    )
+
+    for expected_obj in expected_objs:
+        expected_area = expected_obj["facial_area"]
+        # resampling may let the detector find a few more candidates, match the same face
+        img_obj = min(
+            img_objs,
+            key=lambda obj, area=expected_area: abs(obj["facial_area"]["x"] - 2 * area["x"])
+            + abs(obj["facial_area"]["y"] - 2 * area["y"]),
+        )
+        facial_area = img_obj["facial_area"]
+        tolerance = 0.05 * 2 * expected_area["w"]
+
+        # facial areas and eyes are mapped back to the large image
+        for key in ["x", "y", "w", "h"]:
+            assert abs(facial_area[key] - 2 * expected_area[key]) <= tolerance
+        for key in ["left_eye", "right_eye"]:
+            if expected_area[key] is not None:
+                assert abs(facial_area[key][0] - 2 * expected_area[key][0]) <= tolerance
+                assert abs(facial_area[key][1] - 2 * expected_area[key][1]) <= tolerance
+        # faces are cropped from full resolution pixels
+        assert img_obj["face"].shape[0] > 1.9 * expected_obj["face"].shape[0]
+
+    logger.info("✅ detection on downscaled image test done")
+
+
+def test_batch_extraction_matches_single_extraction():
+    img_paths = ["dataset/img1.jpg", "dataset/img11.jpg", "dataset/couple.jpg"]
+    for detector_backend in ["opencv", "ssd"]:
+        batch_objs = detection.extract_faces_batch(
+            img_paths=img_paths, detector_backend=detector_backend
+        )
+        assert len(batch_objs) == len(img_paths)
+        for img_path, img_objs in zip(img_paths, batch_objs):
+            expected_objs = detection.extract_faces(
+                img_path=img_path, detector_backend=detector_backend
+            )
+            assert len(img_objs) == len(expected_objs)
+            for img_obj, expected_obj in zip(img_objs, expected_objs):
+                assert img_obj["facial_area"] == expected_obj["facial_area"]
+                assert np.allclose(img_obj["face"], expected_obj["face"])
+
+    logger.info("✅ batch extraction test done")
+
+
+def test_anti_spoofing_checks_all_faces_of_image():
+    pytest.importorskip("torch")
+    img_path = "dataset/couple.jpg"
+    img_objs = DeepFace.extract_faces(img_path=img_path, anti_spoofing=True)
+    assert len(img_objs) > 1
+
+    # faces are checked in a single batch, each one must get the result of its own check
+    img = cv2.imread(img_path)
+    antispoof_model = modeling.build_model(task="spoofing", model_name="Fasnet")
+    for img_obj in img_objs:
+        facial_area = tuple(img_obj["facial_area"][key] for key in ["x", "y", "w", "h"])
+        is_real, antispoof_score = antispoof_model.analyze(img=img, facial_area=facial_area)
+        assert img_obj["is_real"] == is_real
+        assert abs(img_obj["antispoof_score"] - antispoof_score) < 1e-5
+
+    logger.info("✅ anti spoofing batch test done")
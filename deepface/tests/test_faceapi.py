@@ -0,0 +1,196 @@
+# built-in dependencies
+import os
+import signal
+import sys
+
+# 3rd party dependencies
+import cv2
+import numpy as np
+import pytest
+
+# project dependencies
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+torch = pytest.importorskip("torch")
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FACEAPI = os.path.join(REPO, "faceapi")
+WEIGHTS = os.path.join(FACEAPI, "weights")
+sys.path.insert(0, FACEAPI)
+
+# pylint: disable=wrong-import-position
+from app.modules.antispoof.library.face_antspoofing.detector import SpoofingDetector
+from app.modules.antispoof.library.face_detector.detector import RetinaFace
+from app.modules.antispoof.library.models.retina_face import decode, decode_landm, py_cpu_nms
+from app.modules.antispoof.library.task_manager import ModelPool, Worker, stop_worker
+from app.modules.antispoof.library.utils.util import scale_box
+from app.modules.antispoof.library.utils.vector import euclidean_distance
+
+# fixed boxes of both faces of dataset/couple.jpg and of a background patch
+COUPLE_BOXES = [[1437, 339, 2112, 1014], [318, 534, 1097, 1313], [40, 40, 240, 240]]
+
+
+def reference_spoofing(detector: SpoofingDetector, boxes, image):
+    # per box path followed before the backbones were fused, scores accumulated in float64
+    height, width = image.shape[:2]
+    predict = torch.zeros(len(boxes), 3, dtype=torch.float64)
+    with torch.no_grad():
+        for model, scale in zip(detector.model.models, detector.model.max_scale):
+            faces = torch.zeros(len(boxes), 3, *detector.face_size, dtype=torch.float32)
+            for idx, box in enumerate(boxes):
+                box = scale_box(width, height, box, scale)
+                face = cv2.cvtColor(image[box[1] : box[3], box[0] : box[2]], cv2.COLOR_RGB2BGR)
+                face = cv2.resize(face, detector.face_size)
+                faces[idx] = torch.from_numpy(face.transpose((2, 0, 1))).float()
+            predict += torch.nn.functional.softmax(model(faces), dim=1)
+    predict = predict.numpy()
+    labels = predict.argmax(axis=1)
+    return [(label == 1, predict[idx][label] / 2.0) for idx, label in enumerate(labels)]
+
+
+@pytest.mark.parametrize(
+    "traced, quantized, tolerance", [(False, False, 1e-5), (True, False, 1e-5), (False, True, 0.05)]
+)
+def test_spoofing_predict_matches_reference(traced, quantized, tolerance):
+    image = cv2.cvtColor(cv2.imread("dataset/couple.jpg"), cv2.COLOR_BGR2RGB)
+    detector = SpoofingDetector(
+        os.path.join(WEIGHTS, "fasnet_v1se_v2.pth.tar"), traced=traced, quantized=quantized
+    )
+
+    expected = reference_spoofing(detector, COUPLE_BOXES, image)
+    actual = detector.predict(COUPLE_BOXES, image)
+
+    assert len(actual) == len(expected)
+    for (expected_real, expected_score), (actual_real, actual_score) in zip(expected, actual):
+        assert bool(actual_real) == bool(expected_real)
+        assert abs(float(actual_score) - float(expected_score)) <= tolerance
+
+    logger.info(f"✅ spoofing parity test for traced={traced}, quantized={quantized} done")
+
+
+def reference_retinaface_decode(retina_face: RetinaFace, locations, confident, landms, threshold):
+    # post-processing followed before it was vectorized: every prior is decoded, top-k is a
+    # full sort, nms runs on stacked detections and filters loop over faces
+    variance = retina_face.model.cfg["variance"]
+    boxes = decode(locations.data.squeeze(0), retina_face.prior_data, variance)
+    boxes = (boxes * retina_face.box_scale).numpy()
+    scores = confident.squeeze(0).data[:, 1].numpy()
+    landms = decode_landm(landms.data.squeeze(0), retina_face.prior_data, variance)
+    landms = (landms * retina_face.landmark_scale).numpy()
+
+    inds = scores > threshold
+    boxes, landms, scores = boxes[inds], landms[inds], scores[inds]
+    order = scores.argsort()[::-1][:500]
+    boxes, landms, scores = boxes[order], landms[order], scores[order]
+
+    dets = np.hstack((boxes, scores[:, np.newaxis])).astype(np.float32, copy=False)
+    keep = py_cpu_nms(dets, 0.3)
+    faces = np.concatenate((dets[keep, :][:500], landms[keep][:500]), axis=1)
+
+    faces = faces[[np.any((face[:4] >= 0) & (face[:4] < 5000)) for face in faces]]
+    faces_size = np.array([euclidean_distance(face[:2], face[2:4]) for face in faces])
+    faces = faces[faces_size > 24]
+    return faces[np.argsort(faces_size[faces_size > 24])[::-1]]
+
+
+def test_retinaface_decode_matches_reference():
+    height, width, threshold = 360, 640, 0.95
+    retina_face = RetinaFace(os.path.join(WEIGHTS, "retina_face.pth.tar"))
+    retina_face.update_prior((height, width))
+    priors = retina_face.prior_data.numpy()
+
+    # priors around a few faces get high scores and jittered offsets, so each face leaves a
+    # cluster of overlapping candidates like the network does
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(0, 0.5, len(priors)).astype(np.float32)
+    for center, size in zip(rng.uniform(0.1, 0.9, (12, 2)), rng.uniform(0.05, 0.2, 12)):
+        near = np.all(np.abs(priors[:, :2] - center) < size / 2, axis=1)
+        near &= np.abs(priors[:, 2] - size) < size
+        scores[near] = rng.uniform(0.9, 1.0, np.count_nonzero(near))
+    locations = torch.from_numpy(rng.normal(0, 0.3, (1, len(priors), 4)).astype(np.float32))
+    confident = torch.from_numpy(np.stack([1 - scores, scores], axis=1)[np.newaxis])
+    landms = torch.from_numpy(rng.normal(0, 0.3, (1, len(priors), 10)).astype(np.float32))
+
+    expected = reference_retinaface_decode(retina_face, locations, confident, landms, threshold)
+    actual = retina_face.decode(locations, confident, landms, threshold)
+
+    assert len(expected) > 0
+    assert actual.shape == expected.shape
+    assert np.allclose(actual, expected)
+
+    logger.info("✅ retinaface decode test done")
+
+
+class DoublingWorker(Worker):
+    # doubles numbers in batches and fails on negative ones like a model on a bad input
+    def __init__(self):
+        super().__init__(max_batch_size=8, max_wait_ms=50.0)
+        self.batch_sizes = []
+
+    def processor(self):
+        def double(value):
+            if value < 0:
+                raise ValueError(f"{value} is negative")
+            return 2 * value
+
+        return double
+
+    def process_batch(self, processor, requests):
+        self.batch_sizes.append(len(requests))
+        return [processor(*args, **kwargs) for args, kwargs in requests]
+
+
+def test_worker_batching_isolates_failing_requests():
+    worker = DoublingWorker()
+    # requests queued before the worker starts are processed as one batch
+    messages = [worker.request(value) for value in [1, 2, -3, 4]]
+    worker.start()
+
+    assert [msg.future.result(timeout=5) for msg in messages[:2]] == [2, 4]
+    with pytest.raises(ValueError, match="-3 is negative"):
+        messages[2].future.result(timeout=5)
+    assert messages[3].future.result(timeout=5) == 8
+    assert worker.batch_sizes == [4]
+
+    # a request failing alone gets its error without being processed again
+    with pytest.raises(ValueError, match="-1 is negative"):
+        worker.request(-1).future.result(timeout=5)
+    assert worker.batch_sizes == [4, 1]
+
+    stop_worker(worker)
+    assert not worker.is_alive()
+    assert worker.task_count == 5
+
+    logger.info("✅ worker batching test done")
+
+
+def test_model_pool_fails_requests_of_killed_process():
+    image = cv2.cvtColor(cv2.imread("dataset/couple.jpg"), cv2.COLOR_BGR2RGB)
+    pool = ModelPool(
+        2,
+        detector_kwargs={"model_path": os.path.join(WEIGHTS, "retina_face.pth.tar")},
+        spoofing_kwargs={"model_path": os.path.join(WEIGHTS, "fasnet_v1se_v2.pth.tar")},
+        num_threads=1,
+    )
+    pool.start()
+
+    # requests go to the least loaded process, the first one is killed with a request given to
+    # it while it still loads its models
+    killed, served = pool.face_detector(image), pool.face_detector(image)
+    os.kill(pool.processes[0].pid, signal.SIGKILL)
+
+    with pytest.raises(RuntimeError, match="process exited"):
+        killed.future.result(timeout=60)
+    assert len(served.future.result(timeout=120)) > 0
+    assert pool.available == {1}
+
+    # the process left serves the next requests
+    assert len(pool.face_detector(image).future.result(timeout=60)) > 0
+    assert not pool.pending
+
+    stop_worker(pool)
+    assert not any(process.is_alive() for process in pool.processes)
+
+    logger.info("✅ model pool killed process test done")
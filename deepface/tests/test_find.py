@@ -3,11 +3,12 @@ import os
 
 # 3rd party dependencies
 import cv2
+import numpy as np
 import pandas as pd
 
 # project dependencies
 from deepface import DeepFace
-from deepface.modules import verification
+from deepface.modules import verification, recognition, datastore, representation, indexing
 from deepface.commons import image_utils
 from deepface.commons.logger import Logger
 
@@ -108,15 +109,15 @@ def test_find_without_refresh_database():
 
     img_path = os.path.join("dataset", "img1.jpg")
 
-    # 1. Calculate hash of the .pkl file;
+    # 1. Calculate hash of the datastore file;
     # 2. Move random image to the temporary created directory;
-    # 3. As a result, there will be a difference between the .pkl file and the disk files;
-    # 4. If refresh_database=False, then .pkl file should not be updated.
+    # 3. As a result, there will be a difference between the datastore and the disk files;
+    # 4. If refresh_database=False, then datastore should not be updated.
     #    Recalculate hash and compare it with the hash from pt. 1;
     # 5. After successful check, the image will be moved back to the original destination;
 
-    pkl_path = "dataset/ds_model_vggface_detector_opencv_aligned_normalization_base_expand_0.pkl"
-    with open(pkl_path, "rb") as f:
+    ds_path = "dataset/ds_model_vggface_detector_opencv_aligned_normalization_base_expand_0.npz"
+    with open(ds_path, "rb") as f:
         hash_before = hashlib.sha256(f.read())
 
     image_name = "img28.jpg"
@@ -126,7 +127,7 @@ def test_find_without_refresh_database():
 
     dfs = DeepFace.find(img_path=img_path, db_path="dataset", silent=True, refresh_database=False)
 
-    with open(pkl_path, "rb") as f:
+    with open(ds_path, "rb") as f:
         hash_after = hashlib.sha256(f.read())
 
     shutil.move(os.path.join(tmp_dir, image_name), os.path.join("dataset", image_name))
@@ -134,7 +135,7 @@ def test_find_without_refresh_database():
 
     assert hash_before.hexdigest() == hash_after.hexdigest()
 
-    logger.info("✅ .pkl hashes before and after the recognition process are the same")
+    logger.info("✅ datastore hashes before and after the recognition process are the same")
 
     assert len(dfs) > 0
     for df in dfs:
@@ -151,3 +152,184 @@ def test_find_without_refresh_database():
         logger.debug(df.head())
         assert df.shape[0] > 0
     logger.info("✅ test find without refresh database done")
+
+
+def test_vectorized_search_matches_pairwise_distances():
+    rng = np.random.default_rng(42)
+    representations = [
+        {"embedding": rng.normal(size=128).tolist()} for _ in range(50)
+    ]
+    representations[7]["embedding"] = None
+    target = rng.normal(size=128).tolist()
+
+    for representation in representations:
+        representation.update({"identity": "img.jpg", "hash": ""})
+        representation.update({key: 0 for key in datastore.FACIAL_AREA_KEYS})
+    store = datastore.from_representations(representations)
+    embeddings, valid_rows = store.embeddings, store.valid_rows
+    assert embeddings.dtype == np.float32
+    assert valid_rows.sum() == 49
+
+    for distance_metric in ["cosine", "euclidean", "euclidean_l2"]:
+        expected = [
+            (
+                float("inf")
+                if rep["embedding"] is None
+                else verification.find_distance(rep["embedding"], target, distance_metric)
+            )
+            for rep in representations
+        ]
+        max_distance = float(np.max([d for d in expected if d != float("inf")]))
+
+        # pylint: disable=protected-access
+        indices, distances = recognition.__search_embeddings(
+            embeddings=embeddings,
+            valid_rows=valid_rows,
+            target_representation=target,
+            distance_metric=distance_metric,
+            threshold=max_distance + 1,
+        )
+        assert 7 not in indices
+        assert list(indices) == [i for i in np.argsort(expected, kind="stable") if i != 7]
+        assert np.allclose(distances, np.array(expected)[indices], atol=1e-4)
+
+        indices, distances = recognition.__search_embeddings(
+            embeddings=embeddings,
+            valid_rows=valid_rows,
+            target_representation=target,
+            distance_metric=distance_metric,
+            threshold=max_distance + 1,
+            top_k=5,
+            norms=np.linalg.norm(embeddings, axis=1),
+        )
+        assert len(indices) == 5
+        assert list(distances) == sorted(distances)
+        assert list(indices) == list(np.argsort(expected, kind="stable")[:5])
+
+    logger.info("✅ vectorized search matches pairwise distances test done")
+
+
+def test_gallery_cache_reloads_only_when_datastore_changes(tmp_path):
+    datastore_path = os.path.join(tmp_path, "ds_model_vggface.npz")
+    representation = {
+        "identity": "img1.jpg",
+        "hash": "abc",
+        "embedding": [0.1, 0.2, 0.3],
+        "target_x": 0,
+        "target_y": 0,
+        "target_w": 10,
+        "target_h": 10,
+    }
+    datastore.save(datastore_path, datastore.from_representations([representation]))
+
+    # pylint: disable=protected-access
+    gallery = recognition.__load_gallery(datastore_path=datastore_path)
+    assert recognition.__load_gallery(datastore_path=datastore_path) is gallery
+
+    df, embeddings, _, norms = recognition.__get_gallery_arrays(gallery=gallery)
+    assert "embedding" not in df.columns
+    assert embeddings.shape == (1, 3)
+    assert np.allclose(norms, np.linalg.norm([0.1, 0.2, 0.3]))
+
+    # datastore is modified, cached gallery must be refreshed
+    datastore.save(
+        datastore_path,
+        datastore.from_representations([representation, {**representation, "identity": "img2.jpg"}]),
+    )
+    reloaded = recognition.__load_gallery(datastore_path=datastore_path)
+    assert reloaded is not gallery
+    assert len(reloaded["store"]) == 2
+
+    recognition.invalidate_gallery_cache(db_path=str(tmp_path))
+    assert recognition.__load_gallery(datastore_path=datastore_path) is not reloaded
+
+    logger.info("✅ gallery cache test done")
+
+
+def test_bulk_embeddings_are_same_for_any_worker_count(monkeypatch):
+    def represent_batch(img_paths, **kwargs):
+        # deterministic embedding of the face content instead of a model
+        return [[{"embedding": np.float32(img).mean(axis=(0, 1))}] for img in img_paths]
+
+    monkeypatch.setattr(representation, "represent_batch", represent_batch)
+    employees = sorted(image_utils.list_images(path="dataset"))[:8]
+
+    # pylint: disable=protected-access
+    results = [
+        recognition.__find_bulk_embeddings(
+            employees=employees,
+            detector_backend="skip",
+            silent=True,
+            batch_size=3,
+            workers=workers,
+        )
+        for workers in [1, 3]
+    ]
+
+    assert len(results[0]) == len(employees)
+    assert [rep["identity"] for rep in results[0]] == [rep["identity"] for rep in results[1]]
+    for rep, other in zip(results[0], results[1]):
+        assert rep["hash"] == other["hash"]
+        assert np.allclose(rep["embedding"], other["embedding"])
+
+    logger.info("✅ bulk embeddings with many workers test done")
+
+
+def test_gallery_index_is_updated_incrementally(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    representations = [
+        {
+            "identity": f"img{i}.jpg",
+            "hash": f"hash{i}",
+            "embedding": rng.normal(size=16).tolist(),
+            "target_x": 0,
+            "target_y": 0,
+            "target_w": 10,
+            "target_h": 10,
+        }
+        for i in range(20)
+    ]
+    datastore_path = os.path.join(tmp_path, "ds_model_vggface.npz")
+    store = datastore.from_representations(representations)
+    datastore.save(datastore_path, store)
+
+    # pylint: disable=protected-access
+    gallery = recognition.__load_gallery(datastore_path=datastore_path)
+    recognition.__get_gallery_index(
+        gallery=gallery,
+        datastore_path=datastore_path,
+        index_type="ivf",
+        distance_metric="cosine",
+    )
+
+    # remove last row and add a new one, its id must not be reused
+    store = datastore.append(store.select(np.arange(20) < 19), representations[:1])
+    assert list(store.ids[-2:]) == [18, 20]
+    datastore.save(datastore_path, store)
+
+    # index must be loaded and updated instead of being rebuilt
+    added = []
+    ivf_add = indexing.IVFIndex.add
+
+    def add(self, ids, embeddings):
+        added.extend(ids)
+        ivf_add(self, ids=ids, embeddings=embeddings)
+
+    monkeypatch.setattr(indexing.IVFIndex, "add", add)
+    gallery = recognition.__load_gallery(datastore_path=datastore_path)
+    index = recognition.__get_gallery_index(
+        gallery=gallery,
+        datastore_path=datastore_path,
+        index_type="ivf",
+        distance_metric="cosine",
+    )
+    assert added == [20]
+    assert list(index.ids()) == list(store.ids)
+
+    ids, _ = index.search(representations[0]["embedding"], k=2)
+    assert sorted(ids) == [0, 20]
+    assert list(recognition.__find_rows(gallery=gallery, ids=ids)) == [
+        list(store.ids).index(i) for i in ids
+    ]
+
+    logger.info("✅ incremental gallery index test done")
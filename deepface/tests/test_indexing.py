@@ -0,0 +1,117 @@
+# built-in dependencies
+import os
+
+# 3rd party dependencies
+import numpy as np
+import pytest
+
+# project dependencies
+from deepface.modules import indexing, verification
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+rng = np.random.default_rng(0)
+embeddings = rng.normal(size=(300, 64)).astype(np.float32)
+target = embeddings[42] + 0.01 * rng.normal(size=64).astype(np.float32)
+
+
+def test_flat_index_is_exact():
+    for distance_metric in indexing.AVAILABLE_METRICS:
+        index = indexing.build_index("flat", distance_metric=distance_metric)
+        index.add(ids=np.arange(100, 400), embeddings=embeddings)
+        assert len(index) == 300
+
+        ids, distances = index.search(target, k=5)
+        expected = [
+            verification.find_distance(embedding, target, distance_metric)
+            for embedding in embeddings
+        ]
+        assert list(ids) == list(np.argsort(expected)[:5] + 100)
+        assert np.allclose(distances, np.sort(expected)[:5], atol=1e-4)
+
+        ids, _ = index.search(target, threshold=float(np.sort(expected)[2]) + 1e-6)
+        assert len(ids) == 3
+
+    logger.info("✅ flat index test done")
+
+
+def test_index_add_remove_by_id():
+    index = indexing.build_index("flat")
+    index.add(ids=[1, 2, 3], embeddings=embeddings[:3])
+
+    # adding an existing id replaces its embedding
+    index.add(ids=[1], embeddings=embeddings[3:4])
+    assert len(index) == 3
+    assert index.search(embeddings[3], k=1)[0][0] == 1
+
+    assert index.remove([1, 99]) == 1
+    assert len(index) == 2
+    assert 1 not in index.search(embeddings[3])[0]
+
+    with pytest.raises(ValueError, match="same dimensions"):
+        index.search(np.zeros(32))
+
+    with pytest.raises(ValueError, match="Invalid index_type"):
+        indexing.build_index("annoy")
+
+    logger.info("✅ index add remove test done")
+
+
+def test_ivf_index_persistence(tmp_path):
+    index = indexing.build_index("ivf", n_lists=8, n_probe=8, min_train_size=100)
+    index.add(ids=np.arange(300), embeddings=embeddings)
+    assert index.is_trained
+
+    # scanning every cluster gives exact results
+    assert index.search(target, k=1)[0][0] == 42
+
+    index_path = indexing.find_index_path(
+        datastore_path=os.path.join(tmp_path, "ds_model_vggface.pkl"),
+        index_type="ivf",
+        distance_metric="cosine",
+    )
+    assert index_path.endswith("ds_model_vggface_index_ivf_cosine.npz")
+
+    index.source_signature = (1, 2)
+    index.save(index_path)
+    loaded = indexing.load_index(index_path)
+
+    assert isinstance(loaded, indexing.IVFIndex)
+    assert loaded.source_signature == (1, 2)
+    assert len(loaded) == 300
+    ids, distances = loaded.search(target, k=10)
+    expected_ids, expected_distances = index.search(target, k=10)
+    assert list(ids) == list(expected_ids)
+    assert np.allclose(distances, expected_distances)
+
+    # new embeddings are assigned to existing clusters
+    loaded.remove([42])
+    loaded.add(ids=[1000], embeddings=embeddings[42:43])
+    assert loaded.search(target, k=1)[0][0] == 1000
+
+    logger.info("✅ ivf index persistence test done")
+
+
+def test_index_search_without_k_returns_all_within_threshold():
+    pytest.importorskip("hnswlib")
+    for index_type in ["flat", "hnsw"]:
+        kwargs = {"default_k": 10} if index_type == "hnsw" else {}
+        index = indexing.build_index(index_type, **kwargs)
+        index.add(ids=np.arange(300), embeddings=embeddings)
+        ids, _ = index.search(target, threshold=2.0)
+        assert len(ids) == 300
+        assert ids[0] == 42
+
+    logger.info("✅ index search without k test done")
+
+
+def test_trained_ivf_index_accepts_empty_additions():
+    index = indexing.build_index("ivf", n_lists=4, min_train_size=100)
+    index.add(ids=np.arange(300), embeddings=embeddings)
+    index.add(ids=np.zeros(0, dtype=np.int64), embeddings=np.zeros((0, 64)))
+    assert len(index) == 300
+    assert index.search(target, k=1)[0][0] == 42
+    assert list(index.ids()) == list(range(300))
+
+    logger.info("✅ ivf empty addition test done")
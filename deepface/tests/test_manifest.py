@@ -0,0 +1,147 @@
+# built-in dependencies
+import os
+import shutil
+import time
+
+# 3rd party dependencies
+import numpy as np
+import pytest
+
+# project dependencies
+from deepface.modules import manifest, recognition, representation
+from deepface.commons import image_utils
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+def copy_images(tmp_path, count: int = 3):
+    for i in range(1, count + 1):
+        shutil.copy(os.path.join("dataset", f"img{i}.jpg"), os.path.join(tmp_path, f"img{i}.jpg"))
+    return str(tmp_path)
+
+
+def count_calls(monkeypatch, module, name):
+    calls = []
+    function = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, wrapper)
+    return calls
+
+
+def test_listing_matches_list_images(tmp_path):
+    manifest_path = os.path.join(tmp_path, "ds_manifest.npz")
+    listing = manifest.list_images(db_path="dataset", manifest_path=manifest_path)
+
+    assert sorted(listing.images) == sorted(image_utils.list_images(path="dataset"))
+    # img47 is webp even though its extension is jpg
+    assert "dataset/img47.jpg" not in listing.images
+    assert listing.changed == set(listing.images)
+
+    manifest.commit(manifest_path, listing)
+    assert manifest.load(manifest_path) == listing.entries
+
+    logger.info("✅ manifest listing test done")
+
+
+def test_only_changed_files_are_opened(tmp_path, monkeypatch):
+    db_path = copy_images(tmp_path)
+    manifest_path = os.path.join(tmp_path, "ds_manifest.npz")
+    manifest.commit(manifest_path, manifest.list_images(db_path, manifest_path))
+
+    opened = count_calls(monkeypatch, image_utils, "is_image")
+    listing = manifest.list_images(db_path, manifest_path)
+    assert len(opened) == 0
+    assert len(listing.images) == 3
+    assert listing.changed == set()
+
+    replaced = os.path.join(db_path, "img2.jpg")
+    shutil.copy(os.path.join("dataset", "img4.jpg"), replaced)
+    os.remove(os.path.join(db_path, "img3.jpg"))
+    listing = manifest.list_images(db_path, manifest_path)
+    assert opened == [(replaced,)]
+    assert listing.changed == {replaced}
+    assert listing.removed is True
+    assert len(listing.images) == 2
+
+    logger.info("✅ manifest change detection test done")
+
+
+def test_find_does_not_hash_unchanged_images(tmp_path, monkeypatch):
+    def represent_batch(img_paths, **kwargs):
+        return [[{"embedding": np.float32(img).mean(axis=(0, 1))}] for img in img_paths]
+
+    def find_target_embeddings(img_path, **kwargs):
+        img, _ = image_utils.load_image(img_path)
+        return [
+            {
+                "embedding": np.float32(img / 255).mean(axis=(0, 1)),
+                "facial_area": {"x": 0, "y": 0, "w": 0, "h": 0},
+            }
+        ]
+
+    monkeypatch.setattr(representation, "represent_batch", represent_batch)
+    monkeypatch.setattr(recognition, "__find_target_embeddings", find_target_embeddings)
+    hashed = count_calls(monkeypatch, image_utils, "find_image_hash")
+
+    db_path = copy_images(tmp_path)
+    img_path = os.path.join("dataset", "img1.jpg")
+    kwargs = {"detector_backend": "skip", "silent": True, "threshold": 1}
+
+    dfs = recognition.find(img_path, db_path, **kwargs)
+    assert len(dfs[0]) == 3
+    assert len(hashed) == 3
+
+    # nothing changed, no image is opened or hashed again
+    hashed.clear()
+    recognition.find(img_path, db_path, **kwargs)
+    assert len(hashed) == 0
+
+    # only the replaced image is hashed to compare it with the datastore, then represented
+    replaced = os.path.join(db_path, "img2.jpg")
+    shutil.copy(os.path.join("dataset", "img4.jpg"), replaced)
+    dfs = recognition.find(img_path, db_path, **kwargs)
+    assert hashed == [(replaced,), (replaced,)]
+    assert len(dfs[0]) == 3
+
+    logger.info("✅ find with manifest test done")
+
+
+def test_watched_directory_is_not_scanned_until_it_changes(tmp_path, monkeypatch):
+    pytest.importorskip("inotify_simple")
+
+    db_path = copy_images(tmp_path)
+    manifest_path = os.path.join(tmp_path, "ds_manifest.npz")
+    watcher = manifest.watch(db_path)
+    try:
+        listing = manifest.list_images(db_path, manifest_path)
+        manifest.commit(manifest_path, listing)
+
+        scanned = count_calls(monkeypatch, manifest, "scan")
+        assert manifest.list_images(db_path, manifest_path).images == listing.images
+        assert len(scanned) == 0
+
+        # writing the datastore next to images is not a change of the directory
+        np.save(os.path.join(db_path, "ds_model.npy"), np.zeros(1))
+
+        generation = watcher.generation
+        os.mkdir(os.path.join(db_path, "new"))
+        added = os.path.join(db_path, "new", "img4.jpg")
+        shutil.copy(os.path.join("dataset", "img4.jpg"), added)
+        for _ in range(50):
+            if watcher.generation > generation:
+                break
+            time.sleep(0.1)
+
+        listing = manifest.list_images(db_path, manifest_path)
+        assert len(scanned) == 1
+        assert listing.changed == {added}
+    finally:
+        manifest.unwatch(db_path)
+
+    assert not watcher.is_alive()
+    logger.info("✅ watched manifest test done")
@@ -0,0 +1,136 @@
+# built-in dependencies
+import subprocess
+import sys
+import threading
+import time
+
+# 3rd party dependencies
+import numpy as np
+import pytest
+
+# project dependencies
+from deepface.modules import modeling
+from deepface.commons.logger import Logger
+
+logger = Logger()
+
+
+class FakeDetector:
+    built = 0
+
+    def __init__(self):
+        FakeDetector.built += 1
+        # building a real model takes a while, let other threads catch up
+        time.sleep(0.2)
+        self.weights = np.zeros(1024, dtype=np.float32)
+        self.inputs = []
+
+    def detect_faces(self, img):
+        self.inputs.append(img.shape)
+        return []
+
+
+def fake_models(monkeypatch):
+    FakeDetector.built = 0
+    monkeypatch.setattr(
+        modeling,
+        "available_models",
+        {"face_detector": {name: type(name, (FakeDetector,), {}) for name in "abc"}},
+    )
+
+
+def test_model_is_built_once_by_concurrent_threads(monkeypatch):
+    fake_models(monkeypatch)
+    registry = modeling.ModelRegistry()
+    models = []
+
+    def build():
+        models.append(registry.get("face_detector", "a"))
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert FakeDetector.built == 1
+    assert all(model is models[0] for model in models)
+
+    with pytest.raises(ValueError, match="Invalid model_name"):
+        registry.get("face_detector", "d")
+    with pytest.raises(ValueError, match="unimplemented task"):
+        registry.get("facial_recognition", "a")
+
+    logger.info("✅ model registry concurrency test done")
+
+
+def test_least_recently_used_models_are_evicted(monkeypatch):
+    fake_models(monkeypatch)
+    # room for weights of 2 models
+    registry = modeling.ModelRegistry(max_bytes=2 * 4096, min_idle_seconds=0)
+    a = registry.get("face_detector", "a")
+    registry.get("face_detector", "b")
+    assert registry.get("face_detector", "a") is a
+    registry.get("face_detector", "c")
+
+    stats = registry.stats()
+    assert list(stats["models"].keys()) == ["face_detector/a", "face_detector/c"]
+    assert stats["weight_bytes"] == 2 * 4096
+    assert stats["evictions"] == 1
+    assert stats["models"]["face_detector/a"]["weight_bytes"] == 4096
+    assert stats["models"]["face_detector/a"]["load_time"] >= 0.2
+
+    # evicted model is built again
+    registry.get("face_detector", "b")
+    assert FakeDetector.built == 4
+
+    registry.set_memory_budget(4096)
+    assert list(registry.stats()["models"].keys()) == ["face_detector/b"]
+
+    registry.release()
+    assert len(registry) == 0
+
+    logger.info("✅ model registry eviction test done")
+
+
+def test_recently_used_models_are_not_evicted(monkeypatch):
+    fake_models(monkeypatch)
+    registry = modeling.ModelRegistry(max_bytes=4096, min_idle_seconds=60)
+    a = registry.get("face_detector", "a")
+    registry.get("face_detector", "b")
+
+    # a may still be running in another thread, dropping it would build a second copy
+    assert list(registry.stats()["models"].keys()) == ["face_detector/a", "face_detector/b"]
+    assert registry.stats()["evictions"] == 0
+    assert registry.get("face_detector", "a") is a
+
+    # once models are idle long enough, the budget is enforced again
+    registry.set_memory_budget(4096, min_idle_seconds=0)
+    assert list(registry.stats()["models"].keys()) == ["face_detector/a"]
+
+    logger.info("✅ model registry idle eviction test done")
+
+
+def test_warmup_runs_dummy_forward_pass(monkeypatch):
+    fake_models(monkeypatch)
+    registry = modeling.ModelRegistry()
+    model = registry.warmup("face_detector", "a")
+
+    assert model.inputs == [(224, 224, 3)]
+    assert registry.stats()["models"]["face_detector/a"]["warmup_time"] is not None
+
+    logger.info("✅ model registry warmup test done")
+
+
+def test_clients_and_tensorflow_are_imported_on_first_use():
+    code = (
+        "import sys\n"
+        "from deepface import DeepFace\n"
+        "assert 'tensorflow' not in sys.modules\n"
+        "assert 'deepface.models.facial_recognition.Facenet' not in sys.modules\n"
+        "DeepFace.build_model(task='face_detector', model_name='opencv')\n"
+        "assert 'tensorflow' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+    logger.info("✅ lazy import test done")
@@ -1,8 +1,10 @@
 # built-in dependencies
 import cv2
+import numpy as np
 
 # project dependencies
 from deepface import DeepFace
+from deepface.modules import preprocessing
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -60,3 +62,79 @@ def test_max_faces():
     max_faces = 1
     results = DeepFace.represent(img_path="dataset/couple.jpg", max_faces=max_faces)
     assert len(results) == max_faces
+
+
+def test_represent_batch_matches_represent():
+    img_paths = ["dataset/img1.jpg", "dataset/couple.jpg", "dataset/img5.jpg"]
+    batch_objs = DeepFace.represent_batch(img_paths=img_paths, batch_size=2)
+    assert len(batch_objs) == len(img_paths)
+
+    for img_path, img_objs in zip(img_paths, batch_objs):
+        expected_objs = DeepFace.represent(img_path=img_path)
+        assert len(img_objs) == len(expected_objs)
+        for img_obj, expected_obj in zip(img_objs, expected_objs):
+            assert img_obj["embedding"].dtype == np.float32
+            assert img_obj["facial_area"] == expected_obj["facial_area"]
+            assert np.allclose(img_obj["embedding"], expected_obj["embedding"], atol=1e-5)
+
+    logger.info("✅ test represent batch function done")
+
+
+def test_compiled_represent_matches_eager_represent():
+    img_path = "dataset/couple.jpg"
+    eager_objs = DeepFace.represent(img_path=img_path, model_name="Facenet")
+    compiled_objs = DeepFace.represent(img_path=img_path, model_name="Facenet", compiled=True)
+    batch_objs = DeepFace.represent_batch(
+        img_paths=[img_path, "dataset/img1.jpg"], model_name="Facenet", compiled=True
+    )
+
+    assert len(compiled_objs) == len(eager_objs)
+    for compiled_obj, batch_obj, eager_obj in zip(compiled_objs, batch_objs[0], eager_objs):
+        assert np.allclose(compiled_obj["embedding"], eager_obj["embedding"], atol=1e-5)
+        assert np.allclose(batch_obj["embedding"], eager_obj["embedding"], atol=1e-5)
+
+    # compiling is opt-in per call, later calls without it keep running eagerly
+    model = DeepFace.build_model(model_name="Facenet")
+    compiled_graph = model._compiled
+    assert compiled_graph is not None
+
+    def fail(_):
+        raise AssertionError("eager call ran the compiled graph")
+
+    model._compiled = fail
+    try:
+        eager_again_objs = DeepFace.represent(img_path=img_path, model_name="Facenet")
+    finally:
+        model._compiled = compiled_graph
+    for eager_again_obj, eager_obj in zip(eager_again_objs, eager_objs):
+        assert eager_again_obj["embedding"] == eager_obj["embedding"]
+
+    # models without a keras graph are served as they are
+    model = DeepFace.build_model(model_name="SFace")
+    assert model.compile_inference() is False
+
+    logger.info("✅ test compiled represent done")
+
+
+def test_prepare_face_matches_resize_and_normalize():
+    img = cv2.imread("dataset/img1.jpg")[100:300, 50:220]
+    normalizations = ["base", "raw", "Facenet", "Facenet2018", "VGGFace", "VGGFace2", "ArcFace"]
+    for normalization in normalizations:
+        expected = preprocessing.resize_image(img=img / 255, target_size=(160, 160))
+        expected = preprocessing.normalize_input(img=expected, normalization=normalization)
+
+        # uint8 crops and [0, 1] scaled faces are preprocessed in the same way
+        out = np.empty((160, 160, 3), dtype=np.float32)
+        prepared = preprocessing.prepare_face(
+            img=img, target_size=(160, 160), normalization=normalization, out=out
+        )
+        assert prepared is out
+        assert np.allclose(prepared, expected[0], atol=1e-3)
+
+        prepared = preprocessing.prepare_face(
+            img=img / 255, target_size=(160, 160), normalization=normalization
+        )
+        assert prepared.dtype == np.float32
+        assert np.allclose(prepared, expected[0], atol=1e-3)
+
+    logger.info("✅ test prepare face done")
@@ -1,9 +1,14 @@
+# built-in dependencies
+from types import SimpleNamespace
+
 # 3rd party dependencies
 import pytest
 import cv2
+import numpy as np
 
 # project dependencies
 from deepface import DeepFace
+from deepface.modules import verification, modeling, representation
 from deepface.commons.logger import Logger
 
 logger = Logger()
@@ -188,3 +193,137 @@ def test_verify_for_nested_embeddings():
         _ = DeepFace.verify(img1_path=img1_embeddings, img2_path=img2_path)
 
     logger.info("✅ test verify for nested embeddings is done")
+
+
+def test_verify_many_matches_verify():
+    probes = ["dataset/img1.jpg", "dataset/img2.jpg"]
+    candidates = ["dataset/img1.jpg", "dataset/img3.jpg", "dataset/couple.jpg"]
+
+    result = DeepFace.verify_many(probes=probes, candidates=candidates, silent=True)
+    assert result["distances"].shape == (2, 3)
+    assert result["verified"][0, 0]
+    assert len(result["facial_areas"]["candidates"][2]) > 1
+
+    for i, probe in enumerate(probes):
+        for j, candidate in enumerate(candidates):
+            expected = DeepFace.verify(img1_path=probe, img2_path=candidate, silent=True)
+            assert abs(result["distances"][i, j] - expected["distance"]) < 1e-4
+            assert result["verified"][i, j] == expected["verified"]
+            probe_face = result["closest_faces"]["probes"][i, j]
+            candidate_face = result["closest_faces"]["candidates"][i, j]
+            assert (
+                result["facial_areas"]["probes"][i][probe_face] == expected["facial_areas"]["img1"]
+            )
+            assert (
+                result["facial_areas"]["candidates"][j][candidate_face]
+                == expected["facial_areas"]["img2"]
+            )
+
+    logger.info("✅ test verify many done")
+
+
+def test_verify_many_represents_each_unique_image_once(monkeypatch):
+    represented = []
+
+    def represent_batch(img_paths, **kwargs):
+        represented.extend(img_paths)
+        # deterministic embedding of the face content instead of a model
+        return [[{"embedding": np.float32(img).mean(axis=(0, 1))}] for img in img_paths]
+
+    monkeypatch.setattr(modeling, "build_model", lambda **kwargs: SimpleNamespace(output_shape=3))
+    monkeypatch.setattr(representation, "represent_batch", represent_batch)
+
+    img = cv2.imread("dataset/img3.jpg")
+    probes = ["dataset/img1.jpg", img, [0.5, 0.2, 0.1]]
+    candidates = ["dataset/img2.jpg", "dataset/img1.jpg", img]
+
+    result = DeepFace.verify_many(
+        probes=probes, candidates=candidates, detector_backend="skip", silent=True, threshold=0.01
+    )
+    assert len(represented) == 3
+
+    img1, img3, img2 = [np.float32(face).mean(axis=(0, 1)) for face in represented]
+    probe_embeddings = [img1, img3, probes[2]]
+    candidate_embeddings = [img2, img1, img3]
+    for i, probe_embedding in enumerate(probe_embeddings):
+        for j, candidate_embedding in enumerate(candidate_embeddings):
+            expected = verification.find_distance(probe_embedding, candidate_embedding, "cosine")
+            assert abs(result["distances"][i, j] - expected) < 1e-6
+
+    assert np.array_equal(result["verified"], result["distances"] <= 0.01)
+    assert result["verified"][0, 1] and result["verified"][1, 2]
+    assert result["facial_areas"]["probes"][2][0]["x"] is None
+
+    logger.info("✅ test verify many represents unique images once done")
+
+
+def test_distance_matrix_matches_find_distance():
+    rng = np.random.default_rng(0)
+    alpha = rng.normal(size=(4, 16))
+    beta = rng.normal(size=(5, 16))
+    beta[2] = 0
+
+    for distance_metric in metrics:
+        distances = verification.find_distances(alpha, beta, distance_metric=distance_metric)
+        assert distances.shape == (4, 5)
+        for i in range(4):
+            for j in range(5):
+                if distance_metric == "cosine" and j == 2:
+                    continue
+                expected = verification.find_distance(alpha[i], beta[j], distance_metric)
+                assert abs(distances[i, j] - expected) < 1e-9
+
+    logger.info("✅ test distance matrix done")
+
+
+def test_distance_kernels_reuse_norms_and_buffers():
+    rng = np.random.default_rng(0)
+    alpha = rng.normal(size=(3, 16)).astype(np.float32)
+    beta = rng.normal(size=(6, 16)).astype(np.float32)
+    beta_norms = np.linalg.norm(beta, axis=1)
+    out = np.empty((3, 6), dtype=np.float32)
+
+    for distance_metric in metrics:
+        expected = verification.find_distances(
+            alpha.astype(np.float64), beta.astype(np.float64), distance_metric
+        )
+        distances = verification.find_distances(
+            alpha, beta, distance_metric, beta_norms=beta_norms, out=out
+        )
+        # float32 embeddings are not converted into float64
+        assert distances is out
+        assert np.allclose(distances, expected, atol=1e-5)
+
+    # a single vector is a set of one vector
+    distances = verification.find_distances(alpha[0], beta, "cosine")
+    assert distances.shape == (1, 6)
+    assert verification.find_distance(alpha[0], beta[0], "cosine") == distances[0, 0]
+
+    with pytest.raises(ValueError, match="same dimensions"):
+        verification.find_distances(alpha, beta[:, :8], "cosine")
+
+    logger.info("✅ test distance kernels done")
+
+
+def test_closest_faces_of_image_pairs():
+    rng = np.random.default_rng(0)
+    probe_counts, candidate_counts = [1, 3, 2], [2, 1, 4, 1]
+    face_distances = rng.random(size=(sum(probe_counts), sum(candidate_counts)))
+
+    # pylint: disable=protected-access
+    distances, probe_faces, candidate_faces = verification.__find_closest_faces(
+        face_distances=face_distances,
+        probe_counts=probe_counts,
+        candidate_counts=candidate_counts,
+    )
+    probe_starts = np.cumsum([0] + probe_counts)
+    candidate_starts = np.cumsum([0] + candidate_counts)
+    for i in range(len(probe_counts)):
+        for j in range(len(candidate_counts)):
+            block = face_distances[
+                probe_starts[i] : probe_starts[i + 1], candidate_starts[j] : candidate_starts[j + 1]
+            ]
+            assert distances[i, j] == block.min()
+            assert block[probe_faces[i, j], candidate_faces[i, j]] == block.min()
+
+    logger.info("✅ test closest faces done")
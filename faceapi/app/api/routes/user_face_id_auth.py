@@ -90,7 +90,7 @@ async def websocket_endpoint(websocket: WebSocket):
             elif current_step.value == manager.steps[1].value:
                 img_base64_data = get_img_bytes_from_base64(data['image'])
                 img_data = get_img_ndarray_from_bytes(img_base64_data)
-                analysis1 = anti_spoof_check(img_data)
+                analysis1 = await anti_spoof_check(img_data)
                 if not analysis1["status"]:
                     cxt = {
                         "status": "error",
@@ -54,6 +54,19 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str = ""
     DB_NAME: str = ""
+    # processes serving the anti-spoofing models, 0 serves them from threads of the API process.
+    # Frames reach the processes through /dev/shm: its size (docker shm_size, 64 MB by default)
+    # must hold MODEL_WORKER_MAX_IN_FLIGHT frames, about 6 MB each at 1080p, or the API process
+    # is killed by SIGBUS
+    MODEL_WORKERS: int = 0
+    # torch threads of each model-serving process, cpu count / MODEL_WORKERS when unset
+    MODEL_WORKER_THREADS: Optional[int] = None
+    # requests in flight over all model-serving processes, later ones are refused
+    MODEL_WORKER_MAX_IN_FLIGHT: int = 32
+    # trace both spoofing backbones into TorchScript, which runs them concurrently
+    SPOOFING_TRACED: bool = False
+    # quantize linear layers of the spoofing backbones into int8, cpu only
+    SPOOFING_QUANTIZED: bool = False
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -1,4 +1,3 @@
-import signal
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -7,9 +6,7 @@ from fastapi.routing import APIRoute
 
 from app.api.main import api_router
 from app.core.config import settings
-from app.modules.antispoof.library.task_manager import stop_worker
-from app.modules.ml_weights import (load_models)
-from app.modules.ml_weights import face_detector, spoofing_detector
+from app.modules.ml_weights import load_models, unload_models
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -19,11 +16,8 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 @asynccontextmanager
 async def lifespan(_):
     await load_models()
-    face_detector.start()
-    spoofing_detector.start()
     yield
-    signal.signal(signal.SIGINT, lambda sig, frame: stop_worker(
-        face_detector, spoofing_detector))
+    unload_models()
 
 
 app_args = dict()
@@ -9,13 +9,31 @@ import torch
 from torch.nn.functional import softmax
 
 from ..models.mini_fasnet import MiniFASNetV1SE, MiniFASNetV2
-from ..utils.transform import Transform, resize
-from ..utils.util import remove_prefix, scale_box
+from ..utils.util import remove_prefix, scale_boxes
 
-__all__ = ['MulFasNet', 'SpoofingDetector']
+__all__ = ['FusedFasNet', 'MulFasNet', 'SpoofingDetector']
 _CPU_DEVICE = "cpu"
 
 
+class FusedFasNet(torch.nn.Module):
+    """
+    Both backbones of MulFasNet as a single module. The second backbone is forked, so it runs
+    concurrently with the first one once the module is traced into TorchScript.
+    Softmax scores of the backbones are summed in float32.
+    """
+
+    def __init__(self, first_model: torch.nn.Module, second_model: torch.nn.Module):
+        super().__init__()
+        self.first_model = first_model
+        self.second_model = second_model
+
+    def forward(self, first_images: torch.Tensor, second_images: torch.Tensor) -> torch.Tensor:
+        future = torch.jit.fork(self.second_model, second_images)
+        predict = softmax(self.first_model(first_images), dim=1)
+        predict = predict + softmax(torch.jit.wait(future), dim=1)
+        return predict
+
+
 class MulFasNet:
     """
     Ref: https://github.com/minivision-ai/Silent-Face-Anti-Spoofing
@@ -24,13 +42,19 @@ class MulFasNet:
     `MiniFASNetV1SE` and `MiniFASNetV2` have been compiled into single model.
     """
 
-    def __init__(self, model_path: str, device=_CPU_DEVICE, input_size=(80, 80)):
+    def __init__(self, model_path: str, device=_CPU_DEVICE, input_size=(80, 80),
+                 traced: bool = False, quantized: bool = False):
         """
         Parameters:
             model_path: pretrained model
             device: device model loaded in.
             input_size: model input size.
+            traced: trace both backbones into a single TorchScript module running them concurrently.
+            quantized: quantize linear layers into int8 dynamically. Only supported on cpu.
         """
+        if quantized and str(device) != _CPU_DEVICE:
+            raise ValueError(f"int8 quantization is only supported on cpu but device is {device}")
+
         model_load = torch.load(model_path, map_location=device)
         kernel_size = ((input_size[0] + 15) // 16, (input_size[1] + 15) // 16)
         self.models = [MiniFASNetV1SE(
@@ -43,9 +67,19 @@ class MulFasNet:
             model.to(device)
             model.eval()
 
+        if quantized:
+            self.models = [torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                           for model in self.models]
+
         self.max_scale = [4, 2.7]
         self.device = device
 
+        self.fused = FusedFasNet(*self.models).eval()
+        if traced:
+            example = torch.zeros(1, 3, *input_size, device=device)
+            with torch.no_grad():
+                self.fused = torch.jit.trace(self.fused, (example, example))
+
     def forward(self, faces_scale: Sequence[torch.Tensor]) -> Any:
         """
         Predict face spoof.
@@ -58,14 +92,8 @@ class MulFasNet:
         -------
             Score of predict [2D_SPOOF | REAL | 3D_SPOOF]
         """
-        predict = torch.zeros(faces_scale[0].size(
-            0), 3, dtype=torch.float64, device=self.device)
         with torch.no_grad():
-            for model, images in zip(self.models, faces_scale):
-                images = images.to(self.device)
-                result = model(images)
-                result = softmax(result, dim=1)
-                predict += result
+            predict = self.fused(*(images.to(self.device) for images in faces_scale))
 
         if self.device != _CPU_DEVICE:
             predict = predict.detach().cpu()
@@ -84,16 +112,36 @@ class SpoofingDetector:
         face_size: model face input size.
     """
 
-    def __init__(self, model_path: str, device: str = _CPU_DEVICE, face_size=(80, 80)):
-        self.model = MulFasNet(model_path, device=device, input_size=face_size)
+    def __init__(self, model_path: str, device: str = _CPU_DEVICE, face_size=(80, 80),
+                 traced: bool = False, quantized: bool = False):
+        self.model = MulFasNet(model_path, device=device, input_size=face_size,
+                               traced=traced, quantized=quantized)
         self.device = self.model.device
         self.face_size = face_size
 
-        self.transform = Transform([
-            lambda x: cv2.cvtColor(x, cv2.COLOR_RGB2BGR),
-            resize(*face_size),
-            lambda x: torch.from_numpy(x.transpose((2, 0, 1))).float()
-        ])
+    def preprocess(self, boxes: Sequence[Sequence[int]], image: np.ndarray) -> Sequence[torch.Tensor]:
+        """
+        Crop and resize faces at every scale of the model into a single buffer.
+
+        Parameters
+        ----------
+            boxes: Face's boxes
+            image: image source in RGB
+
+        Returns
+        -------
+            Faces of each scale as float tensors in shape (N, 3, height, width), BGR
+        """
+        height, width = image.shape[:2]
+        faces = np.empty((len(self.model.max_scale), len(boxes), self.face_size[1], self.face_size[0], 3),
+                         dtype=np.uint8)
+        for scale_idx, scale in enumerate(self.model.max_scale):
+            for idx, box in enumerate(scale_boxes(width, height, boxes, scale)):
+                faces[scale_idx, idx] = cv2.resize(image[box[1]:box[3], box[0]:box[2]], self.face_size)
+
+        # RGB to BGR and channels first for all faces at once
+        faces = torch.from_numpy(np.ascontiguousarray(faces[..., ::-1].transpose((0, 1, 4, 2, 3)))).float()
+        return list(faces)
 
     def predict(self, boxes: Sequence[Sequence[int]], image: np.ndarray) -> Sequence[Tuple[bool, float]]:
         """
@@ -109,20 +157,31 @@ class SpoofingDetector:
             Label and score of faces in images.
             [True|False] == [REAL|FAKE]
         """
-        faces_scale = list()
-        for scale in self.model.max_scale:
-            face_tensor = torch.zeros(
-                len(boxes), 3, *self.face_size, dtype=torch.float32)
-            for idx, box in enumerate(boxes):
-                height, width = image.shape[:2]
-                box_scaled = scale_box(width, height, box, scale)
-                face_img = image[box_scaled[1]:box_scaled[3],
-                                 box_scaled[0]:box_scaled[2]]
-                face_tensor[idx] = self.transform(face_img)
-            faces_scale.append(face_tensor)
-
-        predict = self.model(faces_scale)
+        return self.predict_batch([(boxes, image)])[0]
+
+    def predict_batch(self, requests: Sequence[Tuple[Sequence[Sequence[int]], np.ndarray]]) \
+            -> Sequence[Sequence[Tuple[bool, float]]]:
+        """
+        Predict faces of many images with a single forward of the model.
+
+        Parameters
+        ----------
+            requests: Face's boxes and image source of each image
+
+        Returns
+        -------
+            Label and score of faces of each image.
+        """
+        faces_scale = [self.preprocess(boxes, image) for boxes, image in requests if len(boxes) > 0]
+        if not faces_scale:
+            return [[] for _ in requests]
+
+        predict = self.model([torch.cat(faces) for faces in zip(*faces_scale)])
         labels = np.argmax(predict, axis=1)
-        return [(label == 1, predict[idx][label] / 2.) for idx, label in enumerate(labels)]
+        results = [(label == 1, predict[idx][label] / 2.) for idx, label in enumerate(labels)]
+
+        # split faces back into their images
+        offsets = np.cumsum([0] + [len(boxes) for boxes, _ in requests])
+        return [results[offsets[idx]:offsets[idx + 1]] for idx in range(len(requests))]
 
     __call__ = predict
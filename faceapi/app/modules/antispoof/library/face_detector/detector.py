@@ -1,16 +1,16 @@
 __author__ = "tindht@vietmoney.vn"
 __copyright__ = "Copyright 2021, VietMoney Face Anti-spoofing"
 
+from collections import OrderedDict
 from typing import List, Tuple
 
 import numpy as np
 import torch
 
 from ..models.retina_face import (PriorBox, RetinaNet, decode, decode_landm,
-                                  py_cpu_nms)
+                                  nms)
 from ..utils.image import resize
 from ..utils.transform import Transform
-from ..utils.vector import euclidean_distance
 
 __all__ = ['FaceDetector']
 _CPU_DEVICE = "cpu"
@@ -27,9 +27,12 @@ class RetinaFace(object):
 
     device: str
         (Default: cpu) CPU or GPU ('cuda[:gpu_id]')
+
+    prior_cache_size: int
+        (Default: 8) Number of input sizes whose priors and scales are kept.
     """
 
-    def __init__(self, model_path, device=_CPU_DEVICE):
+    def __init__(self, model_path, device=_CPU_DEVICE, prior_cache_size=8):
         self.model = RetinaNet()
         self.prior_box = PriorBox(self.model.cfg)
         self.device = device
@@ -39,6 +42,10 @@ class RetinaFace(object):
         self.landmark_scale = None
         self.box_scale = None
 
+        # image size -> (prior_data, landmark_scale, box_scale), least recently used first
+        self.prior_cache = OrderedDict()
+        self.prior_cache_size = prior_cache_size
+
         self.transform = Transform([
             lambda x: x.astype(np.float32) - (104, 117, 123),
             lambda x: torch.from_numpy(
@@ -52,21 +59,32 @@ class RetinaFace(object):
         self.model.eval()
 
     def update_prior(self, image_size: Tuple[int, ...]):
+        image_size = tuple(image_size)
         if self.image_size == image_size:
             return
 
-        priors = self.prior_box(image_size, self.device)
-        self.prior_data = priors.data
+        cached = self.prior_cache.get(image_size)
+        if cached is None:
+            priors = self.prior_box(image_size, self.device)
+            landmark_scale = torch.tensor(
+                [image_size[1], image_size[0], image_size[1], image_size[0],
+                 image_size[1], image_size[0], image_size[1], image_size[0],
+                 image_size[1], image_size[0]],
+                dtype=torch.float32
+            ).to(self.device)
+            box_scale = torch.tensor(
+                [image_size[1], image_size[0], image_size[1], image_size[0]], dtype=torch.float32)
+            box_scale = box_scale.to(self.device)
+            cached = (priors.data, landmark_scale, box_scale)
+
+            self.prior_cache[image_size] = cached
+            while len(self.prior_cache) > self.prior_cache_size:
+                self.prior_cache.popitem(last=False)
+        else:
+            self.prior_cache.move_to_end(image_size)
+
+        self.prior_data, self.landmark_scale, self.box_scale = cached
         self.image_size = image_size
-        self.landmark_scale = torch.tensor(
-            [image_size[1], image_size[0], image_size[1], image_size[0],
-             image_size[1], image_size[0], image_size[1], image_size[0],
-             image_size[1], image_size[0]],
-            dtype=torch.float32
-        ).to(self.device)
-        self.box_scale = torch.tensor(
-            [image_size[1], image_size[0], image_size[1], image_size[0]], dtype=torch.float32)
-        self.box_scale = self.box_scale.to(self.device)
 
     def decode(self, locations: torch.Tensor,
                confident: torch.Tensor,
@@ -91,21 +109,18 @@ class RetinaFace(object):
             - score.dtype: np.float32
             - landmark.dtype: np.float32
         """
-        boxes = decode(locations.data.squeeze(
-            0), self.prior_data, self.model.cfg['variance'])
-        boxes = boxes * self.box_scale
         scores = confident.squeeze(0).data[:, 1]
 
-        landms = decode_landm(landms.data.squeeze(
-            0), self.prior_data, self.model.cfg['variance'])
-        landms = landms * self.landmark_scale
-
+        # ignore low scores before decoding, few priors hold a face
         inds = scores > threshold
-
-        # ignore low scores
-        boxes = boxes[inds]
-        landms = landms[inds]
         scores = scores[inds]
+        prior_data = self.prior_data[inds]
+
+        boxes = decode(locations.data.squeeze(0)[inds], prior_data, self.model.cfg['variance'])
+        boxes = boxes * self.box_scale
+
+        landms = decode_landm(landms.data.squeeze(0)[inds], prior_data, self.model.cfg['variance'])
+        landms = landms * self.landmark_scale
 
         # convert to cpu if device != cpu
         if self.device != _CPU_DEVICE:
@@ -118,35 +133,29 @@ class RetinaFace(object):
         scores = scores.detach().numpy()
 
         # keep top-K before NMS
-        order = scores.argsort()[::-1][:top]
-        boxes = boxes[order]
-        landms = landms[order]
-        scores = scores[order]
-
-        # do NMS
-        dets = np.hstack((boxes, scores[:, np.newaxis])).astype(
-            np.float32, copy=False)
-        keep = py_cpu_nms(dets, 0.3)
-        dets = dets[keep, :]
-        landms = landms[keep]
+        if len(scores) > top:
+            order = np.argpartition(-scores, top - 1)[:top]
+            boxes = boxes[order]
+            landms = landms[order]
+            scores = scores[order]
+
+        # do NMS, kept faces are sorted by score
+        keep = nms(boxes, scores, 0.3)
 
         # keep top-K faster NMS
-        dets = dets[:top, :]
-        landms = landms[:top, :]
+        keep = keep[:top]
 
-        faces = np.concatenate((dets, landms), axis=1)
+        faces = np.concatenate(
+            (boxes[keep], scores[keep, np.newaxis], landms[keep]), axis=1).astype(np.float32, copy=False)
 
         # remove box out of image's boundary
-        faces = faces[[np.any((face[:4] >= 0) & (face[:4] < 5000))
-                       for face in faces]]
-
-        # sort by box size
-        if len(faces) > 1:
-            faces_size = np.array(
-                [euclidean_distance(face[:2], face[2:4]) for face in faces])
-            faces_size = faces_size[faces_size > 24]
-            order = np.argsort(faces_size)[::-1]
-            faces = faces[order]
+        faces = faces[np.any((faces[:, :4] >= 0) & (faces[:, :4] < 5000), axis=1)]
+
+        # remove small faces and sort by box size
+        faces_size = np.sqrt(np.sum((faces[:, 2:4] - faces[:, :2]) ** 2, axis=1))
+        faces = faces[faces_size > 24]
+        order = np.argsort(faces_size[faces_size > 24])[::-1]
+        faces = faces[order]
         return faces
 
     def detect(self, image: np.ndarray, threshold, top=500) \
@@ -164,24 +173,51 @@ class RetinaFace(object):
         -------
             List of face include [box, score, land_mark]
         """
-        # update decoder.
-        self.update_prior(image.shape[:2])
+        yield from self.detect_batch([image], threshold, top)[0]
 
-        # transform image
-        transformed_img = self.transform(image)
+    def detect_batch(self, images: List[np.ndarray], threshold, top=500) \
+            -> List[List[Tuple[np.ndarray, np.float32, np.ndarray]]]:
+        """
+        Detect faces in many images. Images of the same size are forwarded as a single batch.
 
-        # forward
-        loc_encoded, score_encoded, landms_encoded = self.model(
-            transformed_img)
-        faces_decoded = self.decode(
-            loc_encoded, score_encoded, landms_encoded, threshold, top)
+        Parameters
+        ----------
+            images: image sources
+            threshold: face threshold
+            top: top k of faces.
 
-        # numpy -> Face
-        for face in faces_decoded:
-            box = face[:4]
-            score = face[4]
-            land_mark = face[5:].reshape(-1, 2)
-            yield box, score, land_mark
+        Returns
+        -------
+            List of faces of each image, a face include [box, score, land_mark]
+        """
+        groups = OrderedDict()
+        for idx, image in enumerate(images):
+            groups.setdefault(image.shape[:2], []).append(idx)
+
+        results = [[] for _ in images]
+        for image_size, indexes in groups.items():
+            # update decoder.
+            self.update_prior(image_size)
+
+            # transform images
+            transformed_imgs = torch.cat([self.transform(images[idx]) for idx in indexes])
+
+            # forward
+            with torch.no_grad():
+                loc_encoded, score_encoded, landms_encoded = self.model(transformed_imgs)
+
+            for batch_idx, idx in enumerate(indexes):
+                faces_decoded = self.decode(
+                    loc_encoded[batch_idx:batch_idx + 1], score_encoded[batch_idx:batch_idx + 1],
+                    landms_encoded[batch_idx:batch_idx + 1], threshold, top)
+
+                # numpy -> Face
+                for face in faces_decoded:
+                    box = face[:4]
+                    score = face[4]
+                    land_mark = face[5:].reshape(-1, 2)
+                    results[idx].append((box, score, land_mark))
+        return results
 
     __call__ = detect
 
@@ -195,7 +231,8 @@ class FaceDetector(object):
     def __init__(self, model_path,
                  detect_threshold=0.975,
                  scale_size=480,
-                 device='cpu'):
+                 device='cpu',
+                 prior_cache_size=8):
         """
         Parameters
         ----------
@@ -203,9 +240,10 @@ class FaceDetector(object):
             detect_threshold: Threshold of confidence score of detector
             scale_size: Scale size input image. `Recommend in [240, 1080]`
             device: device model loaded in. (Default: cpu)
+            prior_cache_size: Number of input sizes whose anchors are kept. (Default: 8)
         """
         # prepare face detector
-        self.retina_face = RetinaFace(model_path, device=device)
+        self.retina_face = RetinaFace(model_path, device=device, prior_cache_size=prior_cache_size)
 
         self.scale_size = scale_size
         if scale_size < 240:
@@ -224,24 +262,47 @@ class FaceDetector(object):
         -------
             List of face with raw resolution
         """
-        # scaling source -> speed up face detect process
-        height, width = image.shape[:2]
-        scale = max(height / self.scale_size, 1.)
-        image_scaled = image
-
-        # resize to scale size
-        if scale > 1.:
-            image_scaled = resize(image, width=-1, height=self.scale_size)
-
-        detected_faces = self.retina_face(image_scaled, self.detect_threshold)
-
-        faces = list()
-        for box, score, land_mark in detected_faces:
-            # scale
-            box = (box * scale).astype(np.int32)
-            land_mark = (land_mark * scale).astype(np.int32)
-            score = score.astype(np.float32)
-            faces.append((box, score, land_mark))
-        return faces
+        return self.process_batch([image])[0]
+
+    def process_batch(self, images: List[np.ndarray]) -> List[List[Tuple[List[int], float, List[List[int]]]]]:
+        """
+        Post process of faces detected from many images with batched forwards
+
+        Parameters
+        ----------
+            images: image sources
+
+        Returns
+        -------
+            List of faces with raw resolution of each image
+        """
+        scales = list()
+        images_scaled = list()
+        for image in images:
+            # scaling source -> speed up face detect process
+            height, width = image.shape[:2]
+            scale = max(height / self.scale_size, 1.)
+            image_scaled = image
+
+            # resize to scale size
+            if scale > 1.:
+                image_scaled = resize(image, width=-1, height=self.scale_size)
+
+            scales.append(scale)
+            images_scaled.append(image_scaled)
+
+        detected_faces_batch = self.retina_face.detect_batch(images_scaled, self.detect_threshold)
+
+        results = list()
+        for scale, detected_faces in zip(scales, detected_faces_batch):
+            faces = list()
+            for box, score, land_mark in detected_faces:
+                # scale
+                box = (box * scale).astype(np.int32)
+                land_mark = (land_mark * scale).astype(np.int32)
+                score = score.astype(np.float32)
+                faces.append((box, score, land_mark))
+            results.append(faces)
+        return results
 
     __call__ = process
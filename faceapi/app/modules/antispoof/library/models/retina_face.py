@@ -1,5 +1,4 @@
 from collections import OrderedDict
-from itertools import product
 from math import ceil
 from typing import Dict
 
@@ -285,18 +284,20 @@ class PriorBox:
 
         anchors = []
         for k, f in enumerate(feature_maps):
-            min_sizes = self.min_sizes[k]
-            for i, j in product(range(f[0]), range(f[1])):
-                for min_size in min_sizes:
-                    s_kx = min_size / image_size[1]
-                    s_ky = min_size / image_size[0]
-                    dense_cx = [x * self.steps[k] / image_size[1] for x in [j + 0.5]]
-                    dense_cy = [y * self.steps[k] / image_size[0] for y in [i + 0.5]]
-                    for cy, cx in product(dense_cy, dense_cx):
-                        anchors += [cx, cy, s_kx, s_ky]
+            min_sizes = numpy.asarray(self.min_sizes[k], dtype=numpy.float64)
+            # anchors of a feature map are ordered by row, column then min size
+            cx = (numpy.arange(f[1]) + 0.5) * self.steps[k] / image_size[1]
+            cy = (numpy.arange(f[0]) + 0.5) * self.steps[k] / image_size[0]
+            shape = (f[0], f[1], len(min_sizes))
+            anchors.append(numpy.stack([
+                numpy.broadcast_to(cx[numpy.newaxis, :, numpy.newaxis], shape),
+                numpy.broadcast_to(cy[:, numpy.newaxis, numpy.newaxis], shape),
+                numpy.broadcast_to(min_sizes / image_size[1], shape),
+                numpy.broadcast_to(min_sizes / image_size[0], shape),
+            ], axis=-1).reshape(-1, 4))
 
         # back to torch land
-        output = torch.tensor(anchors).view(-1, 4).to(device)
+        output = torch.from_numpy(numpy.concatenate(anchors).astype(numpy.float32)).to(device)
         if self.clip:
             output.clamp_(max=1, min=0)
         return output
@@ -387,6 +388,38 @@ def py_cpu_nms(dets, thresh):
     return keep
 
 
+def nms(boxes, scores, thresh):
+    """
+    Greedy NMS over separate box and score arrays. Keeps the same boxes as `py_cpu_nms`.
+    Each iteration compares a kept box with the remaining ones only, which measured faster
+    than a full IoU matrix on crowded images.
+
+    Parameters
+    ----------
+        boxes: boxes in shape (N, 4) as [x1, y1, x2, y2]
+        scores: scores in shape (N,)
+        thresh: boxes overlapping a kept box more than thresh are suppressed
+
+    Returns
+    -------
+        Indexes of kept boxes sorted by decreasing score
+    """
+    order = scores.argsort()[::-1]
+    x1, y1, x2, y2 = boxes[order].T
+    areas = (x2 - x1 + 1) * (y2 - y1 + 1)
+
+    keep = []
+    while order.size > 0:
+        keep.append(order[0])
+        w = numpy.maximum(0.0, numpy.minimum(x2[0], x2[1:]) - numpy.maximum(x1[0], x1[1:]) + 1)
+        h = numpy.maximum(0.0, numpy.minimum(y2[0], y2[1:]) - numpy.maximum(y1[0], y1[1:]) + 1)
+        inter = w * h
+        inds = numpy.where(inter / (areas[0] + areas[1:] - inter) <= thresh)[0] + 1
+        order, x1, y1, x2, y2, areas = order[inds], x1[inds], y1[inds], x2[inds], y2[inds], areas[inds]
+
+    return numpy.asarray(keep, dtype=numpy.int64)
+
+
 def decode(loc, priors, variances):
     """Decode locations from predictions using priors to undo
     the encoding we did for offset regression at train time.
@@ -1,9 +1,20 @@
+import asyncio
+import itertools
 import logging
+import multiprocessing
+import os
+import pickle
 import time
+import traceback
 from abc import ABC
-from multiprocessing import Pipe, Queue, connection
-from threading import Thread
-from typing import Any, Callable
+from concurrent.futures import Future
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Queue
+from threading import BoundedSemaphore, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
 
 from .face_antspoofing.detector import SpoofingDetector
 from .face_detector.detector import FaceDetector
@@ -16,44 +27,79 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 __all__ = ['Message', 'Worker', 'FaceDetectorWorker',
-           'SpoofingDetectorWorker', 'stop_worker']
+           'SpoofingDetectorWorker', 'ModelPool', 'stop_worker']
+
+
+def collect_batch(queue, max_batch_size: int, max_wait_ms: float, stop_signal: Any) -> List[Any]:
+    """
+    Wait for an item of the queue then gather the ones arriving until the batch is full, expires
+    or the stop signal is met.
+
+    Parameters
+    ----------
+        queue: thread or process queue of requests
+        max_batch_size: maximum number of items of the batch
+        max_wait_ms: waiting time after the first item
+        stop_signal: item ending the batch
+    """
+    batch = [queue.get()]
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while len(batch) < max_batch_size and batch[-1] is not stop_signal:
+        timeout = deadline - time.monotonic()
+        try:
+            batch.append(queue.get(timeout=timeout) if timeout > 0 else queue.get_nowait())
+        except Empty:
+            break
+    return batch
 
 
 class Message:
-    """Respond data type of Worker"""
-    __NO_DATA = b"0x00"
+    """Respond data type of Worker. Awaitable in coroutines, blocking through `respond_data`."""
 
-    def __init__(self, request_data: Any, data_fetcher: connection.Connection = None):
+    def __init__(self, request_data: Any, future: Future = None):
         """
         Parameters
         ----------
             request_data: input data to Worker
-            data_fetcher: Connect of PIPE.
+            future: resolved by the Worker with respond data.
         """
-        self.__respond_data = Message.__NO_DATA
-        self.__data_fetcher = data_fetcher
+        self.__future = future or Future()
         self.__request_data = request_data
 
     @property
     def request_data(self):
         return self.__request_data
 
+    @property
+    def future(self) -> Future:
+        return self.__future
+
     @property
     def respond_data(self):
-        if self.__respond_data == Message.__NO_DATA:
-            self.__respond_data = self.__data_fetcher.recv()
-            self.__data_fetcher.close()
-        return self.__respond_data
+        return self.__future.result()
+
+    def __await__(self):
+        return asyncio.wrap_future(self.__future).__await__()
 
 
 class Worker(Thread):
-    """Worker extend Thread for define data flow and process async"""
+    """
+    Worker extend Thread for define data flow and process async.
+
+    Requests of the calling threads are queued in process, the worker drains up to
+    `max_batch_size` of them or waits up to `max_wait_ms` after the first one and processes
+    them together.
+    """
     __STOP_SIGNAL = b'U1RPUA=='
 
-    def __init__(self, name=None):
-        super().__init__(name=name or self.__class__.__name__)
+    def __init__(self, name=None, max_batch_size: int = 8, max_wait_ms: float = 5.):
+        super().__init__(name=name or self.__class__.__name__, daemon=True)
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be a positive integer but it is {max_batch_size}")
         self.queue_request = Queue()
         self.task_count = 0
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
         self.__stop = 1
 
     def __enter__(self):
@@ -73,23 +119,57 @@ class Worker(Thread):
     def processor(self) -> Callable:
         raise NotImplementedError
 
+    def process_batch(self, processor: Callable, requests: List[Tuple[tuple, dict]]) -> List[Any]:
+        """
+        Process a batch of requests. Workers able to run their model on many requests at once
+        overwrite it, the default processes requests one by one.
+        """
+        return [processor(*args, **kwargs) for args, kwargs in requests]
+
+    def collect(self) -> List[Message]:
+        """Wait for a request then gather the ones arriving until the batch is full or expires."""
+        return collect_batch(self.queue_request, self.max_batch_size, self.max_wait_ms, Worker.__STOP_SIGNAL)
+
     def run(self):
         processor = self.processor()
 
         while self.__stop:
-            data_pipe = self.queue_request.get()
-            if data_pipe == Worker.__STOP_SIGNAL:
+            batch = self.collect()
+            stop = batch[-1] == Worker.__STOP_SIGNAL
+            messages = [msg for msg in batch if msg != Worker.__STOP_SIGNAL
+                        and msg.future.set_running_or_notify_cancel()]
+
+            if messages:
+                try:
+                    results = self.process_batch(processor, [msg.request_data for msg in messages])
+                except Exception as err:  # pylint: disable=broad-except
+                    if len(messages) == 1:
+                        messages[0].future.set_exception(err)
+                    else:
+                        # a single bad request fails the whole batch, process them one by one
+                        # so only the failing ones get an error
+                        for msg in messages:
+                            self.__process_alone(processor, msg)
+                else:
+                    for msg, result in zip(messages, results):
+                        msg.future.set_result(result)
+                self.task_count += len(messages)
+
+            if stop:
                 break
 
-            args, kwargs = data_pipe.recv()
-            result = processor(*args, **kwargs)
-            data_pipe.send(result)
+    def __process_alone(self, processor: Callable, msg: Message):
+        """Process a request with the default one by one path and set its own result or error."""
+        try:
+            result, = Worker.process_batch(self, processor, [msg.request_data])
+        except Exception as err:  # pylint: disable=broad-except
+            msg.future.set_exception(err)
+        else:
+            msg.future.set_result(result)
 
     def request(self, *args, **kwargs) -> Message:
-        request, respond = Pipe()
-        msg = Message((args, kwargs), respond)
-        self.queue_request.put(request)
-        respond.send((args, kwargs))
+        msg = Message((args, kwargs))
+        self.queue_request.put(msg)
         return msg
 
     __call__ = request
@@ -98,24 +178,18 @@ class Worker(Thread):
 def stop_worker(*services: Worker):
     logger.info("Stopping workers: %s", services)
     for service in services:
-        if not isinstance(service, Thread):
+        if not isinstance(service, (Thread, ModelPool)):
             continue
 
         service.stop()
-        time_estimate = 0
-        while service.is_alive():
-            time.sleep(0.1)
-            time_estimate += 0.1
-            if time_estimate >= 5:
-                service.queue_request.close()
-                break
+        service.join(timeout=5)
 
 
 class FaceDetectorWorker(Worker, ABC):
     """FaceDetectorWorker implement from Worker & FaceDetector"""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__()
+    def __init__(self, *args, max_batch_size: int = 8, max_wait_ms: float = 5., **kwargs):
+        super().__init__(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
         self.args = args
         self.kwargs = kwargs
 
@@ -124,12 +198,17 @@ class FaceDetectorWorker(Worker, ABC):
         model = FaceDetector(*self.args, **self.kwargs)
         return model
 
+    def process_batch(self, processor: FaceDetector, requests: List[Tuple[tuple, dict]]) -> List[Any]:
+        if any(kwargs for _, kwargs in requests):
+            return super().process_batch(processor, requests)
+        return processor.process_batch([args[0] for args, _ in requests])
+
 
 class SpoofingDetectorWorker(Worker, ABC):
     """SpoofingDetectorWorker implement from Worker & SpoofingDetector"""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__()
+    def __init__(self, *args, max_batch_size: int = 8, max_wait_ms: float = 5., **kwargs):
+        super().__init__(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
         self.args = args
         self.kwargs = kwargs
 
@@ -137,3 +216,281 @@ class SpoofingDetectorWorker(Worker, ABC):
         logger.info("Running SpoofingDetectorWorker processor")
         spoofing_detector = SpoofingDetector(*self.args, **self.kwargs)
         return spoofing_detector
+
+    def process_batch(self, processor: SpoofingDetector, requests: List[Tuple[tuple, dict]]) -> List[Any]:
+        if any(kwargs for _, kwargs in requests):
+            return super().process_batch(processor, requests)
+        return processor.predict_batch([args for args, _ in requests])
+
+
+def _portable_error(err: Exception) -> Exception:
+    """Strip an error of its traceback, which holds views on the shared memories, so it can be sent back."""
+    traceback.clear_frames(err.__traceback__)
+    err = err.with_traceback(None)
+    try:
+        pickle.dumps(err)
+    except Exception:  # pylint: disable=broad-except
+        err = RuntimeError(repr(err))
+    return err
+
+
+def _process_frames(processor: Callable, request_ids: List[int], frames: List[np.ndarray],
+                    args: List[tuple]) -> List[tuple]:
+    """
+    Run a processor on frames and return the responds of their requests. A single bad frame fails
+    the whole batch, then frames are processed one by one so only the failing ones get an error.
+    """
+    try:
+        results = processor(frames, args)
+    except Exception as err:  # pylint: disable=broad-except
+        if len(frames) == 1:
+            return [(request_ids[0], False, _portable_error(err))]
+    else:
+        return [(request_id, True, result) for request_id, result in zip(request_ids, results)]
+
+    return [respond for request_id, frame, arg in zip(request_ids, frames, args)
+            for respond in _process_frames(processor, [request_id], [frame], [arg])]
+
+
+def _serve_frames(processor: Callable, requests: List[tuple], queue_respond) -> None:
+    """
+    Run a processor on the frames of requests, shared by the parent process, and send back the
+    result or the error of each request.
+    """
+    memories = [SharedMemory(name=name) for _, _, name, _, _, _ in requests]
+    request_ids = [request_id for request_id, *_ in requests]
+    frames = list()
+    try:
+        frames = [np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+                  for memory, (_, _, _, shape, dtype, _) in zip(memories, requests)]
+        responds = _process_frames(processor, request_ids, frames, [args for *_, args in requests])
+    except Exception as err:  # pylint: disable=broad-except
+        err = _portable_error(err)
+        responds = [(request_id, False, err) for request_id in request_ids]
+
+    # views must be released before their memories are closed
+    del frames
+    for memory in memories:
+        memory.close()
+    for respond in responds:
+        queue_respond.put(respond)
+
+
+def _serve(queue_request, queue_respond, detector_kwargs: Dict[str, Any], spoofing_kwargs: Dict[str, Any],
+           num_threads: int, max_batch_size: int, max_wait_ms: float) -> None:
+    """Main loop of a model-serving process of ModelPool."""
+    torch.set_num_threads(num_threads)
+    face_detector = FaceDetector(**detector_kwargs)
+    spoofing_detector = SpoofingDetector(**spoofing_kwargs)
+    processors = {
+        ModelPool.DETECT: lambda frames, args: face_detector.process_batch(frames),
+        ModelPool.PREDICT: lambda frames, args: spoofing_detector.predict_batch(
+            [(boxes, frame) for frame, (boxes,) in zip(frames, args)]),
+    }
+
+    while True:
+        batch = collect_batch(queue_request, max_batch_size, max_wait_ms, None)
+        for task, processor in processors.items():
+            requests = [request for request in batch if request is not None and request[1] == task]
+            if requests:
+                _serve_frames(processor, requests, queue_respond)
+
+        if batch[-1] is None:
+            break
+
+
+class ModelPool:
+    """
+    Pool of model-serving processes, each one loads FaceDetector and SpoofingDetector once. Unlike
+    Worker threads, inference of the processes does not compete with request handling for the GIL.
+
+    Frames are copied once into shared memory that the processes map without copy, only their
+    name and shape go through the request queues. A request goes to the running process with the
+    fewest requests in flight, which micro-batches its requests like Worker does.
+
+    Every request in flight holds its frame in /dev/shm. Requests beyond `max_in_flight` are refused
+    with a RuntimeError, /dev/shm must be able to hold that many frames: writing past its size
+    kills the process with SIGBUS.
+
+    Parameters
+    ----------
+        processes: number of model-serving processes
+        detector_kwargs: arguments of FaceDetector
+        spoofing_kwargs: arguments of SpoofingDetector
+        num_threads: (Default: cpu count / processes) torch threads of each process
+        max_batch_size: (Default: 8) maximum number of requests processed together by a process
+        max_wait_ms: (Default: 5) waiting time of a process for its batch to fill up
+        max_in_flight: (Default: 32) maximum number of requests in flight over all processes
+    """
+    DETECT = "detect"
+    PREDICT = "predict"
+    # seconds between two checks of the processes being alive
+    CHECK_INTERVAL = 1.
+
+    def __init__(self, processes: int, detector_kwargs: Dict[str, Any], spoofing_kwargs: Dict[str, Any],
+                 num_threads: Optional[int] = None, max_batch_size: int = 8, max_wait_ms: float = 5.,
+                 max_in_flight: int = 32):
+        if processes < 1:
+            raise ValueError(f"processes must be a positive integer but it is {processes}")
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be a positive integer but it is {max_batch_size}")
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be a positive integer but it is {max_in_flight}")
+
+        # forked torch thread pools deadlock, processes are spawned
+        context = multiprocessing.get_context("spawn")
+        num_threads = num_threads or max((os.cpu_count() or 1) // processes, 1)
+        self.queue_respond = context.Queue()
+        self.queues_request = [context.Queue() for _ in range(processes)]
+        self.processes = [
+            context.Process(target=_serve, name=f"{self}-{idx}", daemon=True,
+                            args=(queue_request, self.queue_respond, detector_kwargs, spoofing_kwargs,
+                                  num_threads, max_batch_size, max_wait_ms))
+            for idx, queue_request in enumerate(self.queues_request)
+        ]
+        self.listener = Thread(target=self.listen, name=f"{self}-listener", daemon=True)
+
+        self.lock = Lock()
+        self.request_ids = itertools.count()
+        self.max_in_flight = max_in_flight
+        self.slots = BoundedSemaphore(max_in_flight)
+        self.in_flight = [0] * processes
+        self.available = set()
+        # request id -> (process index, shared memory of the frame, future of the request)
+        self.pending: Dict[int, Tuple[int, SharedMemory, Future]] = dict()
+        self.task_count = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logger.info("ModelPool stopping: %s", self)
+        self.stop()
+        self.join()
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        self.available = set(range(len(self.processes)))
+        self.listener.start()
+
+    def stop(self):
+        """Let the processes finish the requests they were given, then exit."""
+        with self.lock:
+            self.available.clear()
+        for queue_request in self.queues_request:
+            queue_request.put(None)
+
+    def join(self, timeout: Optional[float] = None):
+        for process in self.processes:
+            process.join(timeout)
+        self.queue_respond.put(None)
+        self.listener.join(timeout)
+        self.fail(list(self.pending), RuntimeError(f"{self} stopped"))
+
+    def request(self, task: str, image: np.ndarray, *args) -> Message:
+        """
+        Send a request to the least loaded process.
+
+        Parameters
+        ----------
+            task: ModelPool.DETECT or ModelPool.PREDICT
+            image: image source, shared with the process
+            args: other arguments of the task
+        """
+        if not self.slots.acquire(blocking=False):
+            raise RuntimeError(f"{self} already has {self.max_in_flight} requests in flight")
+
+        image = np.ascontiguousarray(image)
+        try:
+            memory = SharedMemory(create=True, size=max(image.nbytes, 1))
+        except Exception:
+            self.slots.release()
+            raise
+        np.ndarray(image.shape, dtype=image.dtype, buffer=memory.buf)[...] = image
+
+        msg = Message((task, args))
+        msg.future.set_running_or_notify_cancel()
+        with self.lock:
+            if not self.available:
+                self.release(memory)
+                raise RuntimeError(f"{self} has no running process")
+
+            idx = min(self.available, key=lambda available: (self.in_flight[available], available))
+            request_id = next(self.request_ids)
+            self.in_flight[idx] += 1
+            self.pending[request_id] = (idx, memory, msg.future)
+
+        self.queues_request[idx].put((request_id, task, memory.name, image.shape, image.dtype.str, args))
+        return msg
+
+    def face_detector(self, image: np.ndarray) -> Message:
+        """Detect faces of an image, respond like FaceDetectorWorker."""
+        return self.request(ModelPool.DETECT, image)
+
+    def spoofing_detector(self, boxes, image: np.ndarray) -> Message:
+        """Predict spoofing of face's boxes of an image, respond like SpoofingDetectorWorker."""
+        return self.request(ModelPool.PREDICT, image, boxes)
+
+    def listen(self):
+        """
+        Resolve the futures of requests with the responds of the processes. Processes are checked
+        every `CHECK_INTERVAL` seconds, also while others keep responding.
+        """
+        next_check = time.monotonic() + ModelPool.CHECK_INTERVAL
+        while True:
+            if time.monotonic() >= next_check:
+                self.check_processes()
+                next_check = time.monotonic() + ModelPool.CHECK_INTERVAL
+            try:
+                respond = self.queue_respond.get(timeout=max(next_check - time.monotonic(), 0.))
+            except Empty:
+                continue
+            if respond is None:
+                break
+
+            request_id, success, data = respond
+            with self.lock:
+                pending = self.pending.pop(request_id, None)
+                if pending is None:
+                    continue
+                idx, memory, future = pending
+                self.in_flight[idx] -= 1
+                self.task_count += 1
+            self.release(memory)
+            if success:
+                future.set_result(data)
+            else:
+                future.set_exception(data)
+
+    def check_processes(self):
+        """Stop dispatching to dead processes and fail their requests."""
+        with self.lock:
+            dead = {idx for idx in self.available if not self.processes[idx].is_alive()}
+            self.available -= dead
+            request_ids = [request_id for request_id, (idx, _, _) in self.pending.items() if idx in dead]
+
+        for idx in dead:
+            logger.error("%s exited with code %s", self.processes[idx].name, self.processes[idx].exitcode)
+        self.fail(request_ids, RuntimeError(f"{self} process exited"))
+
+    def fail(self, request_ids: List[int], error: Exception):
+        for request_id in request_ids:
+            with self.lock:
+                pending = self.pending.pop(request_id, None)
+                if pending is None:
+                    continue
+                idx, memory, future = pending
+                self.in_flight[idx] -= 1
+            self.release(memory)
+            future.set_exception(error)
+
+    def release(self, memory: SharedMemory):
+        """Free the frame of a request and its slot."""
+        memory.close()
+        memory.unlink()
+        self.slots.release()
@@ -2,7 +2,7 @@ from typing import Union, Iterator, Type
 
 import numpy
 
-__all__ = ['check_type', 'euclidean_distance', 'scale_box', 'remove_prefix']
+__all__ = ['check_type', 'euclidean_distance', 'scale_box', 'scale_boxes', 'remove_prefix']
 
 
 def remove_prefix(state_dict, prefix):
@@ -76,3 +76,55 @@ def scale_box(src_w, src_h, bbox, scale):
         right_bottom_y = src_h - 1
 
     return int(left_top_x), int(left_top_y), int(right_bottom_x), int(right_bottom_y)
+
+
+def scale_boxes(src_w, src_h, boxes, scale):
+    """
+    Vectorized `scale_box` over many boxes.
+
+    Parameters
+    ----------
+        src_w: image width
+        src_h: image height
+        boxes: boxes in shape (N, 4) as [x1, y1, x2, y2]
+        scale: expected scale of boxes
+
+    Returns
+    -------
+        Scaled boxes as int numpy array in shape (N, 4), equal to `scale_box` of each box.
+    """
+    boxes = numpy.asarray(boxes, dtype=numpy.float64).reshape(-1, 4)
+    x = boxes[:, 0]
+    y = boxes[:, 1]
+    box_w = boxes[:, 2] - boxes[:, 0]
+    box_h = boxes[:, 3] - boxes[:, 1]
+
+    scale = numpy.minimum((src_h - 1) / box_h, numpy.minimum((src_w - 1) / box_w, scale))
+
+    new_width = box_w * scale
+    new_height = box_h * scale
+    center_x, center_y = box_w / 2 + x, box_h / 2 + y
+
+    left_top_x = center_x - new_width / 2
+    left_top_y = center_y - new_height / 2
+    right_bottom_x = center_x + new_width / 2
+    right_bottom_y = center_y + new_height / 2
+
+    outside = left_top_x < 0
+    right_bottom_x = numpy.where(outside, right_bottom_x - left_top_x, right_bottom_x)
+    left_top_x = numpy.where(outside, 0, left_top_x)
+
+    outside = left_top_y < 0
+    right_bottom_y = numpy.where(outside, right_bottom_y - left_top_y, right_bottom_y)
+    left_top_y = numpy.where(outside, 0, left_top_y)
+
+    outside = right_bottom_x > src_w - 1
+    left_top_x = numpy.where(outside, left_top_x - (right_bottom_x - src_w + 1), left_top_x)
+    right_bottom_x = numpy.where(outside, src_w - 1, right_bottom_x)
+
+    outside = right_bottom_y > src_h - 1
+    left_top_y = numpy.where(outside, left_top_y - (right_bottom_y - src_h + 1), left_top_y)
+    right_bottom_y = numpy.where(outside, src_h - 1, right_bottom_y)
+
+    # int() of scale_box truncates toward zero
+    return numpy.trunc(numpy.stack([left_top_x, left_top_y, right_bottom_x, right_bottom_y], axis=1)).astype(int)
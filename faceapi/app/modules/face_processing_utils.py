@@ -128,12 +128,13 @@ def liveness_detection(image, required_move):
         }
 
 
-def anti_spoof_check(image: np.ndarray):
+async def anti_spoof_check(image: np.ndarray):
     """
     Perform anti-spoofing check to verify if the face is real or fake.
+    Detection and spoofing run in their batching workers, the event loop awaits them.
     """
     try:
-        faces = face_detector(image).respond_data
+        faces = await face_detector(image)
 
         if len(faces) == 0:
             return get_no_face_error()
@@ -141,8 +142,7 @@ def anti_spoof_check(image: np.ndarray):
             return get_face_number_error()
 
         boxes = [box.tolist() for box, _, _ in faces]
-        spoof_msg = spoofing_detector(boxes, image)
-        spoofs = spoof_msg.respond_data
+        spoofs = await spoofing_detector(boxes, image)
         respond = {
             "nums": len(spoofs),
             "is_reals": [bool(is_spoof) for is_spoof, _ in spoofs],
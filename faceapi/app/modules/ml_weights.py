@@ -1,7 +1,10 @@
 import logging
 
+from app.core.config import settings
 from app.modules.antispoof.library.task_manager import (FaceDetectorWorker,
-                                                        SpoofingDetectorWorker)
+                                                        ModelPool,
+                                                        SpoofingDetectorWorker,
+                                                        stop_worker)
 from app.modules.storage import storage
 
 logger = logging.getLogger(__name__)
@@ -11,18 +14,42 @@ weights_path = storage.get_model_weights_dir_path()
 antispoofing_model_path = weights_path.joinpath("fasnet_v1se_v2.pth.tar")
 retina_face_detector_model_path = weights_path.joinpath(
     "retina_face.pth.tar")
-face_detector = FaceDetectorWorker(
+detector_kwargs = dict(
     model_path=retina_face_detector_model_path,
     detect_threshold=0.95,
     scale_size=720,
     device="cpu"
 )
-spoofing_detector = SpoofingDetectorWorker(
+spoofing_kwargs = dict(
     model_path=antispoofing_model_path,
-    device="cpu"
+    device="cpu",
+    traced=settings.SPOOFING_TRACED,
+    quantized=settings.SPOOFING_QUANTIZED,
 )
 
+if settings.MODEL_WORKERS > 0:
+    model_pool = ModelPool(
+        settings.MODEL_WORKERS,
+        detector_kwargs=detector_kwargs,
+        spoofing_kwargs=spoofing_kwargs,
+        num_threads=settings.MODEL_WORKER_THREADS,
+        max_in_flight=settings.MODEL_WORKER_MAX_IN_FLIGHT,
+    )
+    face_detector = model_pool.face_detector
+    spoofing_detector = model_pool.spoofing_detector
+    workers = (model_pool,)
+else:
+    face_detector = FaceDetectorWorker(**detector_kwargs)
+    spoofing_detector = SpoofingDetectorWorker(**spoofing_kwargs)
+    workers = (face_detector, spoofing_detector)
+
 
 async def load_models():
     logger.info("load_models: start")
+    for worker in workers:
+        worker.start()
     logger.info("load_models: end")
+
+
+def unload_models():
+    stop_worker(*workers)